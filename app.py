@@ -1,83 +1,150 @@
 import os
-from flask import Flask, render_template, send_from_directory
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
-from flask_minify import Minify
+from flask import Flask, render_template, abort
 from dotenv import load_dotenv
 import logging
 
 from modules.auth import auth_bp, login_manager
-from modules.image_handler import image_bp
+from modules.extensions import limiter
+from modules.state import configure_limiter_storage
+from modules import assets, log_config, metrics
+from modules.log_config import configure_logging
+from modules.image_handler import image_bp, servable_file
 from modules.reactions import reactions_bp
 from modules.photo_manager import photo_bp
+from modules.http_client import all_image_host_stats
+from modules.static_delivery import send_upload
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('app.log'),
-        logging.StreamHandler()
-    ]
+load_dotenv()
+
+# Set up logging (process-wide, shared by every app instance)
+configure_logging(
+    log_file=os.getenv('LOG_FILE', 'app.log'),
+    level=os.getenv('LOG_LEVEL', 'INFO').upper(),
+    fmt=os.getenv('LOG_FORMAT', 'json'),  # 'json' or 'text'
+    queued=os.getenv('LOG_QUEUE', 'true').lower() == 'true',  # write from a background thread
+    max_bytes=int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024)),  # rotate the file at this size; 0 = external logrotate
+    backup_count=int(os.getenv('LOG_BACKUP_COUNT', 5)),
+    error_burst=int(os.getenv('LOG_ERROR_BURST', 10)),  # warnings/errors per call site per interval; 0 = all
+    error_interval=float(os.getenv('LOG_ERROR_INTERVAL', 60)),
 )
 logger = logging.getLogger(__name__)
 
-load_dotenv()
+def create_app(config=None):
+    """Build and configure the SwapSnap application.
 
-# Initialize Flask app
-app = Flask("SwapSnap", static_folder='static')
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-key-replace-in-production')
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
-app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
-
-# Initialize Flask extensions
-Minify(app=app, html=True, js=True, cssless=True)
-login_manager.init_app(app)
-limiter = Limiter(
-    app=app,
-    key_func=get_remote_address,
-    default_limits=["200 per day", "50 per hour"]
-)
+    ``config`` overrides settings read from the environment.
+    """
+    app = Flask("SwapSnap", static_folder='static')
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-key-replace-in-production')
+    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+    app.config['UPLOAD_FOLDER'] = os.getenv('UPLOAD_FOLDER') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
+    app.config['STORAGE_BACKEND'] = os.getenv('STORAGE_BACKEND', 'imgbb')  # 'imgbb' or 'local' (UPLOAD_FOLDER/images)
+    app.config['METADATA_BACKEND'] = os.getenv('METADATA_BACKEND', 'sqlite')  # 'sqlite' or 'log'
+    app.config['STATE_BACKEND'] = os.getenv('STATE_BACKEND', 'memory')  # rate limits + photo history: 'memory', 'sqlite' or 'redis'
+    app.config['STATE_URL'] = os.getenv('STATE_URL')  # redis:// URL, or SQLite path (default UPLOAD_FOLDER/state.db)
+    app.config['STATE_POOL_SIZE'] = int(os.getenv('STATE_POOL_SIZE', 20))  # Redis connections per process
+    app.config['RANDOM_HISTORY_SIZE'] = int(os.getenv('RANDOM_HISTORY_SIZE', 10))  # no-repeat window per session
+    app.config['IMAGE_MAX_PIXELS'] = int(os.getenv('IMAGE_MAX_PIXELS', 50 * 1000 * 1000))  # checked from the header, before decode
+    app.config['IMAGE_MAX_FRAMES'] = int(os.getenv('IMAGE_MAX_FRAMES', 300))  # animated GIF/PNG/WebP frame limit
+    app.config['UPLOAD_ASYNC'] = os.getenv('UPLOAD_ASYNC', 'false').lower() == 'true'  # queue uploads by default
+    app.config['UPLOAD_WORKERS'] = int(os.getenv('UPLOAD_WORKERS', 4))  # background upload threads per process
+    app.config['UPLOAD_QUEUE_DEPTH'] = int(os.getenv('UPLOAD_QUEUE_DEPTH', 0)) or None  # default 4x workers
+    app.config['CHUNKED_MAX_FILE_SIZE'] = int(os.getenv('CHUNKED_MAX_FILE_SIZE', 50 * 1024 * 1024))  # resumable upload limit
+    app.config['CHUNKED_UPLOAD_TTL'] = int(os.getenv('CHUNKED_UPLOAD_TTL', 24 * 3600))  # seconds to finish an upload
+    app.config['BATCH_WORKERS'] = int(os.getenv('BATCH_WORKERS', 4))  # threads per process for batch upload items
+    app.config['TRANSCODE_WORKERS'] = int(os.getenv('TRANSCODE_WORKERS', 0))  # image processes; 0 = transcode inline
+    app.config['TRANSCODE_QUEUE_DEPTH'] = int(os.getenv('TRANSCODE_QUEUE_DEPTH', 0)) or None  # default 2x workers
+    app.config['TRANSCODE_QUEUE_TIMEOUT'] = float(os.getenv('TRANSCODE_QUEUE_TIMEOUT', 5))  # seconds before 503
+    app.config['UPLOAD_CACHE_SIZE'] = int(os.getenv('UPLOAD_CACHE_SIZE', 10000))  # duplicate-upload index entries
+    app.config['UPLOAD_CACHE_PERCEPTUAL'] = os.getenv('UPLOAD_CACHE_PERCEPTUAL', 'false').lower() == 'true'
+    app.config['DERIVATIVE_WIDTHS'] = [  # responsive sizes rendered per upload; empty disables
+        int(width) for width in os.getenv('DERIVATIVE_WIDTHS', '320,640,1280,1920').split(',') if width.strip()
+    ]
+    app.config['UPLOADS_OFFLOAD'] = os.getenv('UPLOADS_OFFLOAD')  # 'x-accel' (nginx) or 'x-sendfile' (Apache)
+    app.config['UPLOADS_ACCEL_PREFIX'] = os.getenv('UPLOADS_ACCEL_PREFIX', '/protected-uploads/')
+    app.config['UPLOADS_MAX_AGE'] = int(os.getenv('UPLOADS_MAX_AGE', 3600))  # seconds, for non-hashed names
+    app.config['REACTIONS_DB'] = os.getenv('REACTIONS_DB')  # default: reactions.db in UPLOAD_FOLDER
+    app.config['REACTIONS_COALESCE'] = os.getenv('REACTIONS_COALESCE', 'false').lower() == 'true'  # batch reaction writes
+    app.config['REACTIONS_FLUSH_INTERVAL'] = float(os.getenv('REACTIONS_FLUSH_INTERVAL', 1.0))  # seconds between batches
+    app.config['ASSETS_FOLDER'] = os.getenv('ASSETS_FOLDER') or os.path.join(app.static_folder, 'dist')  # built JS/CSS
+    app.config['ASSETS_BUILD'] = os.getenv('ASSETS_BUILD', 'true').lower() == 'true'  # false: serve a `flask assets build` output
+    app.config['LOG_REQUESTS'] = os.getenv('LOG_REQUESTS', 'true').lower() == 'true'  # one JSON record per request
+    app.config['METRICS_DIR'] = os.getenv('METRICS_DIR')  # workers share metrics here; gunicorn.conf.py sets it
+    app.config['RATELIMIT_ENABLED'] = os.getenv('RATELIMIT_ENABLED', 'true').lower() == 'true'  # off only for load tests
+    if config:
+        app.config.update(config)
+
+    # Initialize Flask extensions
+    assets.init_app(app)
+    login_manager.init_app(app)
+    configure_limiter_storage(app)
+    limiter.init_app(app)
+
+    # Register blueprints
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(image_bp)
+    app.register_blueprint(reactions_bp)
+    app.register_blueprint(photo_bp)
+    metrics.init_app(app)
+    log_config.init_app(app)
+
+    # Ensure upload directory exists
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+
+    @app.route('/')
+    def index():
+        """Render the home page."""
+        return render_template('index.html')
+
+    @app.route('/uploads/<path:filename>')
+    def uploaded_file(filename):
+        """Serve uploaded images (and their derivatives)."""
+        # The upload folder also holds the metadata and reaction databases
+        if not servable_file(filename):
+            abort(404)
+        return send_upload(app.config['UPLOAD_FOLDER'], filename)
+
+    @app.route('/health')
+    @limiter.exempt
+    def health_check():
+        """Health check endpoint for monitoring."""
+        try:
+            return {'status': 'healthy', 'image_host': all_image_host_stats()}, 200
+        except Exception as e:
+            logger.error(f"Health check failed: {str(e)}")
+            return {'status': 'unhealthy', 'error': str(e)}, 500
+
+    @app.errorhandler(404)
+    def not_found_error(error):
+        """Handle 404 errors."""
+        return render_template('404.html'), 404
+
+    @app.errorhandler(500)
+    def internal_error(error):
+        """Handle 500 errors."""
+        logger.error(f"Internal server error: {str(error)}")
+        return render_template('500.html'), 500
+
+    return app
+
+def shutdown_app(app):
+    """Drain background work before the process exits.
+
+    Queued and running upload jobs finish, the transcoder pool stops and
+    buffered reactions are written out.
+    """
+    for jobs in app.extensions.get('upload_jobs', {}).values():
+        jobs.shutdown(wait=True)
+    batch = app.extensions.get('upload_batch')
+    if batch is not None and batch[0] == os.getpid():
+        batch[1].shutdown(wait=True)
+    transcoder = app.extensions.get('transcoder')
+    if transcoder is not None:
+        transcoder.shutdown(wait=True)
+    for store in app.extensions.get('reaction_stores', {}).values():
+        store.flush()
 
-# Register blueprints
-app.register_blueprint(auth_bp)
-app.register_blueprint(image_bp)
-app.register_blueprint(reactions_bp)
-app.register_blueprint(photo_bp)
-
-# Ensure upload directory exists
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-
-@app.route('/')
-def index():
-    """Render the home page."""
-    return render_template('index.html')
-
-@app.route('/uploads/<filename>')
-def uploaded_file(filename):
-    """Serve uploaded files."""
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
-
-@app.route('/health')
-@limiter.exempt
-def health_check():
-    """Health check endpoint for monitoring."""
-    try:
-        return {'status': 'healthy'}, 200
-    except Exception as e:
-        logger.error(f"Health check failed: {str(e)}")
-        return {'status': 'unhealthy', 'error': str(e)}, 500
-
-@app.errorhandler(404)
-def not_found_error(error):
-    """Handle 404 errors."""
-    return render_template('404.html'), 404
-
-@app.errorhandler(500)
-def internal_error(error):
-    """Handle 500 errors."""
-    logger.error(f"Internal server error: {str(error)}")
-    return render_template('500.html'), 500
+app = create_app()
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8000))
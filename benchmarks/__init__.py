@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The benchmarks share the test suite's helpers: the fake imgbb server and
+# the image quality and memory measurements
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests'))
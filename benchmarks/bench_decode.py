@@ -0,0 +1,83 @@
+"""Compare the draft-mode resize path of process_image with a full decode.
+
+Each variant runs in a fresh interpreter so peak RSS is measured per image:
+
+    python -m benchmarks.bench_decode [IMAGE ...]
+
+Defaults to the sample photos in static/uploads/.
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+from io import BytesIO
+
+from PIL import Image
+
+from measurements import SSIM_TOLERANCE, full_decode, peak_rss_kib, ssim
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_IMAGES = os.path.join(ROOT, 'static', 'uploads', '*.jpg')
+
+
+def fast_decode(data):
+    """The current process_image output, decoded back into an image."""
+    from modules.image_handler import process_image
+
+    output, _, _ = process_image(BytesIO(data))
+    return Image.open(output)
+
+
+def run_child(variant, path):
+    """Run one variant in this process and print its timing and peak RSS."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    start = time.perf_counter()
+    if variant == 'full':
+        full_decode(data).load()
+    elif variant == 'fast':
+        fast_decode(data).load()
+    elapsed = time.perf_counter() - start
+    print(json.dumps({'seconds': elapsed, 'peak_rss_kib': peak_rss_kib()}))
+
+
+def measure(variant, path):
+    result = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_decode', '--child', variant, path],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('images', nargs='*')
+    parser.add_argument('--child', nargs=2, metavar=('VARIANT', 'IMAGE'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        return run_child(*args.child)
+
+    images = args.images or sorted(glob.glob(SAMPLE_IMAGES))
+    baseline = measure('noop', images[0])['peak_rss_kib']
+    print(f"{'image':<48} {'size':>11} {'full ms':>8} {'fast ms':>8} {'full MiB':>9} {'fast MiB':>9} {'ssim':>6}")
+    failures = 0
+    for path in images:
+        with open(path, 'rb') as f:
+            data = f.read()
+        full, fast = measure('full', path), measure('fast', path)
+        score = ssim(full_decode(data), fast_decode(data))
+        failures += score < SSIM_TOLERANCE
+        size = '%dx%d' % Image.open(path).size
+        print(f"{os.path.basename(path)[:48]:<48} {size:>11} "
+              f"{full['seconds'] * 1000:>8.0f} {fast['seconds'] * 1000:>8.0f} "
+              f"{(full['peak_rss_kib'] - baseline) / 1024:>9.1f} {(fast['peak_rss_kib'] - baseline) / 1024:>9.1f} "
+              f"{score:>6.3f}")
+    print(f"SSIM tolerance {SSIM_TOLERANCE}: {'OK' if not failures else f'{failures} image(s) below'}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
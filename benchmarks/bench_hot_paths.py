@@ -0,0 +1,312 @@
+"""Throughput, p50/p99 latency and peak memory of the hot paths.
+
+Catalog benchmarks run against synthetic stores of each ``--scale``; image
+benchmarks use synthetic RGB/RGBA/P/L images, and uploads go to a local fake
+image host. Each benchmark runs in a fresh interpreter so peak RSS is its own:
+
+    python -m benchmarks.bench_hot_paths [--scale 1000 10000 100000] [--only 'photos_*']
+    python -m benchmarks.bench_hot_paths --save benchmarks/results/baseline.json
+    python -m benchmarks.bench_hot_paths --compare benchmarks/results/baseline.json
+
+``--compare`` exits with status 1 when a p50 latency regressed by more than
+``--tolerance``. The same benchmarks run under pytest at a small scale with
+``python -m pytest -q benchmarks``.
+"""
+import argparse
+import fnmatch
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+from benchmarks.synthetic import IMAGE_CASES, fake_image_host, make_catalog, make_image, make_reactions
+from measurements import peak_rss_kib, reset_peak_rss
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SCALES = [1000, 10000, 100000]
+DEFAULT_TOLERANCE = 0.25
+
+# name -> (setup, uses_catalog, default iterations)
+BENCHMARKS = {}
+
+
+def benchmark(name, catalog=False, iterations=200):
+    def register(setup):
+        BENCHMARKS[name] = (setup, catalog, iterations)
+        return setup
+    return register
+
+
+class BenchEnv:
+    """What a benchmark's setup gets: the app, a test client and its data."""
+
+    def __init__(self, data_dir):
+        from app import app
+        from modules.extensions import limiter
+
+        self.data_dir = data_dir
+        self.app = app
+        app.config.update(TESTING=True, WTF_CSRF_ENABLED=False, UPLOAD_FOLDER=data_dir)
+        app.extensions.pop('upload_cache', None)
+        limiter.enabled = False
+        self.client = app.test_client()
+        self._cleanups = []
+
+    def filenames(self):
+        with open(os.path.join(self.data_dir, 'filenames.txt')) as f:
+            return f.read().split()
+
+    def login(self, username='bench'):
+        self.client.post('/login', data={'username': username, 'password': 'password123'})
+
+    def add_cleanup(self, func):
+        self._cleanups.append(func)
+
+    def close(self):
+        for func in reversed(self._cleanups):
+            func()
+
+
+def make_image_benchmark(name, mode, size, fmt):
+    @benchmark(f'process_image:{name}', iterations=20)
+    def setup(env):
+        from modules.image_handler import process_image
+
+        data = make_image(mode, size, fmt)
+
+        def run(i):
+            output, _, _ = process_image(BytesIO(data))
+            assert output is not None
+        return run
+
+
+for _case in IMAGE_CASES:
+    make_image_benchmark(*_case)
+
+
+@benchmark('upload', iterations=50)
+def setup_upload(env):
+    from modules import http_client
+
+    host = fake_image_host()
+    env.add_cleanup(host.stop)
+    os.environ.update(IMGBB_API_KEY='bench', IMGBB_UPLOAD_URL=host.url)
+    http_client._client = None
+    image = make_image('RGB', (1600, 1200), 'JPEG')
+
+    def run(i):
+        # Bytes after the JPEG end marker are ignored by decoders but change
+        # the content hash, so the duplicate cache never answers
+        data = image + str(i).encode()
+        rv = env.client.post('/api/upload', data={'file': (BytesIO(data), f'{i}.jpg')})
+        assert rv.status_code == 200, rv.data
+    return run
+
+
+@benchmark('get_all_photos', catalog=True, iterations=10)
+def setup_get_all_photos(env):
+    from modules.photo_manager import get_all_photos
+
+    def run(i):
+        with env.app.app_context():
+            assert get_all_photos()
+    return run
+
+
+@benchmark('photos_page', catalog=True)
+def setup_photos_page(env):
+    cursor = [None]
+
+    def run(i):
+        url = '/api/photos?limit=30' + (f'&after={cursor[0]}' if cursor[0] else '')
+        rv = env.client.get(url)
+        assert rv.status_code == 200
+        # Walk deeper each iteration, starting over at the end
+        cursor[0] = rv.json.get('next_cursor')
+    return run
+
+
+@benchmark('photos_random', catalog=True)
+def setup_photos_random(env):
+    def run(i):
+        assert env.client.get('/api/photos/random').status_code == 200
+    return run
+
+
+@benchmark('reaction_add', catalog=True)
+def setup_reaction_add(env):
+    from benchmarks.synthetic import EMOJIS
+
+    filenames = env.filenames()
+    rng = random.Random(0)
+    env.login()
+
+    def run(i):
+        rv = env.client.post('/api/reaction', json={'photo': rng.choice(filenames), 'reaction': rng.choice(EMOJIS)})
+        assert rv.status_code == 200
+    return run
+
+
+@benchmark('reactions_summary', catalog=True)
+def setup_reactions_summary(env):
+    filenames = env.filenames()
+    rng = random.Random(0)
+
+    def run(i):
+        photos = ','.join(rng.sample(filenames, 30))
+        assert env.client.get(f'/api/reactions?photos={photos}').status_code == 200
+    return run
+
+
+@benchmark('photos_top', catalog=True)
+def setup_photos_top(env):
+    from benchmarks.synthetic import EMOJIS
+
+    filenames = env.filenames()
+    rng = random.Random(0)
+    env.login()
+
+    def run(i):
+        # A reaction, then a leaderboard read that has to include it
+        env.client.post('/api/reaction', json={'photo': rng.choice(filenames), 'reaction': rng.choice(EMOJIS)})
+        window = ('all', 'hour', 'day')[i % 3]
+        assert env.client.get(f'/api/photos/top?window={window}&emoji={rng.choice(EMOJIS)}').status_code == 200
+    return run
+
+
+def prepare_catalog(root, scale):
+    """Create (once) a catalog of ``scale`` photos with reactions under ``root``."""
+    folder = os.path.join(root, f'catalog-{scale}')
+    marker = os.path.join(folder, 'filenames.txt')
+    if not os.path.exists(marker):
+        os.makedirs(folder, exist_ok=True)
+        filenames = make_catalog(folder, scale)
+        make_reactions(os.path.join(folder, 'reactions.db'), filenames)
+        with open(marker, 'w') as f:
+            f.write('\n'.join(filenames))
+    return folder
+
+
+def current_rss_kib():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, max(math.ceil(fraction * len(sorted_values)) - 1, 0))]
+
+
+def run_benchmark(name, data_dir, iterations=None, warmup=None):
+    """Run one benchmark in this process and return its measurements."""
+    setup, _, default_iterations = BENCHMARKS[name]
+    iterations = iterations or default_iterations
+    warmup = max(iterations // 10, 1) if warmup is None else warmup
+    env = BenchEnv(data_dir)
+    try:
+        run = setup(env)
+        for i in range(warmup):
+            run(i)
+        exact_peak = reset_peak_rss()
+        rss_before = current_rss_kib()
+        latencies = []
+        started = time.perf_counter()
+        for i in range(warmup, warmup + iterations):
+            start = time.perf_counter()
+            run(i)
+            latencies.append(time.perf_counter() - start)
+        elapsed = time.perf_counter() - started
+    finally:
+        env.close()
+    latencies.sort()
+    return {
+        'iterations': iterations,
+        'ops_per_sec': iterations / elapsed,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'peak_mib': max(peak_rss_kib() - rss_before, 0) / 1024,
+        'exact_peak': exact_peak,
+    }
+
+
+def measure(name, data_dir, iterations=None):
+    result = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_hot_paths', '--child', name, data_dir]
+        + (['--iterations', str(iterations)] if iterations else []),
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode:
+        raise RuntimeError(f'{name} failed:\n{result.stderr}')
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, tolerance):
+    """Print p50 changes against ``baseline``; returns the regressed keys."""
+    regressions = []
+    for key, result in results.items():
+        before = baseline.get(key)
+        if before is None:
+            continue
+        change = result['p50_ms'] / before['p50_ms'] - 1 if before['p50_ms'] else 0.0
+        flag = ''
+        if change > tolerance:
+            regressions.append(key)
+            flag = '  REGRESSION'
+        print(f"{key:<36} p50 {before['p50_ms']:>9.2f} -> {result['p50_ms']:>9.2f} ms ({change:+.0%}){flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=int, nargs='+', default=DEFAULT_SCALES, help='catalog sizes')
+    parser.add_argument('--only', nargs='+', metavar='PATTERN', help='benchmark name patterns')
+    parser.add_argument('--iterations', type=int, help='override per-benchmark iteration counts')
+    parser.add_argument('--data', default=os.path.join(tempfile.gettempdir(), 'swapsnap-bench'),
+                        help='where synthetic catalogs are kept between runs')
+    parser.add_argument('--save', metavar='FILE', help='write results as a baseline')
+    parser.add_argument('--compare', metavar='FILE', help='compare against a saved baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='allowed p50 slowdown')
+    parser.add_argument('--child', nargs=2, metavar=('NAME', 'DATA'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        print(json.dumps(run_benchmark(*args.child, iterations=args.iterations)))
+        return 0
+
+    names = [name for name in BENCHMARKS if not args.only or any(fnmatch.fnmatch(name, p) for p in args.only)]
+    results = {}
+    print(f"{'benchmark':<36} {'ops/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'peak MiB':>9}")
+    with tempfile.TemporaryDirectory(prefix='swapsnap-bench-') as scratch:
+        for name in names:
+            _, uses_catalog, _ = BENCHMARKS[name]
+            if uses_catalog:
+                runs = [(f'{name}@{scale}', prepare_catalog(args.data, scale)) for scale in args.scale]
+            else:
+                runs = [(name, tempfile.mkdtemp(dir=scratch))]
+            for key, data_dir in runs:
+                result = results[key] = measure(name, data_dir, args.iterations)
+                print(f"{key:<36} {result['ops_per_sec']:>9.1f} {result['p50_ms']:>9.2f} "
+                      f"{result['p99_ms']:>9.2f} {result['peak_mib']:>9.1f}")
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f'Saved baseline to {args.save}')
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f'{len(regressions)} benchmark(s) regressed by more than {args.tolerance:.0%}')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""Compare the Flask development server with gunicorn under concurrent load.
+
+Starts each server against a synthetic catalog, drives the read endpoints
+with keep-alive clients and reports requests/s and p50/p99 latency:
+
+    python -m benchmarks.bench_server [--clients 32] [--duration 10] [--scale 10000]
+
+Rate limiting is switched off in the servers under test.
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from benchmarks.bench_hot_paths import percentile, prepare_catalog
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVERS = {
+    'dev': [sys.executable, os.path.join(ROOT, 'app.py')],
+    'gunicorn': [sys.executable, '-m', 'gunicorn', '-c', os.path.join(ROOT, 'gunicorn.conf.py')],
+}
+ENDPOINTS = ['/api/photos?limit=30', '/api/photos/random', '/health']
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(name, data_dir, workdir, port):
+    env = dict(os.environ, PORT=str(port), UPLOAD_FOLDER=data_dir, RATELIMIT_ENABLED='false',
+               PYTHONPATH=ROOT, GUNICORN_MAX_REQUESTS='0')
+    # Run from a scratch directory so the servers' app.log stays out of the repo
+    process = subprocess.Popen(SERVERS[name], cwd=workdir, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if requests.get(f'http://127.0.0.1:{port}/health', timeout=1).ok:
+                return process
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f'{name} server did not start')
+
+
+def load(url, clients, duration):
+    """Hit ``url`` from ``clients`` threads for ``duration`` seconds."""
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop = time.perf_counter() + duration
+
+    def client():
+        session = requests.Session()
+        local, failed = [], 0
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            try:
+                ok = session.get(url, timeout=30).ok
+            except requests.RequestException:
+                ok = False
+            if ok:
+                local.append(time.perf_counter() - start)
+            else:
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    return {
+        'rps': len(latencies) / duration,
+        'p50_ms': percentile(latencies, 0.5) * 1000 if latencies else 0,
+        'p99_ms': percentile(latencies, 0.99) * 1000 if latencies else 0,
+        'errors': errors[0],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--scale', type=int, default=10000, help='photos in the synthetic catalog')
+    parser.add_argument('--servers', nargs='+', default=list(SERVERS), choices=list(SERVERS))
+    parser.add_argument('--data', default=os.path.join(tempfile.gettempdir(), 'swapsnap-bench'))
+    args = parser.parse_args(argv)
+
+    data_dir = prepare_catalog(args.data, args.scale)
+    print(f"{'server':<10} {'endpoint':<24} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    with tempfile.TemporaryDirectory(prefix='swapsnap-server-') as workdir:
+        for name in args.servers:
+            port = free_port()
+            process = start_server(name, data_dir, workdir, port)
+            try:
+                for endpoint in ENDPOINTS:
+                    result = load(f'http://127.0.0.1:{port}{endpoint}', args.clients, args.duration)
+                    print(f"{name:<10} {endpoint:<24} {result['rps']:>9.0f} {result['p50_ms']:>9.1f} "
+                          f"{result['p99_ms']:>9.1f} {result['errors']:>7}")
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
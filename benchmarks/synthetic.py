@@ -0,0 +1,101 @@
+"""Synthetic catalogs, reactions and images for the benchmarks."""
+import os
+import random
+from datetime import datetime, timedelta
+from io import BytesIO
+
+from PIL import Image
+
+from modules.metadata_store import open_store
+from modules.reaction_store import ReactionStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EMOJIS = ['👍', '❤️', '😂', '😮', '😢', '🔥']
+
+# (name, mode, size, format): the shapes process_image has separate paths for
+IMAGE_CASES = [
+    ('rgb-12mp-jpeg', 'RGB', (4000, 3000), 'JPEG'),
+    ('rgba-4mp-png', 'RGBA', (2400, 1600), 'PNG'),
+    ('p-2mp-gif', 'P', (1600, 1200), 'GIF'),
+    ('l-6mp-jpeg', 'L', (3000, 2000), 'JPEG'),
+    ('rgb-small-jpeg', 'RGB', (800, 600), 'JPEG'),
+]
+
+
+def fake_image_host():
+    """Start the fake imgbb server shared with the test suite."""
+    from fake_imgbb import FakeImgBB
+
+    return FakeImgBB().start()
+
+
+def make_image(mode, size, fmt, seed=0):
+    """Encode a noisy gradient image; ``seed`` changes its bytes."""
+    rng = random.Random(seed)
+    noise = Image.effect_noise(size, 40)
+    gradient = Image.linear_gradient('L').resize(size)
+    base = Image.merge('RGB', (noise, gradient, Image.new('L', size, rng.randrange(256))))
+    if mode == 'RGBA':
+        img = base.copy()
+        img.putalpha(gradient)
+    elif mode == 'P':
+        img = base.quantize(256)
+    else:
+        img = base.convert(mode)
+    buffer = BytesIO()
+    img.save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def photo_record(index, when):
+    filename = f"{when.strftime('%Y%m%d%H%M%S')}_{index:07d}.jpg"
+    return {
+        'success': True,
+        'url': f'https://i.example.com/{index}.jpg',
+        'thumbnail': f'https://i.example.com/{index}_thumb.jpg',
+        'filename': filename,
+        'timestamp': when.isoformat(),
+        'details': {
+            'original': {'width': 4000, 'height': 3000, 'format': 'JPEG', 'mode': 'RGB', 'size': '2.1 MB'},
+            'processed': {'width': 1440, 'height': 1080, 'size': '310.2 kB', 'format': 'jpg'}
+        },
+        'derivatives': [
+            {'width': width, 'height': width * 3 // 4, 'format': 'webp',
+             'url': f'/uploads/derivatives/{index}-{width}.webp'}
+            for width in (320, 640, 1280)
+        ]
+    }
+
+
+def make_catalog(folder, photos, backend='sqlite', seed=0):
+    """Fill a metadata store in ``folder`` with ``photos`` records; returns filenames."""
+    rng = random.Random(seed)
+    store = open_store(backend, folder)
+    start = datetime(2024, 1, 1)
+    filenames = []
+    batch = []
+    for index in range(photos):
+        record = photo_record(index, start + timedelta(seconds=index * 60 + rng.randrange(60)))
+        filenames.append(record['filename'])
+        batch.append(record)
+        if len(batch) == 5000:
+            store.put_many(batch)
+            batch = []
+    store.put_many(batch)
+    return filenames
+
+
+def make_reactions(path, filenames, per_photo=5, users=1000, seed=0):
+    """Give every photo about ``per_photo`` reactions from random users."""
+    rng = random.Random(seed)
+    store = ReactionStore(path)
+    now = datetime(2024, 1, 1).timestamp()
+    rows = [
+        (filename, f'user{rng.randrange(users)}', rng.choice(EMOJIS), now)
+        for filename in filenames
+        for _ in range(per_photo)
+    ]
+    for start in range(0, len(rows), 20000):
+        store.react_many(rows[start:start + 20000])
+    store.close()
+    return len(rows)
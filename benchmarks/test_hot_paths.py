@@ -0,0 +1,26 @@
+"""Run every hot-path benchmark at a small scale under pytest.
+
+    python -m pytest -q -s -m benchmark benchmarks
+"""
+import pytest
+
+from benchmarks.bench_hot_paths import BENCHMARKS, prepare_catalog, run_benchmark
+
+SCALE = 1000
+
+pytestmark = pytest.mark.benchmark
+
+
+@pytest.fixture(scope='module')
+def catalog(tmp_path_factory):
+    return prepare_catalog(str(tmp_path_factory.mktemp('bench')), SCALE)
+
+
+@pytest.mark.parametrize('name', sorted(BENCHMARKS))
+def test_hot_path(name, catalog, tmp_path):
+    _, uses_catalog, _ = BENCHMARKS[name]
+    result = run_benchmark(name, catalog if uses_catalog else str(tmp_path), iterations=5, warmup=1)
+    print(f"\n{name}: {result['ops_per_sec']:.1f} ops/s, p50 {result['p50_ms']:.2f} ms, "
+          f"p99 {result['p99_ms']:.2f} ms, peak {result['peak_mib']:.1f} MiB")
+    assert result['ops_per_sec'] > 0
+    assert result['p50_ms'] <= result['p99_ms']
@@ -0,0 +1,66 @@
+"""Gunicorn settings for production: ``gunicorn -c gunicorn.conf.py``.
+
+Every setting can be overridden from the environment (see README).
+"""
+import os
+import tempfile
+
+wsgi_app = 'app:app'
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+# Threads suit the workload: most request time is spent waiting on the image
+# host, SQLite or the transcoder pool, all of which release the GIL.
+# gevent also works (GUNICORN_WORKER_CLASS=gevent, needs the gevent package).
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+
+# Import the app once in the master so workers share its pages copy-on-write.
+# Pools, threads and database connections are created lazily per process.
+preload_app = True
+
+# Recycle workers now and then to cap slow leaks; jitter keeps them from
+# restarting together
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+# Time a stopping worker gets to drain upload jobs before it is killed
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+# All workers append to the same log file, and a size-based rotation in one
+# of them would pull the file out from under the others. Leave rotation to
+# logrotate instead; the workers reopen the file once it has been moved.
+os.environ.setdefault('LOG_MAX_BYTES', '0')
+
+# Workers publish their metrics here so /metrics and /health cover all of
+# them, not whichever worker answered. Set before the app is loaded.
+os.environ.setdefault('METRICS_DIR', tempfile.mkdtemp(prefix='swapsnap-metrics-'))
+
+
+def on_starting(server):
+    """Drop metrics left over from an earlier run of the server."""
+    directory = os.environ['METRICS_DIR']
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            os.unlink(path)
+
+
+def worker_exit(server, worker):
+    """Finish queued uploads and flush buffered writes, metrics and logs before the worker exits."""
+    from app import app, shutdown_app
+    from modules.log_config import stop_logging
+    from modules.metrics import write_snapshot
+
+    try:
+        shutdown_app(app)
+        write_snapshot(collect=False)
+    except Exception as e:
+        server.log.error(f"Error draining worker {worker.pid}: {str(e)}")
+    stop_logging()
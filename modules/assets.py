@@ -0,0 +1,216 @@
+import glob
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import tempfile
+import threading
+
+import click
+import htmlmin
+import rcssmin
+from flask import Blueprint, abort, current_app, request, send_file, url_for
+from jinja2 import BaseLoader
+from werkzeug.security import safe_join
+
+from .extensions import limiter
+from .static_delivery import IMMUTABLE_MAX_AGE, file_etag
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+assets_bp = Blueprint('assets', __name__, cli_group='assets')
+logger = logging.getLogger(__name__)
+
+# Source patterns under the static folder that get a hashed, compressed build
+ASSET_PATTERNS = ('js/*.js', 'css/*.css')
+MANIFEST = 'manifest.json'
+HASH_LENGTH = 16
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+# Tried in order against the client's Accept-Encoding
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+_build_lock = threading.Lock()
+
+
+def minify(path, data):
+    """Minify CSS; other files, JS included, pass through unchanged.
+
+    The Python JS minifiers collapse whitespace inside ES2015 template
+    literals (breaking srcset strings and generated markup), so JS only
+    gets compressed.
+    """
+    if path.endswith('.css'):
+        return rcssmin.cssmin(data.decode('utf-8')).encode('utf-8')
+    return data
+
+
+def minify_html(source):
+    """Minify an HTML template, leaving Jinja tags and inline scripts alone."""
+    return htmlmin.minify(source, remove_comments=True, remove_empty_space=True)
+
+
+def hashed_name(path, data):
+    """``js/app.js`` -> ``js/app.<content hash>.js``."""
+    root, ext = os.path.splitext(path)
+    return f'{root}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}'
+
+
+def _write(path, data):
+    """Write ``path`` atomically; content-hashed outputs are never rewritten."""
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def compress(data):
+    """Precompressed variants of ``data`` keyed by file suffix."""
+    variants = {'.gz': gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=BROTLI_QUALITY)
+    return variants
+
+
+def build_assets(static_folder, output_folder, prune=False):
+    """Minify, hash and precompress the static assets into ``output_folder``.
+
+    Returns the manifest mapping source paths (``js/photo_manager.js``) to
+    built names, which is also written to ``manifest.json``. Outputs are
+    only ever added, so processes building into the same folder, or still
+    serving an older build, never lose files. ``prune`` removes everything
+    this build did not produce; only use it when nothing else serves from
+    ``output_folder``, e.g. at deploy time.
+    """
+    manifest = {}
+    keep = {MANIFEST}
+    for pattern in ASSET_PATTERNS:
+        for source in sorted(glob.glob(os.path.join(static_folder, pattern))):
+            path = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                data = minify(path, f.read())
+            name = manifest[path] = hashed_name(path, data)
+            _write(os.path.join(output_folder, name), data)
+            keep.add(name)
+            for suffix, compressed in compress(data).items():
+                # Only worth serving when it actually saves bytes
+                if len(compressed) < len(data):
+                    _write(os.path.join(output_folder, name + suffix), compressed)
+                    keep.add(name + suffix)
+
+    if prune:
+        for directory, _, files in os.walk(output_folder):
+            for filename in files:
+                path = os.path.relpath(os.path.join(directory, filename), output_folder).replace(os.sep, '/')
+                if path not in keep:
+                    os.unlink(os.path.join(directory, filename))
+
+    fd, tmp = tempfile.mkstemp(dir=output_folder, prefix='.tmp-')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, os.path.join(output_folder, MANIFEST))
+    return manifest
+
+
+def load_manifest(output_folder):
+    try:
+        with open(os.path.join(output_folder, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class MinifyingLoader(BaseLoader):
+    """Wraps a template loader and minifies HTML templates as they load.
+
+    Jinja caches the compiled result, so each template is minified once per
+    process (and again only when its source changes under auto-reload).
+    """
+
+    def __init__(self, loader):
+        self.loader = loader
+
+    def get_source(self, environment, template):
+        source, filename, uptodate = self.loader.get_source(environment, template)
+        if template.endswith('.html'):
+            source = minify_html(source)
+        return source, filename, uptodate
+
+    def list_templates(self):
+        return self.loader.list_templates()
+
+
+def asset_url(path):
+    """URL of the built asset for ``path``, or the plain static file if unbuilt."""
+    name = current_app.extensions.get('assets', {}).get(path)
+    if name is None:
+        return url_for('static', filename=path)
+    return url_for('assets.asset', filename=name)
+
+
+def init_app(app):
+    """Build the assets (unless ``ASSETS_BUILD`` is off) and serve them.
+
+    With gunicorn's ``preload_app`` the build runs once, in the master. A
+    deploy that ran ``flask assets build`` starts with ``ASSETS_BUILD`` off
+    and only loads the manifest.
+    """
+    output_folder = app.config['ASSETS_FOLDER']
+    if app.config.get('ASSETS_BUILD', True):
+        with _build_lock:
+            os.makedirs(output_folder, exist_ok=True)
+            manifest = build_assets(app.static_folder, output_folder)
+        logger.info(f"Built {len(manifest)} static assets into {output_folder}")
+    else:
+        manifest = load_manifest(output_folder)
+    app.extensions['assets'] = manifest
+    app.jinja_loader = MinifyingLoader(app.jinja_loader)
+    app.jinja_env.globals['asset_url'] = asset_url
+    app.register_blueprint(assets_bp)
+
+
+@assets_bp.route('/assets/<path:filename>')
+@limiter.exempt
+def asset(filename):
+    """Serve a built asset, precompressed when the client accepts it."""
+    folder = current_app.config['ASSETS_FOLDER']
+    path = safe_join(folder, filename)
+    if path is None or filename == MANIFEST or not os.path.isfile(path):
+        abort(404)
+
+    encoding = None
+    for name, suffix in ENCODINGS:
+        if request.accept_encodings[name] and os.path.isfile(path + suffix):
+            encoding, path = name, path + suffix
+            break
+
+    response = send_file(path, mimetype=mimetypes.guess_type(filename)[0],
+                         etag=file_etag(path), conditional=True)
+    if encoding:
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return response
+
+
+@assets_bp.cli.command('build')
+@click.option('--prune', is_flag=True, help='Delete earlier builds; only while no server is using them.')
+def build_command(prune):
+    """Build the minified, hashed and precompressed static assets."""
+    output_folder = current_app.config['ASSETS_FOLDER']
+    os.makedirs(output_folder, exist_ok=True)
+    manifest = build_assets(current_app.static_folder, output_folder, prune=prune)
+    for path, name in sorted(manifest.items()):
+        click.echo(f'{path} -> {name}')
@@ -0,0 +1,134 @@
+import json
+import logging
+import math
+import os
+import re
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024  # 1MB
+MIN_CHUNK_SIZE = 256 * 1024
+MAX_CHUNK_SIZE = 8 * 1024 * 1024  # stays well under MAX_CONTENT_LENGTH
+WRITE_BUFFER_SIZE = 64 * 1024
+UPLOAD_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class ChunkError(Exception):
+    """Raised when a chunk does not fit the upload it is sent to."""
+
+
+class ChunkedUploadStore:
+    """Resumable uploads assembled in place on disk.
+
+    Each upload is three files under ``folder``: ``<id>.json`` (filename,
+    size, chunk size), ``<id>.part`` (the sparse target file chunks are
+    written into at their offsets) and ``<id>.map`` (one byte per chunk, set
+    once that chunk is fully on disk). Nothing is kept in memory, so chunks
+    of one upload may land on different worker processes.
+    """
+
+    def __init__(self, folder, ttl=24 * 3600):
+        self.folder = folder
+        self.ttl = ttl
+        os.makedirs(folder, exist_ok=True)
+
+    def _path(self, upload_id, suffix):
+        return os.path.join(self.folder, f'{upload_id}.{suffix}')
+
+    def create(self, filename, size, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Start an upload of ``size`` bytes and return its session."""
+        upload_id = uuid.uuid4().hex
+        session = {
+            'id': upload_id,
+            'filename': filename,
+            'size': size,
+            'chunk_size': chunk_size,
+            'total_chunks': max(math.ceil(size / chunk_size), 1),
+            'created': time.time(),
+        }
+        with open(self._path(upload_id, 'part'), 'wb') as f:
+            f.truncate(size)
+        with open(self._path(upload_id, 'map'), 'wb') as f:
+            f.write(bytes(session['total_chunks']))
+        temp_path = self._path(upload_id, 'json.tmp')
+        with open(temp_path, 'w') as f:
+            json.dump(session, f)
+        # The manifest appears last, so a visible session is always complete
+        os.replace(temp_path, self._path(upload_id, 'json'))
+        return session
+
+    def get(self, upload_id):
+        if not UPLOAD_ID.match(upload_id):
+            return None
+        try:
+            with open(self._path(upload_id, 'json'), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def chunk_length(self, session, index):
+        """Expected byte length of chunk ``index``."""
+        if not 0 <= index < session['total_chunks']:
+            raise ChunkError(f"Chunk index out of range (0-{session['total_chunks'] - 1})")
+        start = index * session['chunk_size']
+        return min(session['chunk_size'], session['size'] - start)
+
+    def write_chunk(self, session, index, stream):
+        """Copy chunk ``index`` from ``stream`` straight to its offset in the part file."""
+        expected = self.chunk_length(session, index)
+        offset = index * session['chunk_size']
+        written = 0
+        fd = os.open(self._path(session['id'], 'part'), os.O_WRONLY)
+        try:
+            while written <= expected:
+                data = stream.read(min(WRITE_BUFFER_SIZE, expected + 1 - written))
+                if not data:
+                    break
+                if written + len(data) > expected:
+                    raise ChunkError(f'Chunk is larger than {expected} bytes')
+                os.pwrite(fd, data, offset + written)
+                written += len(data)
+            if written != expected:
+                raise ChunkError(f'Chunk is {written} bytes, expected {expected}')
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        # Mark the chunk only once its bytes are durable
+        fd = os.open(self._path(session['id'], 'map'), os.O_WRONLY)
+        try:
+            os.pwrite(fd, b'\x01', index)
+        finally:
+            os.close(fd)
+
+    def missing(self, session):
+        """Indexes of chunks not received yet."""
+        with open(self._path(session['id'], 'map'), 'rb') as f:
+            received = f.read()
+        return [index for index, flag in enumerate(received) if not flag]
+
+    def open(self, session):
+        """Open the assembled file for reading."""
+        return open(self._path(session['id'], 'part'), 'rb')
+
+    def discard(self, upload_id):
+        for suffix in ('json', 'map', 'part'):
+            try:
+                os.unlink(self._path(upload_id, suffix))
+            except FileNotFoundError:
+                pass
+
+    def prune(self, now=None):
+        """Discard uploads started more than ``ttl`` seconds ago."""
+        cutoff = (now or time.time()) - self.ttl
+        for name in os.listdir(self.folder):
+            upload_id, _, suffix = name.partition('.')
+            if suffix != 'json':
+                continue
+            try:
+                if os.path.getmtime(os.path.join(self.folder, name)) < cutoff:
+                    self.discard(upload_id)
+                    logger.info(f"Discarded expired chunked upload {upload_id}")
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,67 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class SQLiteDatabase:
+    """Thread-local SQLite connections with WAL journaling.
+
+    Each thread (and each forked worker) gets its own connection, so the
+    same instance can be shared by request threads and background workers.
+    """
+
+    def __init__(self, path, schema=''):
+        self.path = path
+        self._local = threading.local()
+        self._pid = os.getpid()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if schema:
+            self.connection().executescript(schema)
+
+    def connection(self):
+        """Return the calling thread's connection, opening it if needed."""
+        if self._pid != os.getpid():
+            # Connections must never cross a fork
+            self._local = threading.local()
+            self._pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def execute(self, sql, params=()):
+        return self.connection().execute(sql, params)
+
+    @contextmanager
+    def transaction(self):
+        """Run a block inside an immediate (write-locking) transaction."""
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def size(self):
+        """Return the on-disk size of the database and its WAL in bytes."""
+        total = 0
+        for suffix in ('', '-wal'):
+            try:
+                total += os.path.getsize(self.path + suffix)
+            except OSError:
+                pass
+        return total
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
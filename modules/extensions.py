@@ -0,0 +1,11 @@
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+
+DEFAULT_LIMITS = ["200 per day", "50 per hour"]
+# Shared by every upload endpoint and charged per image, not per request
+UPLOAD_LIMITS = "200 per day;50 per hour"
+
+limiter = Limiter(
+    key_func=get_remote_address,
+    default_limits=DEFAULT_LIMITS
+)
@@ -0,0 +1,242 @@
+import logging
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .metrics import register_section, worker_sections
+
+logger = logging.getLogger(__name__)
+
+# Responses worth retrying: throttling and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Most severe first, for reporting several workers' breakers as one
+BREAKER_STATES = ('open', 'half_open', 'closed')
+
+
+class CircuitOpenError(Exception):
+    """Raised without touching the network while the breaker is open."""
+
+
+class RetryableStatus(Exception):
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+class CircuitBreaker:
+    """Fails fast after repeated failures, then lets a single probe through.
+
+    ``closed`` -> ``open`` after ``failure_threshold`` consecutive failures;
+    after ``reset_timeout`` seconds one request is allowed (``half_open``),
+    and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self.rejected = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+                self._probing = False
+            if self.state == 'closed':
+                return True
+            if self.state == 'half_open' and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.times_opened += 1
+                    logger.warning("Image host circuit breaker opened")
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected,
+            }
+
+
+class ImageHostClient:
+    """Connection-pooled HTTP client for the image host.
+
+    Keeps TCP/TLS connections alive across uploads, bounds every request
+    with connect/read timeouts, retries transient failures with jittered
+    exponential backoff and trips a :class:`CircuitBreaker` when the host
+    keeps failing.
+    """
+
+    def __init__(self, pool_size=10, connect_timeout=3.05, read_timeout=30,
+                 retries=2, backoff=0.5, breaker=None):
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.pool_size = pool_size
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+        self.counters = {'requests': 0, 'attempts': 0, 'retries': 0, 'failures': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def post(self, url, body, headers=None):
+        """POST ``body`` (anything with ``rewind()`` and ``read()``) to ``url``."""
+        if not self.breaker.allow():
+            raise CircuitOpenError('Image host circuit is open')
+        self._count('requests')
+        try:
+            response = self._send(url, body, headers)
+        except BaseException:
+            # Whatever went wrong, the breaker hears about it; a half-open
+            # probe that never reports would keep the circuit shut for good
+            self._count('failures')
+            self.breaker.record_failure()
+            raise
+        if response.status_code in RETRY_STATUSES:
+            self._count('failures')
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def _send(self, url, body, headers):
+        """Try the request, retrying transient failures; other errors propagate.
+
+        A read timeout is not retried: the host may have stored the image
+        already, and sending it again would upload a duplicate. Connect
+        timeouts are ``ConnectionError`` subclasses and are retried.
+        """
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self._count('retries')
+                time.sleep(self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+            self._count('attempts')
+            try:
+                body.rewind()
+                response = self.session.post(url, data=body, headers=headers, timeout=self.timeout)
+                if response.status_code in RETRY_STATUSES:
+                    raise RetryableStatus(response)
+                return response
+            except (requests.ConnectionError, RetryableStatus) as e:
+                logger.warning(f"Image host attempt {attempt + 1} failed: {str(e)}")
+                error = e
+        if isinstance(error, RetryableStatus):
+            return error.response
+        raise error
+
+    def pool_stats(self):
+        pools = self.adapter.poolmanager.pools
+        # A pool can be evicted between listing and looking it up
+        pools = [pool for pool in (pools.get(key) for key in pools.keys()) if pool is not None]
+        return {
+            'max_size': self.pool_size,
+            'hosts': len(pools),
+            'connections_opened': sum(pool.num_connections for pool in pools),
+            'idle_connections': sum(pool.pool.qsize() for pool in pools if pool.pool is not None),
+        }
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        return {**counters, 'pool': self.pool_stats(), 'breaker': self.breaker.stats()}
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_image_host_client():
+    """Get this process's shared image host client, configured from the environment."""
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = ImageHostClient(
+                pool_size=int(os.getenv('IMGBB_POOL_SIZE', 10)),
+                connect_timeout=float(os.getenv('IMGBB_CONNECT_TIMEOUT', 3.05)),
+                read_timeout=float(os.getenv('IMGBB_READ_TIMEOUT', 30)),
+                retries=int(os.getenv('IMGBB_RETRIES', 2)),
+                backoff=float(os.getenv('IMGBB_RETRY_BACKOFF', 0.5)),
+                breaker=CircuitBreaker(
+                    failure_threshold=int(os.getenv('IMGBB_BREAKER_THRESHOLD', 5)),
+                    reset_timeout=float(os.getenv('IMGBB_BREAKER_RESET', 30)),
+                ),
+            )
+            _client_pid = os.getpid()
+        return _client
+
+
+def image_host_stats():
+    """Stats of the shared client, or None if no upload has used it yet."""
+    return _client.stats() if _client is not None and _client_pid == os.getpid() else None
+
+
+def combine_image_host_stats(reports):
+    """Add up the image host stats of several workers (None from those that never uploaded)."""
+    reports = [report for report in reports if report is not None]
+    if not reports:
+        return None
+    combined = {name: sum(report[name] for report in reports) for name in ('requests', 'attempts', 'retries', 'failures')}
+    pools = [report['pool'] for report in reports]
+    combined['pool'] = {
+        'max_size': pools[0]['max_size'],
+        'hosts': max(pool['hosts'] for pool in pools),
+        'connections_opened': sum(pool['connections_opened'] for pool in pools),
+        'idle_connections': sum(pool['idle_connections'] for pool in pools),
+    }
+    breakers = [report['breaker'] for report in reports]
+    states = [breaker['state'] for breaker in breakers]
+    combined['breaker'] = {
+        'state': next(state for state in BREAKER_STATES if state in states),
+        'open_workers': states.count('open'),
+        'consecutive_failures': max(breaker['consecutive_failures'] for breaker in breakers),
+        'times_opened': sum(breaker['times_opened'] for breaker in breakers),
+        'rejected': sum(breaker['rejected'] for breaker in breakers),
+    }
+    combined['workers'] = len(reports)
+    return combined
+
+
+def all_image_host_stats():
+    """Image host stats added up across the server's worker processes."""
+    return combine_image_host_stats(worker_sections('image_host'))
+
+
+register_section('image_host', image_host_stats)
@@ -1,29 +1,90 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, url_for, g, stream_with_context
 from werkzeug.utils import secure_filename
 from PIL import Image, UnidentifiedImageError
 import os
 import logging
 from io import BytesIO
 from datetime import datetime
-import requests
-import base64
+import uuid
 import json
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 import humanize
 from .photo_manager import save_photo_metadata
 
+try:
+    # Registers the AVIF encoder with Pillow when installed
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+from .upload_jobs import UploadJobQueue, UploadJobStore, UploadQueueFull
+from .transcoder import TranscodePool, TranscoderBusy
+from .http_client import get_image_host_client
+from .upload_cache import SQLiteUploadCache
+from .storage_backends import ImgBBStorage, LocalStorage
+from .extensions import limiter, UPLOAD_LIMITS
+from .metrics import Counter, Gauge, Histogram, register_collector
+from .log_config import log_stage
+from .image_probe import DEFAULT_MAX_FRAMES, DEFAULT_MAX_PIXELS, ImageRejected, probe_image
+from .chunked_uploads import ChunkedUploadStore, ChunkError, DEFAULT_CHUNK_SIZE, MIN_CHUNK_SIZE, MAX_CHUNK_SIZE
+
 image_bp = Blueprint('image', __name__, url_prefix='/api')
 logger = logging.getLogger(__name__)
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+SERVED_EXTENSIONS = ALLOWED_EXTENSIONS | {'avif'}  # derivatives may be AVIF
 MAX_WIDTH = 1920
 MAX_HEIGHT = 1080
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+IMAGES_DIR = 'images'
+DERIVATIVES_DIR = 'derivatives'
+CHUNKS_DIR = 'chunks'
+UPLOAD_JOBS_DB = 'upload_jobs.db'
+UPLOAD_CACHE_DB = 'upload_cache.db'
+DERIVATIVE_FORMATS = [('AVIF', {'quality': 60}), ('WEBP', {'quality': 80, 'method': 4})]
+RESIZE_REDUCING_GAP = 3.0  # box-reduce first while the image is over 3x the target size
+IMGBB_UPLOAD_URL = "https://api.imgbb.com/1/upload"
+MAX_BATCH_FILES = 50  # images per batch request, zip members included
+
+UPLOAD_STAGE_SECONDS = Histogram(
+    'swapsnap_upload_stage_seconds', 'Time spent in each upload pipeline stage.', ['stage']
+)
+UPLOADS = Counter('swapsnap_uploads_total', 'Upload pipeline runs by result.', ['result'])
+UPLOAD_CACHE_ENTRIES = Gauge(
+    'swapsnap_upload_cache_entries', 'Uploads remembered by the duplicate cache.', multiprocess_mode='max'
+)
+UPLOAD_CACHE_HIT_RATIO = Gauge(
+    'swapsnap_upload_cache_hit_ratio', 'Share of uploads found in the duplicate cache.', multiprocess_mode='mean'
+)
+QUEUE_DEPTH = Gauge('swapsnap_queue_depth', 'Work queued or in progress, by queue.', ['queue'])
+
+def record_stage(stage, seconds):
+    """Count a pipeline stage's duration in /metrics and the request's log record."""
+    UPLOAD_STAGE_SECONDS.observe(seconds, stage=stage)
+    log_stage(stage, seconds)
+
+@contextmanager
+def upload_stage(stage):
+    """Time the ``with`` block as pipeline stage ``stage``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def servable_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in SERVED_EXTENSIONS
+
 def get_image_details(img, file_size):
-    """Get image details including dimensions, size, and format."""
+    """Get image details including dimensions, size, and format.
+
+    ``img`` is an image or the ``ImageInfo`` from probing its header.
+    """
     return {
         'width': img.width,
         'height': img.height,
@@ -32,6 +93,59 @@ def get_image_details(img, file_size):
         'aspect_ratio': f"{img.width}:{img.height}"
     }
 
+class MultipartBody:
+    """A multipart/form-data request body that streams an image buffer.
+
+    The image is exposed through a memoryview of the buffer, so neither a
+    base64 string nor a joined copy of the whole body is ever built; the HTTP
+    client reads it in small blocks.
+    """
+
+    def __init__(self, fields, file_field, filename, buffer):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={self.boundary}'
+        head = ''.join(
+            f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+            for name, value in fields.items()
+        )
+        head += (
+            f'--{self.boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'
+        )
+        self._parts = [
+            memoryview(head.encode('utf-8')),
+            memoryview(buffer).cast('B'),
+            memoryview(f'\r\n--{self.boundary}--\r\n'.encode('utf-8')),
+        ]
+        self._length = sum(part.nbytes for part in self._parts)
+        self.rewind()
+
+    def __len__(self):
+        return self._length
+
+    def rewind(self):
+        self._part = 0
+        self._offset = 0
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self._length
+        chunks = []
+        while size > 0 and self._part < len(self._parts):
+            part = self._parts[self._part]
+            chunk = part[self._offset:self._offset + size]
+            chunks.append(chunk)
+            size -= chunk.nbytes
+            self._offset += chunk.nbytes
+            if self._offset >= part.nbytes:
+                self._part += 1
+                self._offset = 0
+        return b''.join(chunks)
+
+    def close(self):
+        for part in self._parts:
+            part.release()
+
 def upload_to_imgbb(image_data):
     """Upload image to imgbb and return the URL."""
     try:
@@ -40,17 +154,13 @@ def upload_to_imgbb(image_data):
             logger.error("IMGBB_API_KEY not found in environment variables")
             return None
 
-        # Convert image data to base64
-        base64_image = base64.b64encode(image_data.getvalue()).decode('utf-8')
-
-        # Upload to imgbb
-        url = "https://api.imgbb.com/1/upload"
-        payload = {
-            "key": imgbb_key,
-            "image": base64_image,
-        }
-
-        response = requests.post(url, data=payload)
+        # Stream the processed buffer as a binary multipart field
+        url = os.getenv('IMGBB_UPLOAD_URL', IMGBB_UPLOAD_URL)
+        body = MultipartBody({'key': imgbb_key}, 'image', 'image', image_data.getbuffer())
+        try:
+            response = get_image_host_client().post(url, body, headers={'Content-Type': body.content_type})
+        finally:
+            body.close()
         response.raise_for_status()
         
         data = response.json()
@@ -69,34 +179,97 @@ def upload_to_imgbb(image_data):
         logger.error(f"Error uploading to imgbb: {str(e)}")
         return None
 
-def process_image(image_file):
+def derivative_formats():
+    """Derivative encoders available in this Pillow build, preferred first."""
+    Image.init()
+    return [(fmt, options) for fmt, options in DERIVATIVE_FORMATS if fmt in Image.SAVE]
+
+def render_derivatives(img, widths):
+    """Encode ``img`` at each of ``widths`` in every derivative format.
+
+    Sizes are produced largest first and each one is resampled from the
+    previous size, not from the full image, so no work is repeated. Widths
+    above the image's own width are clamped (never upscaled).
+    """
+    formats = derivative_formats()
+    derivatives = []
+    current = img
+    for width in sorted({min(int(w), img.width) for w in widths}, reverse=True):
+        if width != current.width:
+            height = max(round(img.height * width / img.width), 1)
+            current = current.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=RESIZE_REDUCING_GAP)
+        for fmt, options in formats:
+            output = BytesIO()
+            current.save(output, format=fmt, **options)
+            derivatives.append({
+                'width': current.width,
+                'height': current.height,
+                'format': fmt.lower(),
+                'data': output.getvalue()
+            })
+    return derivatives
+
+def process_image(image_file, derivative_widths=None, probe=None):
+    """Decode, flatten, resize and re-encode an upload.
+
+    With ``derivative_widths``, ``processed_details['derivatives']`` also
+    holds the encoded responsive variants (see ``render_derivatives``).
+    ``probe`` is the upload's already checked header; without it the header
+    is probed here with the default limits before anything is decoded.
+    """
+    # Stage durations travel back with the details, since this may run in a
+    # transcoder process whose metrics would never be scraped
+    timings = {}
+    clock = time.perf_counter()
+    def lap(stage):
+        nonlocal clock
+        now = time.perf_counter()
+        timings[stage] = now - clock
+        clock = now
+
     try:
         # Get original file size
         image_file.seek(0, os.SEEK_END)
         original_size = image_file.tell()
         image_file.seek(0)
 
-        img = Image.open(image_file)
+        if probe is None:
+            probe = probe_image(image_file)
+        img = Image.open(image_file, formats=[probe.format])
         original_format = img.format
         
         # Get original image details
-        original_details = get_image_details(img, original_size)
+        original_details = get_image_details(probe, original_size)
+        
+        # Target size for images larger than the limits, keeping aspect ratio
+        new_size = None
+        if img.width > MAX_WIDTH or img.height > MAX_HEIGHT:
+            ratio = min(MAX_WIDTH/img.width, MAX_HEIGHT/img.height)
+            new_size = (int(img.width * ratio), int(img.height * ratio))
+            if original_format == 'JPEG':
+                # Let the JPEG decoder downscale by 1/2, 1/4 or 1/8 in the DCT
+                # domain; it never goes below the requested size
+                img.draft('RGB', new_size)
+        img.load()
+        lap('decode')
         
         # Convert RGBA to RGB if necessary
         if img.mode == 'RGBA':
+            # getchannel copies only the alpha band, where split() copies all four
             background = Image.new('RGB', img.size, (255, 255, 255))
-            background.paste(img, mask=img.split()[3])
+            background.paste(img, mask=img.getchannel('A'))
+            img.close()
             img = background
         elif img.mode != 'RGB':
             img = img.convert('RGB')
+        lap('flatten')
         
-        # Resize if needed while maintaining aspect ratio
+        # Resize if needed; reducing_gap box-reduces first, then LANCZOS
         resized = False
-        if img.width > MAX_WIDTH or img.height > MAX_HEIGHT:
-            ratio = min(MAX_WIDTH/img.width, MAX_HEIGHT/img.height)
-            new_size = (int(img.width * ratio), int(img.height * ratio))
-            img = img.resize(new_size, Image.Resampling.LANCZOS)
+        if new_size is not None:
+            img = img.resize(new_size, Image.Resampling.LANCZOS, reducing_gap=RESIZE_REDUCING_GAP)
             resized = True
+        lap('resize')
         
         # Save with optimization
         output = BytesIO()
@@ -110,25 +283,233 @@ def process_image(image_file):
             img.save(output, format=save_format)
             
         output.seek(0)
+        lap('encode')
         
         # Get processed file size
         processed_size = output.getbuffer().nbytes
         
         # Get processed image details
         processed_details = get_image_details(img, processed_size)
+        processed_details['format'] = save_format.lower()
         processed_details['resized'] = resized
         processed_details['compression_ratio'] = f"{(1 - processed_size/original_size) * 100:.1f}%"
+        if derivative_widths:
+            processed_details['derivatives'] = render_derivatives(img, derivative_widths)
+            lap('derivatives')
+        processed_details['timings'] = timings
         
         return output, original_details, processed_details
         
-    except UnidentifiedImageError as e:
+    except (UnidentifiedImageError, ImageRejected) as e:
         logger.error(f"Error processing image: {str(e)}")
         return None, None, None
     except Exception as e:
         logger.error(f"Unexpected error processing image: {str(e)}")
         return None, None, None
 
+def get_transcoder():
+    """Get the process pool transcoder, or None when transcoding runs inline."""
+    workers = current_app.config.get('TRANSCODE_WORKERS', 0)
+    if not workers:
+        return None
+    transcoder = current_app.extensions.get('transcoder')
+    if transcoder is None:
+        transcoder = current_app.extensions.setdefault('transcoder', TranscodePool(
+            workers,
+            max_pending=current_app.config.get('TRANSCODE_QUEUE_DEPTH'),
+            wait_timeout=current_app.config.get('TRANSCODE_QUEUE_TIMEOUT', 5)
+        ))
+    return transcoder
+
+def transcode_image(image_file, derivative_widths=None, probe=None):
+    """Run ``process_image`` in the transcoding pool if enabled, else inline."""
+    transcoder = get_transcoder()
+    if transcoder is None:
+        return process_image(image_file, derivative_widths, probe)
+    return transcoder.process(image_file.read(), derivative_widths, probe)
+
+def probe_upload(image_file, filename):
+    """Check an upload's header against the configured limits; raises ``ImageRejected``."""
+    return probe_image(
+        image_file, filename,
+        max_pixels=current_app.config.get('IMAGE_MAX_PIXELS', DEFAULT_MAX_PIXELS),
+        max_frames=current_app.config.get('IMAGE_MAX_FRAMES', DEFAULT_MAX_FRAMES)
+    )
+
+def get_storage_backend():
+    """Get the storage backend that receives processed images."""
+    backend = current_app.config.get('STORAGE_BACKEND', 'imgbb')
+    if backend == 'imgbb':
+        return ImgBBStorage()
+    if backend == 'local':
+        return LocalStorage(os.path.join(current_app.config['UPLOAD_FOLDER'], IMAGES_DIR), f'/uploads/{IMAGES_DIR}')
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+def save_derivatives(derivatives):
+    """Write derivative images to local storage and describe them for metadata."""
+    storage = LocalStorage(os.path.join(current_app.config['UPLOAD_FOLDER'], DERIVATIVES_DIR), f'/uploads/{DERIVATIVES_DIR}')
+    return [
+        {
+            'width': derivative['width'],
+            'height': derivative['height'],
+            'format': derivative['format'],
+            'url': storage.put(derivative['data'], derivative['format'])
+        }
+        for derivative in derivatives
+    ]
+
+def get_upload_cache():
+    """Get the duplicate-upload cache for the current app, shared by its workers."""
+    path = os.path.join(current_app.config['UPLOAD_FOLDER'], UPLOAD_CACHE_DB)
+    cache = current_app.extensions.get('upload_cache')
+    if cache is None or cache.path != path:
+        cache = current_app.extensions['upload_cache'] = SQLiteUploadCache(
+            path,
+            current_app.config.get('UPLOAD_CACHE_SIZE', 10000),
+            perceptual=current_app.config.get('UPLOAD_CACHE_PERCEPTUAL', False)
+        )
+    return cache
+
+def run_upload_pipeline(image_file, original_filename, progress=None):
+    """Process an image, push it to the image host and save its metadata.
+
+    ``progress`` is called with the name of each stage as it starts. Returns
+    a ``(response_data, status_code)`` tuple.
+    """
+    def report(stage):
+        if progress is not None:
+            progress(stage)
+
+    # Header checks first: bad files and decompression bombs never get decoded
+    try:
+        with upload_stage('probe'):
+            probe = probe_upload(image_file, original_filename)
+    except ImageRejected as e:
+        UPLOADS.inc(result='rejected')
+        return {'error': str(e)}, 400
+
+    # Re-uploads of a known picture skip processing and the image host
+    cache = get_upload_cache()
+    with upload_stage('hash'):
+        cached, cache_keys = cache.lookup(image_file)
+    if cached is not None:
+        UPLOADS.inc(result='duplicate')
+        return {**cached, 'duplicate': True}, 200
+
+    # Process the image
+    report('processing')
+    try:
+        # Includes any wait for a transcoder slot
+        with upload_stage('transcode'):
+            processed_image, original_details, processed_details = transcode_image(
+                image_file, current_app.config.get('DERIVATIVE_WIDTHS'), probe
+            )
+    except TranscoderBusy:
+        UPLOADS.inc(result='busy')
+        return {'error': 'Server is busy, please try again shortly'}, 503
+    if processed_image is None:
+        UPLOADS.inc(result='invalid')
+        return {'error': 'Error processing image'}, 400
+    for stage, seconds in processed_details.pop('timings', {}).items():
+        record_stage(stage, seconds)
+
+    # Hand over to the storage backend (imgbb or local disk)
+    report('uploading')
+    with upload_stage('store'):
+        upload_result = get_storage_backend().save(processed_image, processed_details['format'], processed_details)
+    if not upload_result:
+        UPLOADS.inc(result='store_failed')
+        return {'error': 'Error uploading to image host'}, 500
+
+    # Create response data
+    timestamp = datetime.now().isoformat()
+    filename = secure_filename(f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{original_filename}")
+
+    photo_data = {
+        'success': True,
+        'url': upload_result['url'],
+        'thumbnail': upload_result['thumbnail'] or upload_result['url'],
+        'filename': filename,
+        'timestamp': timestamp,
+        'details': {
+            'original': original_details,
+            'processed': {
+                'width': upload_result['width'],
+                'height': upload_result['height'],
+                'size': humanize.naturalsize(upload_result['size']),
+                'format': os.path.splitext(original_filename)[1][1:].lower()
+            }
+        }
+    }
+
+    # Responsive variants for srcset
+    derivatives = processed_details.get('derivatives')
+    if derivatives:
+        try:
+            with upload_stage('save_derivatives'):
+                photo_data['derivatives'] = save_derivatives(derivatives)
+            if not upload_result['thumbnail']:
+                # No host thumbnail; use the smallest derivative
+                photo_data['thumbnail'] = min(photo_data['derivatives'], key=lambda d: d['width'])['url']
+        except OSError as e:
+            logger.warning(f"Failed to save derivatives: {str(e)}")
+
+    # Save metadata
+    report('saving')
+    with upload_stage('save_metadata'):
+        saved = save_photo_metadata(photo_data)
+    if saved:
+        cache.add(cache_keys, photo_data)
+    else:
+        # Not cached: a retry must save the photo rather than answer with
+        # one that is missing from the catalog
+        logger.warning("Failed to save photo metadata")
+    UPLOADS.inc(result='success')
+
+    return photo_data, 200
+
+@register_collector
+def collect_upload_metrics():
+    """Refresh upload cache and queue gauges for a scrape."""
+    cache = current_app.extensions.get('upload_cache')
+    if cache is not None:
+        stats = cache.stats()
+        UPLOAD_CACHE_ENTRIES.set(stats['entries'])
+        UPLOAD_CACHE_HIT_RATIO.set(stats['hit_rate'])
+    jobs = current_app.extensions.get('upload_jobs', {}).values()
+    QUEUE_DEPTH.set(sum(queue.pending() for queue in list(jobs)), queue='upload_jobs')
+    transcoder = current_app.extensions.get('transcoder')
+    QUEUE_DEPTH.set(transcoder.pending() if transcoder is not None else 0, queue='transcoder')
+
+def get_job_queue():
+    """Get the background upload job queue for the current app.
+
+    Job status is kept in a SQLite file in the upload folder, so any worker
+    can answer a poll for a job another worker is running.
+    """
+    path = os.path.join(current_app.config['UPLOAD_FOLDER'], UPLOAD_JOBS_DB)
+    queues = current_app.extensions.setdefault('upload_jobs', {})
+    queue = queues.get(path)
+    if queue is None:
+        queue = queues.setdefault(path, UploadJobQueue(
+            UploadJobStore(path),
+            max_workers=current_app.config.get('UPLOAD_WORKERS', 4),
+            max_pending=current_app.config.get('UPLOAD_QUEUE_DEPTH')
+        ))
+    return queue
+
+def queue_full_response():
+    return jsonify({'success': False, 'error': 'Server is busy, please try again shortly'}), 503
+
+def wants_async_upload():
+    """Whether this upload should be queued instead of processed inline."""
+    flag = request.args.get('async')
+    if flag is None:
+        return current_app.config.get('UPLOAD_ASYNC', False)
+    return flag.lower() in ('1', 'true', 'yes')
+
 @image_bp.route('/upload', methods=['POST'])
+@limiter.shared_limit(UPLOAD_LIMITS, scope='uploads')
 def upload_file():
     try:
         if 'file' not in request.files:
@@ -149,43 +530,29 @@ def upload_file():
             
             if file_size > MAX_FILE_SIZE:
                 return jsonify({'error': f'File too large. Maximum size is {humanize.naturalsize(MAX_FILE_SIZE)}'}), 400
-            
-            # Process the image
-            processed_image, original_details, processed_details = process_image(file)
-            if processed_image is None:
-                return jsonify({'error': 'Error processing image'}), 400
-            
-            # Upload to imgbb
-            upload_result = upload_to_imgbb(processed_image)
-            if not upload_result:
-                return jsonify({'error': 'Error uploading to image host'}), 500
-
-            # Create response data
-            timestamp = datetime.now().isoformat()
-            filename = secure_filename(f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{file.filename}")
-            
-            photo_data = {
-                'success': True,
-                'url': upload_result['url'],
-                'thumbnail': upload_result['thumbnail'],
-                'filename': filename,
-                'timestamp': timestamp,
-                'details': {
-                    'original': original_details,
-                    'processed': {
-                        'width': upload_result['width'],
-                        'height': upload_result['height'],
-                        'size': humanize.naturalsize(upload_result['size']),
-                        'format': os.path.splitext(file.filename)[1][1:].lower()
-                    }
-                }
-            }
 
-            # Save metadata
-            if not save_photo_metadata(photo_data):
-                logger.warning("Failed to save photo metadata")
-            
-            return jsonify(photo_data), 200
+            if wants_async_upload():
+                # Reject bad files now rather than in a job the client polls
+                try:
+                    probe_upload(file, file.filename)
+                except ImageRejected as e:
+                    return jsonify({'error': str(e)}), 400
+                # The request's file buffer dies with the request, so hand the
+                # worker its own copy of the bytes
+                try:
+                    job_id = get_job_queue().submit(
+                        current_app._get_current_object(), file.read(), file.filename
+                    )
+                except UploadQueueFull:
+                    return queue_full_response()
+                return jsonify({
+                    'success': True,
+                    'job_id': job_id,
+                    'status_url': url_for('image.upload_status', job_id=job_id)
+                }), 202
+
+            response_data, status = run_upload_pipeline(file, file.filename)
+            return jsonify(response_data), status
             
         except Exception as e:
             logger.error(f"Error processing upload: {str(e)}")
@@ -194,3 +561,266 @@ def upload_file():
     except Exception as e:
         logger.error(f"Unexpected error in upload: {str(e)}")
         return jsonify({'error': 'An unexpected error occurred'}), 500
+
+@image_bp.route('/upload/<job_id>', methods=['GET'])
+@limiter.exempt
+def upload_status(job_id):
+    """Report the progress of a queued upload job."""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Unknown upload job'}), 404
+    return jsonify({'success': True, 'job': job}), 200
+
+def get_batch_executor():
+    """Get the thread pool that processes batch upload items."""
+    entry = current_app.extensions.get('upload_batch')
+    if entry is None or entry[0] != os.getpid():
+        # Never reuse a pool inherited across a fork
+        entry = (os.getpid(), ThreadPoolExecutor(
+            max_workers=current_app.config.get('BATCH_WORKERS', 4), thread_name_prefix='upload-batch'
+        ))
+        current_app.extensions['upload_batch'] = entry
+    return entry[1]
+
+def collect_batch_items():
+    """Expand the request's ``files`` (and any zip archives) into batch items.
+
+    Each item is a ``(name, source, error)`` tuple where ``source`` is a
+    FileStorage or a ``(ZipFile, ZipInfo)`` pair. Cached on ``g`` so the
+    rate limiter and the view share one pass over the archives.
+    """
+    if 'upload_batch_items' in g:
+        return g.upload_batch_items
+    items, archives = [], []
+    for file in request.files.getlist('files'):
+        if file.filename.lower().endswith('.zip'):
+            try:
+                archive = zipfile.ZipFile(file.stream)
+            except zipfile.BadZipFile:
+                items.append((file.filename, None, 'Invalid zip archive'))
+                continue
+            archives.append(archive)
+            for info in archive.infolist():
+                if info.is_dir() or info.filename.startswith('__MACOSX/'):
+                    continue
+                # Keep the folder in the name so a/x.jpg and b/x.jpg stay distinct
+                items.append((info.filename, (archive, info), None))
+        else:
+            items.append((file.filename, file, None))
+    g.upload_batch_items = items
+    g.upload_batch_archives = archives
+    return items
+
+def batch_cost():
+    """Rate limit cost of a batch: one unit per image.
+
+    Batches rejected as empty or too large cost one unit, like any other
+    refused request.
+    """
+    count = len(collect_batch_items())
+    return count if 0 < count <= MAX_BATCH_FILES else 1
+
+def process_batch_item(app, name, source):
+    """Run one batch item through the upload pipeline in a worker thread."""
+    with app.app_context():
+        if not allowed_file(name):
+            return {'error': 'File type not allowed'}, 400
+        if isinstance(source, tuple):
+            archive, info = source
+            if info.file_size > MAX_FILE_SIZE:
+                return {'error': f'File too large. Maximum size is {humanize.naturalsize(MAX_FILE_SIZE)}'}, 400
+            # Bounded read: the declared size in a zip can lie
+            with archive.open(info) as member:
+                data = member.read(MAX_FILE_SIZE + 1)
+            if len(data) > MAX_FILE_SIZE:
+                return {'error': f'File too large. Maximum size is {humanize.naturalsize(MAX_FILE_SIZE)}'}, 400
+            image_file = BytesIO(data)
+        else:
+            image_file = source.stream
+            image_file.seek(0, os.SEEK_END)
+            if image_file.tell() > MAX_FILE_SIZE:
+                return {'error': f'File too large. Maximum size is {humanize.naturalsize(MAX_FILE_SIZE)}'}, 400
+            image_file.seek(0)
+        return run_upload_pipeline(image_file, name)
+
+@image_bp.route('/upload/batch', methods=['POST'])
+@limiter.shared_limit(UPLOAD_LIMITS, scope='uploads', cost=batch_cost)
+def upload_batch():
+    """Upload many images (or zip archives of images) in one request.
+
+    Items are processed concurrently on a bounded thread pool and each
+    result is streamed back as one NDJSON line as soon as it finishes,
+    followed by a summary line.
+    """
+    items = collect_batch_items()
+    if not items:
+        return jsonify({'success': False, 'error': 'No files in batch'}), 400
+    if len(items) > MAX_BATCH_FILES:
+        return jsonify({'success': False, 'error': f'Too many files. Maximum is {MAX_BATCH_FILES} per batch'}), 400
+
+    app = current_app._get_current_object()
+    executor = get_batch_executor()
+    archives = g.upload_batch_archives
+
+    def generate():
+        succeeded = 0
+        futures = {}
+        try:
+            for index, (name, source, error) in enumerate(items):
+                if error:
+                    yield json.dumps({'index': index, 'name': name, 'status': 400, 'error': error}) + '\n'
+                    continue
+                futures[executor.submit(process_batch_item, app, name, source)] = (index, name)
+            for future in as_completed(futures):
+                index, name = futures[future]
+                try:
+                    data, status = future.result()
+                except Exception as e:
+                    logger.error(f"Error processing batch item {name}: {str(e)}")
+                    data, status = {'error': 'Error processing upload'}, 500
+                if status == 200:
+                    succeeded += 1
+                yield json.dumps({'index': index, 'name': name, 'status': status, **data}) + '\n'
+            yield json.dumps({
+                'done': True,
+                'total': len(items),
+                'succeeded': succeeded,
+                'failed': len(items) - succeeded
+            }) + '\n'
+        finally:
+            for future in futures:
+                future.cancel()
+            for archive in archives:
+                archive.close()
+
+    return current_app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def get_chunked_store():
+    """Get the on-disk store for resumable chunked uploads."""
+    return ChunkedUploadStore(
+        os.path.join(current_app.config['UPLOAD_FOLDER'], CHUNKS_DIR),
+        ttl=current_app.config.get('CHUNKED_UPLOAD_TTL', 24 * 3600)
+    )
+
+def chunked_status(store, session):
+    missing = store.missing(session)
+    return {
+        'success': True,
+        'upload_id': session['id'],
+        'filename': session['filename'],
+        'size': session['size'],
+        'chunk_size': session['chunk_size'],
+        'total_chunks': session['total_chunks'],
+        'missing': missing,
+        'complete': not missing
+    }
+
+@image_bp.route('/upload/chunked', methods=['POST'])
+@limiter.shared_limit(UPLOAD_LIMITS, scope='uploads')
+def chunked_upload_init():
+    """Start a resumable upload; the size is checked before any bytes arrive."""
+    try:
+        data = request.get_json(silent=True) or {}
+        filename = data.get('filename') or ''
+        size = data.get('size')
+        chunk_size = data.get('chunk_size', DEFAULT_CHUNK_SIZE)
+        if not allowed_file(filename):
+            return jsonify({'success': False, 'error': 'File type not allowed'}), 400
+        if not isinstance(size, int) or size <= 0:
+            return jsonify({'success': False, 'error': 'A positive integer size is required'}), 400
+        max_size = current_app.config.get('CHUNKED_MAX_FILE_SIZE', MAX_FILE_SIZE)
+        if size > max_size:
+            return jsonify({'success': False, 'error': f'File too large. Maximum size is {humanize.naturalsize(max_size)}'}), 413
+        if not isinstance(chunk_size, int) or not MIN_CHUNK_SIZE <= chunk_size <= MAX_CHUNK_SIZE:
+            return jsonify({'success': False, 'error': f'chunk_size must be between {MIN_CHUNK_SIZE} and {MAX_CHUNK_SIZE}'}), 400
+
+        store = get_chunked_store()
+        store.prune()
+        session = store.create(filename, size, chunk_size)
+        return jsonify({
+            **chunked_status(store, session),
+            # Chunks are PUT to <upload_url>/<index>
+            'upload_url': url_for('image.chunked_upload_status', upload_id=session['id']),
+            'complete_url': url_for('image.chunked_upload_complete', upload_id=session['id'])
+        }), 201
+    except Exception as e:
+        logger.error(f"Error starting chunked upload: {str(e)}")
+        return jsonify({'success': False, 'error': 'Error starting upload'}), 500
+
+@image_bp.route('/upload/chunked/<upload_id>', methods=['GET'])
+@limiter.exempt
+def chunked_upload_status(upload_id):
+    """Report which chunks are still missing, so a client can resume."""
+    store = get_chunked_store()
+    session = store.get(upload_id)
+    if session is None:
+        return jsonify({'success': False, 'error': 'Unknown upload'}), 404
+    return jsonify(chunked_status(store, session)), 200
+
+@image_bp.route('/upload/chunked/<upload_id>/<int:index>', methods=['PUT'])
+@limiter.exempt
+def chunked_upload_chunk(upload_id, index):
+    """Write one chunk (the raw request body) at its offset; safe to retry."""
+    try:
+        store = get_chunked_store()
+        session = store.get(upload_id)
+        if session is None:
+            return jsonify({'success': False, 'error': 'Unknown upload'}), 404
+        try:
+            expected = store.chunk_length(session, index)
+            # Refuse oversized chunks before reading their body
+            if request.content_length is not None and request.content_length != expected:
+                return jsonify({'success': False, 'error': f'Chunk {index} must be {expected} bytes'}), 400
+            store.write_chunk(session, index, request.stream)
+        except ChunkError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        return jsonify({'success': True, 'index': index, 'missing': len(store.missing(session))}), 200
+    except Exception as e:
+        logger.error(f"Error writing chunk {index} of {upload_id}: {str(e)}")
+        return jsonify({'success': False, 'error': 'Error writing chunk'}), 500
+
+@image_bp.route('/upload/chunked/<upload_id>/complete', methods=['POST'])
+@limiter.exempt
+def chunked_upload_complete(upload_id):
+    """Process the assembled file once every chunk has arrived."""
+    try:
+        store = get_chunked_store()
+        session = store.get(upload_id)
+        if session is None:
+            return jsonify({'success': False, 'error': 'Unknown upload'}), 404
+        missing = store.missing(session)
+        if missing:
+            return jsonify({'success': False, 'error': 'Upload is incomplete', 'missing': missing}), 409
+
+        if wants_async_upload():
+            queue = get_job_queue()
+            if queue.pending() >= queue.max_pending:
+                # Keep the chunks so the client can retry the completion
+                return queue_full_response()
+            with store.open(session) as f:
+                try:
+                    probe_upload(f, session['filename'])
+                except ImageRejected as e:
+                    store.discard(upload_id)
+                    return jsonify({'success': False, 'error': str(e)}), 400
+                data = f.read()
+            try:
+                job_id = queue.submit(current_app._get_current_object(), data, session['filename'])
+            except UploadQueueFull:
+                return queue_full_response()
+            store.discard(upload_id)
+            return jsonify({
+                'success': True,
+                'job_id': job_id,
+                'status_url': url_for('image.upload_status', job_id=job_id)
+            }), 202
+
+        # The part file already holds the whole image; process it in place
+        with store.open(session) as f:
+            response_data, status = run_upload_pipeline(f, session['filename'])
+        if status < 500:
+            store.discard(upload_id)
+        return jsonify(response_data), status
+    except Exception as e:
+        logger.error(f"Error completing chunked upload {upload_id}: {str(e)}")
+        return jsonify({'success': False, 'error': 'Error processing upload'}), 500
@@ -0,0 +1,87 @@
+import os
+import warnings
+from collections import namedtuple
+
+from PIL import Image, UnidentifiedImageError
+
+# Container signatures, checked against the first bytes of the file
+SIGNATURES = [
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'GIF87a', 'GIF'),
+    (b'GIF89a', 'GIF'),
+]
+EXTENSION_FORMATS = {'jpg': 'JPEG', 'jpeg': 'JPEG', 'png': 'PNG', 'gif': 'GIF', 'webp': 'WEBP'}
+# Modes process_image can flatten to RGB
+SUPPORTED_MODES = {'1', 'L', 'LA', 'La', 'P', 'PA', 'RGB', 'RGBA', 'RGBa', 'RGBX', 'CMYK', 'YCbCr'}
+DEFAULT_MAX_PIXELS = 50 * 1000 * 1000
+DEFAULT_MAX_FRAMES = 300
+HEADER_BYTES = 12
+
+# Duck-types as an image for get_image_details (width, height, format)
+ImageInfo = namedtuple('ImageInfo', ['format', 'width', 'height', 'mode', 'frames'])
+
+
+class ImageRejected(ValueError):
+    """Raised when an upload fails the header checks; the message is safe to show."""
+
+
+def sniff_format(head):
+    """Image format named by the magic bytes in ``head``, or None."""
+    for signature, fmt in SIGNATURES:
+        if head.startswith(signature):
+            return fmt
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'WEBP'
+    return None
+
+
+def probe_image(image_file, filename=None, max_pixels=DEFAULT_MAX_PIXELS, max_frames=DEFAULT_MAX_FRAMES):
+    """Read only the image header and check it before anything is decoded.
+
+    The magic bytes must name an allowed format that matches ``filename``'s
+    extension, and the dimensions, mode and frame count must be within
+    limits. Returns an :class:`ImageInfo`; raises :class:`ImageRejected`.
+    The file is left at position 0.
+    """
+    image_file.seek(0)
+    fmt = sniff_format(image_file.read(HEADER_BYTES))
+    image_file.seek(0)
+    if fmt is None:
+        raise ImageRejected('File is not a supported image')
+    if filename and '.' in filename:
+        extension = filename.rsplit('.', 1)[1].lower()
+        expected = EXTENSION_FORMATS.get(extension)
+        if expected is not None and expected != fmt:
+            raise ImageRejected(f'File content is {fmt}, which does not match .{extension}')
+
+    try:
+        with warnings.catch_warnings():
+            # The pixel limit below applies instead of Pillow's
+            warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+            img = Image.open(image_file, formats=[fmt])
+        width, height = img.size
+        if width <= 0 or height <= 0:
+            raise ImageRejected('Image has no pixels')
+        if width * height > max_pixels:
+            raise ImageRejected(
+                f'Image is {width}x{height}; the limit is {max_pixels / 1e6:g} megapixels'
+            )
+        mode = img.mode
+        if mode not in SUPPORTED_MODES:
+            raise ImageRejected(f'Unsupported image mode {mode}')
+        # PNG (acTL) and WebP carry the count in their headers. For GIF,
+        # Pillow walks the frame headers without decoding any pixels, which
+        # costs no more than reading the (size-limited) upload once
+        frames = getattr(img, 'n_frames', 1)
+        if frames > max_frames:
+            raise ImageRejected(f'Too many frames; the limit is {max_frames}')
+        return ImageInfo(fmt, width, height, mode, frames)
+    except ImageRejected:
+        raise
+    except Image.DecompressionBombError:
+        raise ImageRejected(f'Image is over the {max_pixels / 1e6:g} megapixel limit')
+    except (UnidentifiedImageError, OSError, SyntaxError, ValueError):
+        raise ImageRejected('Image header is corrupt or unreadable')
+    finally:
+        image_file.seek(0, os.SEEK_SET)
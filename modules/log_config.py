@@ -0,0 +1,247 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from flask import g, has_app_context, request
+
+from .metrics import Counter
+
+LOG_QUEUE_SIZE = 10000
+REQUEST_ID_HEADER = 'X-Request-ID'
+VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+# LogRecord attributes that are not extra fields
+RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+LOG_RECORDS_DROPPED = Counter(
+    'swapsnap_log_records_dropped_total', 'Log records dropped, by reason.', ['reason']
+)
+
+request_logger = logging.getLogger('swapsnap.requests')
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, with the request ID and any extra fields."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in RECORD_ATTRS)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class RequestContextFilter(logging.Filter):
+    """Tag records with the ID of the request being handled, if any."""
+
+    def filter(self, record):
+        if has_app_context() and not hasattr(record, 'request_id'):
+            request_id = g.get('request_id')
+            if request_id:
+                record.request_id = request_id
+        return True
+
+
+class ErrorSampler(logging.Filter):
+    """Let at most ``burst`` warnings or errors per call site through every ``interval`` seconds.
+
+    The first record let through after a quiet spell carries a
+    ``suppressed`` count of what was dropped in between.
+    """
+
+    def __init__(self, burst=10, interval=60.0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._sites = {}  # (logger, file, line) -> [window start, passed, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno < logging.WARNING or self.burst <= 0:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            site = self._sites.get((record.name, record.pathname, record.lineno))
+            if site is None or now - site[0] >= self.interval:
+                suppressed = site[2] if site else 0
+                site = self._sites[(record.name, record.pathname, record.lineno)] = [now, 0, 0]
+            else:
+                suppressed = 0
+            if site[1] >= self.burst:
+                site[2] += 1
+                LOG_RECORDS_DROPPED.inc(reason='sampled')
+                return False
+            site[1] += 1
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class QueueingHandler(logging.handlers.QueueHandler):
+    """Hands records to a listener thread that does the actual I/O.
+
+    The queue is bounded: when the writer falls behind, records are dropped
+    (and counted) instead of blocking the request. After a fork the child
+    starts its own listener, since threads do not survive ``fork()``.
+    """
+
+    def __init__(self, handlers, maxsize=LOG_QUEUE_SIZE):
+        super().__init__(queue.Queue(maxsize))
+        self.handlers = handlers
+        self.maxsize = maxsize
+        self.listener = None
+        self._start()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        if self.listener is not None:
+            self._start()
+
+    def _start(self):
+        self.queue = queue.Queue(self.maxsize)
+        self.listener = logging.handlers.QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+        self.listener.start()
+
+    def prepare(self, record):
+        # Resolve the message and traceback now, in the calling thread; the
+        # listener only formats and writes
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc(reason='queue_full')
+
+    def emit(self, record):
+        if self.listener is None:
+            # Stopped (at exit): write synchronously
+            for handler in self.handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+            return
+        super().emit(record)
+
+    def stop(self):
+        """Write out queued records and stop the listener thread."""
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.stop()
+
+
+def file_handler(log_file, max_bytes=10 * 1024 * 1024, backup_count=5):
+    """Handler writing to ``log_file``, rotated at ``max_bytes``.
+
+    Rotation renames the file under whichever process crosses the size, so
+    it is only safe with a single writer. With ``max_bytes=0`` the file is
+    left to an external logrotate: every process appends and reopens it
+    once it has been moved away.
+    """
+    if not max_bytes:
+        return logging.handlers.WatchedFileHandler(log_file, encoding='utf-8')
+    return logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+    )
+
+
+def configure_logging(log_file='app.log', level=logging.INFO, fmt='json', queued=True,
+                      max_bytes=10 * 1024 * 1024, backup_count=5, error_burst=10, error_interval=60.0):
+    """Set up the root logger: ``log_file`` (see :func:`file_handler`) plus stderr.
+
+    With ``queued`` the file and stream writes happen on a background
+    thread. Returns the handler installed on the root logger.
+    """
+    if fmt == 'json':
+        formatter = JSONFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(file_handler(log_file, max_bytes, backup_count))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    root = logging.getLogger()
+    for old in list(root.handlers):
+        root.removeHandler(old)
+        if isinstance(old, QueueingHandler):
+            old.stop()
+    if queued:
+        handler = QueueingHandler(handlers)
+        atexit.register(handler.stop)
+        installed = [handler]
+    else:
+        installed = handlers
+    for handler in installed:
+        # Filters run in the calling thread, before the record is queued,
+        # so the request context is still there
+        handler.addFilter(RequestContextFilter())
+        handler.addFilter(ErrorSampler(error_burst, error_interval))
+        root.addHandler(handler)
+    root.setLevel(level)
+    return installed[0]
+
+
+def stop_logging():
+    """Flush and stop any background log writer."""
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, QueueingHandler):
+            handler.stop()
+
+
+def log_stage(stage, seconds):
+    """Add a stage duration to the current request's log record."""
+    if has_app_context():
+        g.setdefault('log_stages', {})[stage] = round(seconds * 1000, 2)
+
+
+def _start_request():
+    request_id = request.headers.get(REQUEST_ID_HEADER, '')
+    g.request_id = request_id if VALID_REQUEST_ID.match(request_id) else uuid.uuid4().hex
+    g.log_start = time.perf_counter()
+
+
+def _log_request(response):
+    start = g.pop('log_start', None)
+    response.headers[REQUEST_ID_HEADER] = g.get('request_id', '')
+    if start is not None:
+        extra = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - start) * 1000, 2),
+        }
+        stages = g.get('log_stages')
+        if stages:
+            extra['stages'] = stages
+        request_logger.info('request', extra=extra)
+    return response
+
+
+def init_app(app):
+    """Give every request an ID and log one record per request."""
+    app.before_request(_start_request)
+    app.after_request(_log_request)
+    if not app.config.get('LOG_REQUESTS', True):
+        request_logger.setLevel(logging.WARNING)
@@ -0,0 +1,275 @@
+import os
+import json
+import bisect
+import logging
+import threading
+
+from .db import SQLiteDatabase
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+METADATA_BACKENDS = ('sqlite', 'log')
+LEGACY_METADATA_FILE = 'metadata.json'
+
+
+def _encode(photo_data):
+    return json.dumps(photo_data, separators=(',', ':'))
+
+
+class MetadataStore:
+    """Interface implemented by every photo metadata engine.
+
+    Records are the ``photo_data`` dicts built by the upload handler and are
+    keyed by their ``filename``.
+    """
+
+    def get(self, filename):
+        raise NotImplementedError
+
+    def put(self, photo_data):
+        raise NotImplementedError
+
+    def put_many(self, records):
+        for record in records:
+            self.put(record)
+
+    def recent(self):
+        """Return every record, newest first."""
+        raise NotImplementedError
+
+    def page(self, limit, after=None):
+        """Return up to ``limit`` records, newest first.
+
+        ``after`` is a ``(timestamp, filename)`` keyset cursor; only records
+        strictly older than it are returned.
+        """
+        raise NotImplementedError
+
+    def changes(self, since=None):
+        """Return ``(filenames, cursor)`` for photos added after ``since``.
+
+        Pass the returned cursor back in to receive only newer additions.
+        """
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+    def size(self):
+        """Return the on-disk size of the store in bytes."""
+        raise NotImplementedError
+
+
+class SQLiteMetadataStore(MetadataStore):
+    """Metadata engine backed by an indexed SQLite table."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS photos (
+            filename TEXT PRIMARY KEY,
+            timestamp TEXT NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_photos_timestamp ON photos (timestamp, filename);
+    """
+
+    UPSERT = """
+        INSERT INTO photos (filename, timestamp, data) VALUES (?, ?, ?)
+        ON CONFLICT (filename) DO UPDATE SET timestamp = excluded.timestamp, data = excluded.data
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.db = SQLiteDatabase(path, self.SCHEMA)
+
+    def get(self, filename):
+        row = self.db.execute('SELECT data FROM photos WHERE filename = ?', (filename,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, photo_data):
+        self.db.execute(self.UPSERT, (photo_data['filename'], photo_data['timestamp'], _encode(photo_data)))
+
+    def put_many(self, records):
+        with self.db.transaction() as conn:
+            conn.executemany(self.UPSERT, [
+                (record['filename'], record['timestamp'], _encode(record))
+                for record in records
+            ])
+
+    def recent(self):
+        rows = self.db.execute('SELECT data FROM photos ORDER BY timestamp DESC, filename DESC')
+        return [json.loads(row[0]) for row in rows]
+
+    def page(self, limit, after=None):
+        if after is None:
+            rows = self.db.execute(
+                'SELECT data FROM photos ORDER BY timestamp DESC, filename DESC LIMIT ?', (limit,)
+            )
+        else:
+            rows = self.db.execute(
+                'SELECT data FROM photos WHERE (timestamp, filename) < (?, ?) '
+                'ORDER BY timestamp DESC, filename DESC LIMIT ?', (*after, limit)
+            )
+        return [json.loads(row[0]) for row in rows]
+
+    def changes(self, since=None):
+        # Upserts keep their rowid, so rowids only grow for new photos
+        rows = self.db.execute(
+            'SELECT rowid, filename FROM photos WHERE rowid > ? ORDER BY rowid', (since or 0,)
+        ).fetchall()
+        return [row[1] for row in rows], (rows[-1][0] if rows else since or 0)
+
+    def count(self):
+        return self.db.execute('SELECT COUNT(*) FROM photos').fetchone()[0]
+
+    def size(self):
+        return self.db.size()
+
+
+class LogMetadataStore(MetadataStore):
+    """Metadata engine backed by an append-only JSON lines file.
+
+    Writes append a single line under an exclusive file lock; every process
+    keeps an in-memory index and tails the log for records written by others.
+    A torn trailing line (e.g. after a crash) is ignored until it is complete.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._records = {}
+        self._order = []  # (timestamp, filename), ascending
+        self._arrivals = []  # filenames in first-seen order
+        self._offset = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        open(path, 'a').close()
+        with self._lock:
+            self._refresh()
+
+    def _apply(self, record):
+        filename = record['filename']
+        previous = self._records.get(filename)
+        if previous is None:
+            self._arrivals.append(filename)
+        else:
+            key = (previous['timestamp'], filename)
+            index = bisect.bisect_left(self._order, key)
+            if index < len(self._order) and self._order[index] == key:
+                del self._order[index]
+        self._records[filename] = record
+        bisect.insort(self._order, (record['timestamp'], filename))
+
+    def _refresh(self):
+        """Apply lines appended since the last read. Caller holds the lock."""
+        size = os.path.getsize(self.path)
+        if size < self._offset:
+            # The log was replaced underneath us; rebuild from scratch
+            self._records, self._order, self._arrivals, self._offset = {}, [], [], 0
+        if size == self._offset:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            chunk = f.read(size - self._offset)
+        end = chunk.rfind(b'\n') + 1
+        for line in chunk[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                self._apply(json.loads(line))
+            except (ValueError, KeyError) as e:
+                logger.warning(f"Skipping corrupt metadata log entry: {str(e)}")
+        self._offset += end
+
+    def _append(self, payload):
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            view = memoryview(payload)
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def get(self, filename):
+        with self._lock:
+            self._refresh()
+            return self._records.get(filename)
+
+    def put(self, photo_data):
+        self.put_many([photo_data])
+
+    def put_many(self, records):
+        payload = ''.join(_encode(record) + '\n' for record in records).encode('utf-8')
+        if not payload:
+            return
+        with self._lock:
+            self._append(payload)
+            self._refresh()
+
+    def recent(self):
+        with self._lock:
+            self._refresh()
+            return [self._records[filename] for _, filename in reversed(self._order)]
+
+    def page(self, limit, after=None):
+        with self._lock:
+            self._refresh()
+            end = len(self._order) if after is None else bisect.bisect_left(self._order, tuple(after))
+            start = max(end - limit, 0)
+            return [self._records[filename] for _, filename in reversed(self._order[start:end])]
+
+    def changes(self, since=None):
+        with self._lock:
+            self._refresh()
+            return self._arrivals[since or 0:], len(self._arrivals)
+
+    def count(self):
+        with self._lock:
+            self._refresh()
+            return len(self._records)
+
+    def size(self):
+        return os.path.getsize(self.path)
+
+
+def migrate_json_metadata(store, json_path):
+    """Import a legacy ``metadata.json`` into ``store`` once.
+
+    The JSON file is renamed to ``metadata.json.migrated`` afterwards so the
+    import never runs twice. Returns the number of imported records.
+    """
+    if not os.path.exists(json_path):
+        return 0
+    with open(json_path, 'r') as f:
+        legacy = json.load(f)
+    records = [{**photo_data, 'filename': filename} for filename, photo_data in legacy.items()]
+    store.put_many(records)
+    try:
+        os.replace(json_path, json_path + '.migrated')
+    except FileNotFoundError:
+        # Another worker finished the same migration first
+        pass
+    if records:
+        logger.info(f"Migrated {len(records)} photos from {json_path}")
+    return len(records)
+
+
+def open_store(backend, folder):
+    """Open the metadata store for ``backend`` inside ``folder``."""
+    if backend == 'sqlite':
+        store = SQLiteMetadataStore(os.path.join(folder, 'metadata.db'))
+    elif backend == 'log':
+        store = LogMetadataStore(os.path.join(folder, 'metadata.log'))
+    else:
+        raise ValueError(f"Unknown metadata backend: {backend}")
+    migrate_json_metadata(store, os.path.join(folder, LEGACY_METADATA_FILE))
+    return store
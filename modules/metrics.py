@@ -0,0 +1,449 @@
+import bisect
+import fcntl
+import glob
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Blueprint, Response, g, request
+
+from .extensions import limiter
+
+metrics_bp = Blueprint('metrics', __name__)
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# How often each worker writes its values for the others in multiprocess mode
+SNAPSHOT_INTERVAL = 2.0
+ARCHIVE = 'archive.json'
+
+_registry = []
+_collectors = []
+_sections = {}
+# Multiprocess mode: the directory workers write their snapshots to
+_multiprocess = {'directory': None, 'app': None, 'pid': None, 'filename': None}
+_multiprocess_lock = threading.Lock()
+
+
+def process_alive(pid):
+    """Whether a process with ``pid`` is running on this host."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """A named metric family with a fixed set of label names.
+
+    Values are kept per process. In multiprocess mode (see
+    :func:`enable_multiprocess`) ``/metrics`` adds up every worker's values.
+    """
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def dump(self):
+        """A JSON-able copy of the values: ``[[label_values, value], ...]``."""
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def combine(self, values, value):
+        """Add another process's ``value`` into ``values``."""
+        values[value[0]] = values.get(value[0], 0) + value[1]
+
+    def samples(self, values=None):
+        """Yield ``(suffix, label_values, extra_labels, value)`` tuples."""
+        if values is None:
+            with self._lock:
+                values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield '', key, (), value
+
+    def render(self, values=None):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        for suffix, key, extra, value in self.samples(values):
+            lines.append(f'{self.name}{suffix}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    """A value that goes up and down.
+
+    Across workers only live processes count, combined by
+    ``multiprocess_mode``: ``sum`` for per-process amounts (queue depths),
+    ``max`` for values every worker measures the same way (store sizes),
+    ``mean`` for ratios.
+    """
+
+    type = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), multiprocess_mode='sum'):
+        super().__init__(name, documentation, labelnames)
+        if multiprocess_mode not in ('sum', 'max', 'mean'):
+            raise ValueError(f"Unknown multiprocess_mode: {multiprocess_mode}")
+        self.multiprocess_mode = multiprocess_mode
+
+    def combine(self, values, value):
+        values.setdefault(value[0], []).append(value[1])
+
+    def samples(self, values=None):
+        if values is not None:
+            reduce = {'sum': sum, 'max': max, 'mean': lambda found: sum(found) / len(found)}
+            values = {key: reduce[self.multiprocess_mode](found) for key, found in values.items()}
+        yield from super().samples(values)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels))
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the ``with`` block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        entry = self._values.get(self._key(labels))
+        return entry[2] if entry else 0
+
+    def dump(self):
+        with self._lock:
+            return [[list(key), [list(entry[0]), entry[1], entry[2]]] for key, entry in self._values.items()]
+
+    def combine(self, values, value):
+        key, (counts, total, count) = value
+        entry = values.get(key)
+        if entry is None:
+            values[key] = (list(counts), total, count)
+        else:
+            values[key] = ([a + b for a, b in zip(entry[0], counts)], entry[1] + total, entry[2] + count)
+
+    def samples(self, values=None):
+        if values is None:
+            with self._lock:
+                values = {key: (list(entry[0]), entry[1], entry[2]) for key, entry in self._values.items()}
+        for key, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                yield '_bucket', key, (('le', _format_value(bound)),), cumulative
+            yield '_sum', key, (), total
+            yield '_count', key, (), count
+
+
+def register_collector(func):
+    """Register ``func`` to refresh gauges right before each scrape.
+
+    Collectors run inside the app context of the ``/metrics`` request (or,
+    in multiprocess mode, of the background snapshot writer).
+    """
+    _collectors.append(func)
+    return func
+
+
+def register_section(name, func):
+    """Publish ``func()`` (JSON-able) to the other workers as ``name``; see :func:`worker_sections`."""
+    _sections[name] = func
+
+
+def _collect():
+    for collector in _collectors:
+        try:
+            collector()
+        except Exception as e:
+            logger.error(f"Metrics collector {collector.__name__} failed: {str(e)}")
+
+
+def _snapshot():
+    return {
+        'pid': os.getpid(),
+        'metrics': {metric.name: metric.dump() for metric in _registry},
+        'sections': {name: func() for name, func in _sections.items()},
+    }
+
+
+def _write_json(directory, filename, data):
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, os.path.join(directory, filename))
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _read_snapshots(directory):
+    snapshots = []
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        try:
+            with open(path) as f:
+                snapshots.append((path, json.load(f)))
+        except (OSError, ValueError):
+            # Removed by a compaction since the listing
+            continue
+    return snapshots
+
+
+def _combine(snapshots, gauges=True):
+    """Merge snapshot metrics into ``{name: {label_values: value}}``."""
+    metrics = {metric.name: metric for metric in _registry}
+    merged = {}
+    for snapshot in snapshots:
+        for name, values in snapshot['metrics'].items():
+            metric = metrics.get(name)
+            if metric is None or (not gauges and isinstance(metric, Gauge)):
+                continue
+            combined = merged.setdefault(name, {})
+            for key, value in values:
+                metric.combine(combined, (tuple(key), value))
+    return merged
+
+
+def _compact(directory):
+    """Fold the counters of exited workers into the archive and drop their snapshots.
+
+    Counters and histograms must keep what a recycled worker counted;
+    gauges of dead workers no longer mean anything.
+    """
+    with open(os.path.join(directory, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        snapshots = _read_snapshots(directory)
+        dead = [(path, snapshot) for path, snapshot in snapshots
+                if snapshot.get('pid') is not None and not process_alive(snapshot['pid'])]
+        if not dead:
+            return
+        archive = [snapshot for path, snapshot in snapshots if os.path.basename(path) == ARCHIVE]
+        merged = _combine(archive + [snapshot for _, snapshot in dead], gauges=False)
+        _write_json(directory, ARCHIVE, {'metrics': {
+            name: [[list(key), value] for key, value in values.items()] for name, values in merged.items()
+        }})
+        for path, _ in dead:
+            os.unlink(path)
+
+
+def _write_own_snapshot(directory):
+    filename = _multiprocess['filename']
+    if filename is None or not filename.startswith(f'{os.getpid()}-'):
+        # Unique per process, so a recycled PID never overwrites a dead
+        # worker's counters before they are archived
+        filename = _multiprocess['filename'] = f'{os.getpid()}-{os.urandom(4).hex()}.json'
+    _write_json(directory, filename, _snapshot())
+
+
+def write_snapshot(collect=True):
+    """Write this process's values for the other workers, refreshing gauges first with ``collect``."""
+    directory = _multiprocess['directory']
+    if directory is None:
+        return
+    app = _multiprocess['app']
+    if collect and app is not None:
+        with app.app_context():
+            _collect()
+    _write_own_snapshot(directory)
+
+
+def _snapshot_loop():
+    while True:
+        time.sleep(SNAPSHOT_INTERVAL)
+        try:
+            write_snapshot()
+        except Exception as e:
+            logger.error(f"Error writing metrics snapshot: {str(e)}")
+
+
+def _start_writer():
+    """Start this process's snapshot writer thread, once per process."""
+    if _multiprocess['directory'] is None or _multiprocess['pid'] == os.getpid():
+        return
+    with _multiprocess_lock:
+        if _multiprocess['pid'] != os.getpid():
+            _multiprocess['pid'] = os.getpid()
+            threading.Thread(target=_snapshot_loop, name='metrics-snapshot', daemon=True).start()
+
+
+def _after_fork_in_child():
+    if _multiprocess['directory'] is not None:
+        # The parent's values are in its own snapshot; start from zero
+        for metric in _registry:
+            metric.clear()
+
+
+def _before_fork():
+    try:
+        # No collectors: they would open database connections in the parent
+        write_snapshot(collect=False)
+    except Exception as e:
+        logger.error(f"Error writing metrics snapshot: {str(e)}")
+
+
+def enable_multiprocess(app, directory):
+    """Add up the values of every process that shares ``directory``.
+
+    Each process writes a snapshot of its values there every
+    ``SNAPSHOT_INTERVAL`` seconds (and when it forks or exits); a scrape
+    merges them. The directory must be emptied when the server starts.
+    """
+    os.makedirs(directory, exist_ok=True)
+    first = _multiprocess['directory'] is None
+    _multiprocess.update(directory=directory, app=app, pid=None)
+    if first:
+        os.register_at_fork(before=_before_fork, after_in_child=_after_fork_in_child)
+
+
+def worker_sections(name):
+    """The ``name`` section of every live worker, this one's freshly computed."""
+    directory = _multiprocess['directory']
+    own = _sections[name]()
+    if directory is None:
+        return [own]
+    found = [own]
+    for _, snapshot in _read_snapshots(directory):
+        pid = snapshot.get('pid')
+        if pid is not None and pid != os.getpid() and name in snapshot['sections'] and process_alive(pid):
+            found.append(snapshot['sections'][name])
+    return found
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    _collect()
+    directory = _multiprocess['directory']
+    if directory is None:
+        return '\n'.join(metric.render() for metric in _registry) + '\n'
+
+    _write_own_snapshot(directory)
+    _compact(directory)
+    snapshots = [snapshot for _, snapshot in _read_snapshots(directory)
+                 if snapshot.get('pid') is None or process_alive(snapshot['pid'])]
+    merged = _combine(snapshots)
+    return '\n'.join(metric.render(merged.get(metric.name, {})) for metric in _registry) + '\n'
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'swapsnap_http_request_duration_seconds', 'Time to handle a request, by endpoint.',
+    ['endpoint', 'method', 'status']
+)
+HTTP_RESPONSE_BYTES = Histogram(
+    'swapsnap_http_response_size_bytes', 'Response body size, by endpoint.',
+    ['endpoint'], buckets=SIZE_BUCKETS
+)
+
+
+def _start_timer():
+    _start_writer()
+    g.metrics_start = time.perf_counter()
+
+
+def _record_request(response):
+    start = g.pop('metrics_start', None)
+    # Unrouted requests (404s) would let clients invent label values
+    if start is None or request.endpoint is None:
+        return response
+    HTTP_REQUEST_SECONDS.observe(
+        time.perf_counter() - start,
+        endpoint=request.endpoint, method=request.method, status=response.status_code
+    )
+    if not response.is_streamed:
+        HTTP_RESPONSE_BYTES.observe(response.calculate_content_length() or 0, endpoint=request.endpoint)
+    return response
+
+
+def init_app(app):
+    """Time every request and register the ``/metrics`` endpoint.
+
+    With ``METRICS_DIR`` set, the endpoint reports all workers together.
+    """
+    if app.config.get('METRICS_DIR'):
+        enable_multiprocess(app, app.config['METRICS_DIR'])
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
+    app.register_blueprint(metrics_bp)
+
+
+@metrics_bp.route('/metrics')
+@limiter.exempt
+def metrics():
+    """Prometheus scrape endpoint."""
+    return Response(render(), mimetype='text/plain; version=0.0.4')
@@ -1,79 +1,133 @@
-import os
-import random
-from datetime import datetime
+import base64
 from flask import Blueprint, jsonify, current_app, session, request
 import logging
-import json
+import threading
+
+from .metadata_store import open_store
+from .photo_sampler import PhotoSampler, photo_key
+from .state import get_state
+from .metrics import Gauge, register_collector
 
 photo_bp = Blueprint('photo', __name__)  
 logger = logging.getLogger(__name__)
 
+DEFAULT_PAGE_SIZE = 30
+MAX_PAGE_SIZE = 100
+DEFAULT_HISTORY_SIZE = 10
+MAX_RANDOM_BATCH = 20
+
+STORAGE_BYTES = Gauge('swapsnap_storage_bytes', 'On-disk size of each data store.', ['store'], multiprocess_mode='max')
+PHOTOS = Gauge('swapsnap_photos', 'Photos in the catalog.', ['backend'], multiprocess_mode='max')
+
+_store_lock = threading.Lock()
+
+def get_store():
+    """Get the metadata store configured for the current app."""
+    backend = current_app.config.get('METADATA_BACKEND', 'sqlite')
+    folder = current_app.config['UPLOAD_FOLDER']
+    stores = current_app.extensions.setdefault('metadata_stores', {})
+    store = stores.get((backend, folder))
+    if store is None:
+        with _store_lock:
+            store = stores.get((backend, folder))
+            if store is None:
+                store = stores[(backend, folder)] = open_store(backend, folder)
+    return store
+
+def get_sampler():
+    """Get the random-photo sampler for the current store, synced with new uploads."""
+    store = get_store()
+    samplers = current_app.extensions.setdefault('photo_samplers', {})
+    sampler = samplers.get(store)
+    if sampler is None:
+        with _store_lock:
+            sampler = samplers.setdefault(store, PhotoSampler(store))
+    sampler.sync()
+    return sampler
+
+@register_collector
+def collect_store_metrics():
+    """Refresh catalog size gauges for a scrape."""
+    for (backend, folder), store in list(current_app.extensions.get('metadata_stores', {}).items()):
+        STORAGE_BYTES.set(store.size(), store=f'metadata_{backend}')
+        PHOTOS.set(store.count(), backend=backend)
+
 def get_metadata():
-    """Get all photo metadata from the JSON file."""
+    """Get all photo metadata keyed by filename."""
     try:
-        metadata_file = os.path.join(current_app.config['UPLOAD_FOLDER'], 'metadata.json')
-        if os.path.exists(metadata_file):
-            with open(metadata_file, 'r') as f:
-                return json.load(f)
-        return {}
+        return {photo['filename']: photo for photo in get_store().recent()}
     except Exception as e:
         logger.error(f"Error reading metadata: {str(e)}")
         return {}
 
 def get_all_photos():
-    """Get all photos from the metadata."""
+    """Get all photos from the metadata, newest first."""
     try:
-        metadata = get_metadata()
-        return sorted(
-            [
-                {
-                    'filename': filename,
-                    **photo_data
-                }
-                for filename, photo_data in metadata.items()
-            ],
-            key=lambda x: x['timestamp'],
-            reverse=True
-        )
+        return get_store().recent()
     except Exception as e:
         logger.error(f"Error getting photos: {str(e)}")
         return []
 
 def save_photo_metadata(photo_data):
-    """Save photo metadata to the JSON file."""
+    """Save photo metadata to the configured store."""
     try:
-        metadata_file = os.path.join(current_app.config['UPLOAD_FOLDER'], 'metadata.json')
-        metadata = get_metadata()
-        
-        # Add the new photo
-        metadata[photo_data['filename']] = photo_data
-        
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(metadata_file), exist_ok=True)
-        
-        # Save to file
-        with open(metadata_file, 'w') as f:
-            json.dump(metadata, f, indent=2)
-            
+        get_store().put(photo_data)
         return True
     except Exception as e:
         logger.error(f"Error saving photo metadata: {str(e)}")
         return False
 
+def encode_cursor(photo):
+    """Encode a photo's position in the timestamp index as an opaque cursor."""
+    raw = f"{photo['timestamp']}|{photo['filename']}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """Decode a cursor back into a ``(timestamp, filename)`` key."""
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+    timestamp, filename = raw.split('|', 1)
+    return timestamp, filename
+
+def project(photo, fields):
+    """Keep only the requested top-level fields (the filename is always kept)."""
+    if not fields:
+        return photo
+    return {key: photo[key] for key in fields | {'filename'} if key in photo}
+
 @photo_bp.route('/api/photos', methods=['GET'])
 def get_photos():
-    """API endpoint to get all photos."""
+    """API endpoint to get a page of photos, newest first.
+
+    Query parameters: ``limit`` (page size), ``after`` (cursor returned as
+    ``next_cursor`` by the previous page) and ``fields`` (comma-separated
+    projection).
+    """
     try:
-        photos = get_all_photos()
-        if not photos:
+        try:
+            limit = min(max(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+            after = request.args.get('after')
+            after = decode_cursor(after) if after else None
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid pagination parameters'
+            }), 400
+        fields = {field.strip() for field in request.args.get('fields', '').split(',') if field.strip()}
+
+        # Fetch one extra row to know whether another page exists
+        photos = get_store().page(limit + 1, after)
+        if not photos and after is None:
             return jsonify({
                 'success': False,
                 'error': 'No photos found'
             }), 404
-            
+
+        has_more = len(photos) > limit
+        photos = photos[:limit]
         return jsonify({
             'success': True,
-            'photos': photos
+            'photos': [project(photo, fields) for photo in photos],
+            'next_cursor': encode_cursor(photos[-1]) if has_more else None
         }), 200
     except Exception as e:
         logger.error(f"Error getting photos: {str(e)}")
@@ -84,32 +138,48 @@ def get_photos():
 
 @photo_bp.route('/api/photos/random', methods=['GET'])
 def random_photo():
-    """Get a random photo, avoiding the last shown photo if possible."""
+    """Get a random photo, avoiding the session's recently shown photos if possible.
+
+    With ``count=N`` a batch of up to N distinct photos is returned as
+    ``photos``, so clients can prefetch what the next swipes will show.
+    """
     try:
-        photos = get_all_photos()
+        count = request.args.get('count', type=int)
+        batch = count is not None
+        count = max(1, min(count or 1, MAX_RANDOM_BATCH))
+        sampler = get_sampler()
+        state = get_state()
+        history = state.load_history(session)
+
+        store = get_store()
+        photos = []
+        while not photos and len(sampler):
+            for filename in sampler.sample_many(history, count):
+                photo = store.get(filename)
+                if photo is None:
+                    sampler.remove(filename)
+                else:
+                    photos.append(photo)
+
         if not photos:
             return jsonify({
                 'success': False,
                 'error': 'No photos found'
             }), 404
 
-        # Get the last shown photo from session
-        last_shown = session.get('last_shown_photo')
-        available_photos = [p for p in photos if p['filename'] != last_shown]
-        
-        # If we've shown all photos or there's only one photo, reset and show any
-        if not available_photos:
-            available_photos = photos
-            
-        # Get a random photo
-        photo = random.choice(available_photos)
-        
-        # Store this photo as the last shown
-        session['last_shown_photo'] = photo['filename']
-        
+        # Remember the last K photos shown in this session
+        window = current_app.config.get('RANDOM_HISTORY_SIZE', DEFAULT_HISTORY_SIZE)
+        history = (history + [photo_key(photo['filename']) for photo in photos])[-window:] if window > 0 else []
+        state.save_history(session, history)
+
+        if batch:
+            return jsonify({
+                'success': True,
+                'photos': photos
+            }), 200
         return jsonify({
             'success': True,
-            'photo': photo
+            'photo': photos[0]
         }), 200
         
     except Exception as e:
@@ -0,0 +1,104 @@
+import base64
+import random
+import struct
+import threading
+import zlib
+
+# Rejection-sampling attempts before falling back to a scan. With a window
+# much smaller than the catalog the first draw almost always succeeds.
+MAX_ATTEMPTS = 8
+
+
+def photo_key(filename):
+    """Return the 32-bit key used to remember a photo in the history window."""
+    return zlib.crc32(filename.encode('utf-8'))
+
+
+def pack_history(keys):
+    """Pack history keys into a compact string (4 bytes per photo)."""
+    return base64.b64encode(struct.pack(f'>{len(keys)}I', *keys)).decode('ascii')
+
+
+def unpack_history(packed):
+    """Inverse of :func:`pack_history`; malformed input yields an empty history."""
+    try:
+        raw = base64.b64decode(packed or '')
+        return list(struct.unpack(f'>{len(raw) // 4}I', raw[:len(raw) - len(raw) % 4]))
+    except (ValueError, struct.error):
+        return []
+
+
+class PhotoSampler:
+    """Constant-time random photo picker.
+
+    Filenames live in a flat list with a filename -> position map, so adds,
+    removals and draws are all O(1). New photos are pulled incrementally from
+    the metadata store's change feed, which also picks up photos uploaded
+    through other workers.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._ids = []
+        self._positions = {}
+        self._cursor = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, filename):
+        with self._lock:
+            self._add(filename)
+
+    def _add(self, filename):
+        if filename not in self._positions:
+            self._positions[filename] = len(self._ids)
+            self._ids.append(filename)
+
+    def remove(self, filename):
+        with self._lock:
+            position = self._positions.pop(filename, None)
+            if position is None:
+                return
+            last = self._ids.pop()
+            if position < len(self._ids):
+                self._ids[position] = last
+                self._positions[last] = position
+
+    def sync(self):
+        """Pull photos added to the store since the last sync."""
+        with self._lock:
+            filenames, self._cursor = self.store.changes(self._cursor)
+            for filename in filenames:
+                self._add(filename)
+
+    def sample_many(self, history=(), count=1):
+        """Pick up to ``count`` distinct filenames, avoiding ``history`` if possible.
+
+        When too few photos are outside the window, the least recently shown
+        ones fill the rest of the batch.
+        """
+        recent = set(history)
+        chosen, chosen_keys = [], set()
+        with self._lock:
+            ids = self._ids
+            count = min(count, len(ids))
+            for _ in range(count * MAX_ATTEMPTS):
+                if len(chosen) == count:
+                    return chosen
+                filename = ids[random.randrange(len(ids))]
+                key = photo_key(filename)
+                if key not in recent and key not in chosen_keys:
+                    chosen.append(filename)
+                    chosen_keys.add(key)
+            if len(chosen) < count:
+                rest = [f for f in ids if photo_key(f) not in chosen_keys]
+                fresh = [f for f in rest if photo_key(f) not in recent]
+                random.shuffle(fresh)
+                chosen.extend(fresh[:count - len(chosen)])
+            if len(chosen) < count:
+                age = {key: position for position, key in enumerate(history)}
+                shown = sorted((f for f in rest if photo_key(f) in recent), key=lambda f: age[photo_key(f)])
+                chosen.extend(shown[:count - len(chosen)])
+        return chosen
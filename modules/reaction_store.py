@@ -0,0 +1,389 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from .db import SQLiteDatabase
+
+logger = logging.getLogger(__name__)
+
+# reactions.json kept no times, so imported reactions are dated to the epoch:
+# they count towards totals but never towards the trending windows
+LEGACY_CREATED_AT = 0.0
+
+
+class ReactionStore:
+    """SQLite reaction storage with per-(photo, emoji) counters.
+
+    Each user has at most one reaction per photo, kept in an indexed table;
+    changing it moves one unit between two counters inside a single
+    transaction, so a reaction costs the same no matter how many exist.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS reaction_counts (
+            photo TEXT NOT NULL,
+            emoji TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (photo, emoji)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS user_reactions (
+            photo TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            emoji TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            PRIMARY KEY (photo, user_id)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS reaction_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            photo TEXT NOT NULL,
+            emoji TEXT NOT NULL,
+            delta INTEGER NOT NULL,
+            created_at REAL NOT NULL
+        );
+    """
+
+    # Counter changes older than this are pruned from reaction_events
+    EVENT_RETENTION = 8 * 24 * 3600
+
+    def __init__(self, path):
+        self.path = path
+        self.db = SQLiteDatabase(path, self.SCHEMA)
+
+    def _apply(self, conn, photo, user_id, emoji, created_at):
+        """Set ``user_id``'s reaction on ``photo``; returns the previous emoji."""
+        row = conn.execute(
+            'SELECT emoji FROM user_reactions WHERE photo = ? AND user_id = ?', (photo, user_id)
+        ).fetchone()
+        previous = row[0] if row else None
+        if previous == emoji:
+            return previous
+        conn.execute(
+            'INSERT INTO user_reactions (photo, user_id, emoji, created_at) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (photo, user_id) DO UPDATE SET emoji = excluded.emoji, created_at = excluded.created_at',
+            (photo, user_id, emoji, created_at)
+        )
+        if previous is not None:
+            conn.execute(
+                'UPDATE reaction_counts SET count = count - 1 WHERE photo = ? AND emoji = ?', (photo, previous)
+            )
+            conn.execute(
+                'DELETE FROM reaction_counts WHERE photo = ? AND emoji = ? AND count <= 0', (photo, previous)
+            )
+            conn.execute(
+                'INSERT INTO reaction_events (photo, emoji, delta, created_at) VALUES (?, ?, -1, ?)',
+                (photo, previous, created_at)
+            )
+        conn.execute(
+            'INSERT INTO reaction_counts (photo, emoji, count) VALUES (?, ?, 1) '
+            'ON CONFLICT (photo, emoji) DO UPDATE SET count = count + 1',
+            (photo, emoji)
+        )
+        conn.execute(
+            'INSERT INTO reaction_events (photo, emoji, delta, created_at) VALUES (?, ?, 1, ?)',
+            (photo, emoji, created_at)
+        )
+        return previous
+
+    def react(self, photo, user_id, emoji):
+        """Record a reaction and return the photo's updated counts."""
+        with self.db.transaction() as conn:
+            self._apply(conn, photo, user_id, emoji, time.time())
+        return self.counts(photo)
+
+    def react_many(self, reactions):
+        """Apply ``(photo, user_id, emoji, created_at)`` tuples in one transaction."""
+        with self.db.transaction() as conn:
+            for photo, user_id, emoji, created_at in reactions:
+                self._apply(conn, photo, user_id, emoji, created_at)
+
+    def counts(self, photo):
+        rows = self.db.execute('SELECT emoji, count FROM reaction_counts WHERE photo = ?', (photo,))
+        return {emoji: count for emoji, count in rows}
+
+    def counts_many(self, photos):
+        """Return ``{photo: {emoji: count}}`` for every photo in ``photos``."""
+        photos = list(photos)
+        result = {photo: {} for photo in photos}
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(photos), 500):
+            chunk = photos[start:start + 500]
+            rows = self.db.execute(
+                f"SELECT photo, emoji, count FROM reaction_counts WHERE photo IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+            for photo, emoji, count in rows:
+                result[photo][emoji] = count
+        return result
+
+    def changes(self, since=None):
+        """Return ``(photos, cursor)``: photos whose counts changed after ``since``.
+
+        With ``since=None`` no photos are returned, only the current cursor.
+        """
+        if since is None:
+            row = self.db.execute('SELECT MAX(id) FROM reaction_events').fetchone()
+            return set(), row[0] or 0
+        rows = self.db.execute(
+            'SELECT id, photo FROM reaction_events WHERE id > ? ORDER BY id', (since,)
+        ).fetchall()
+        return {row[1] for row in rows}, (rows[-1][0] if rows else since)
+
+    def snapshot(self):
+        """Return ``(counts, events, cursor)`` read at one point in time.
+
+        ``counts`` are all ``(photo, emoji, count)`` rows, ``events`` the
+        retained ``(photo, emoji, created_at)`` reactions given, and ``cursor``
+        the change-feed position both reflect.
+        """
+        with self.db.transaction() as conn:
+            cursor = conn.execute('SELECT MAX(id) FROM reaction_events').fetchone()[0] or 0
+            counts = conn.execute('SELECT photo, emoji, count FROM reaction_counts').fetchall()
+            events = conn.execute(
+                'SELECT photo, emoji, created_at FROM reaction_events WHERE delta > 0'
+            ).fetchall()
+        return counts, events, cursor
+
+    def events(self, since, limit=10000):
+        """Return ``(photo, emoji, delta, created_at)`` rows after ``since`` and the new cursor."""
+        rows = self.db.execute(
+            'SELECT id, photo, emoji, delta, created_at FROM reaction_events WHERE id > ? ORDER BY id LIMIT ?',
+            (since, limit)
+        ).fetchall()
+        return [row[1:] for row in rows], (rows[-1][0] if rows else since)
+
+    def prune_events(self, now=None):
+        """Drop counter changes older than ``EVENT_RETENTION``."""
+        cutoff = (now or time.time()) - self.EVENT_RETENTION
+        self.db.execute('DELETE FROM reaction_events WHERE created_at < ?', (cutoff,))
+
+    def user_reaction(self, photo, user_id):
+        row = self.db.execute(
+            'SELECT emoji FROM user_reactions WHERE photo = ? AND user_id = ?', (photo, user_id)
+        ).fetchone()
+        return row[0] if row else None
+
+    def size(self):
+        return self.db.size()
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.db.close()
+
+
+class CoalescingReactionStore(ReactionStore):
+    """ReactionStore that batches writes and flushes them periodically.
+
+    Reactions are buffered in memory (the latest per user and photo wins)
+    and written in one transaction every ``flush_interval`` seconds or once
+    ``max_pending`` are waiting. Reads merge the buffer in, so callers see
+    their own writes; up to one interval of reactions can be lost on a crash.
+    """
+
+    def __init__(self, path, flush_interval=1.0, max_pending=500):
+        super().__init__(path)
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = {}  # photo -> {user_id: (emoji, created_at)}
+        self._pending_count = 0
+        self._flushing = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        atexit.register(self.flush)
+
+    def _ensure_flusher(self):
+        if self._thread is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._flush_loop, name='reaction-flusher', daemon=True)
+            self._thread.start()
+
+    def _flush_loop(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing reactions: {str(e)}")
+
+    def react(self, photo, user_id, emoji):
+        with self._lock:
+            self._ensure_flusher()
+            users = self._pending.setdefault(photo, {})
+            if user_id not in users:
+                self._pending_count += 1
+            users[user_id] = (emoji, time.time())
+            if self._pending_count >= self.max_pending:
+                self._wakeup.set()
+        return self.counts(photo)
+
+    def flush(self):
+        with self._flush_lock:
+            self._flush()
+
+    def _flush(self):
+        with self._lock:
+            pending, self._pending, self._pending_count = self._pending, {}, 0
+            # Stays visible to readers until it is committed
+            self._flushing = pending
+        if not pending:
+            return
+        try:
+            self.react_many(
+                (photo, user_id, emoji, created_at)
+                for photo, users in pending.items()
+                for user_id, (emoji, created_at) in users.items()
+            )
+        except Exception:
+            # Put the batch back behind any newer writes and retry later
+            with self._lock:
+                for photo, users in pending.items():
+                    current = self._pending.setdefault(photo, {})
+                    for user_id, value in users.items():
+                        if user_id not in current:
+                            current[user_id] = value
+                            self._pending_count += 1
+            raise
+        finally:
+            with self._lock:
+                self._flushing = {}
+
+    def counts(self, photo):
+        counts = Counter(super().counts(photo))
+        with self._lock:
+            users = {**self._flushing.get(photo, {}), **self._pending.get(photo, {})}
+        for user_id, (emoji, _) in users.items():
+            previous = super().user_reaction(photo, user_id)
+            if previous == emoji:
+                continue
+            if previous is not None:
+                counts[previous] -= 1
+            counts[emoji] += 1
+        return {emoji: count for emoji, count in counts.items() if count > 0}
+
+    def counts_many(self, photos):
+        result = super().counts_many(photos)
+        with self._lock:
+            buffered = [photo for photo in result if photo in self._pending or photo in self._flushing]
+        for photo in buffered:
+            result[photo] = self.counts(photo)
+        return result
+
+    def user_reaction(self, photo, user_id):
+        with self._lock:
+            pending = self._pending.get(photo, {}).get(user_id) or self._flushing.get(photo, {}).get(user_id)
+        return pending[0] if pending else super().user_reaction(photo, user_id)
+
+
+class ReactionSummaryCache:
+    """In-memory LRU cache of per-photo reaction counts.
+
+    Local writes update entries directly; writes from other workers are
+    picked up by tailing the store's change feed, which evicts only the
+    photos that changed.
+    """
+
+    def __init__(self, store, max_entries=50000):
+        self.store = store
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._cursor = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def sync(self):
+        changed, cursor = self.store.changes(self._cursor)
+        with self._lock:
+            for photo in changed:
+                self._entries.pop(photo, None)
+            self._cursor = cursor
+
+    def _put(self, photo, counts):
+        self._entries[photo] = counts
+        self._entries.move_to_end(photo)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_many(self, photos):
+        """Return ``{photo: counts}``, loading misses in one batched query."""
+        self.sync()
+        result, missing = {}, []
+        with self._lock:
+            for photo in photos:
+                counts = self._entries.get(photo)
+                if counts is None:
+                    missing.append(photo)
+                else:
+                    self._entries.move_to_end(photo)
+                    result[photo] = counts
+            self.hits += len(result)
+            self.misses += len(missing)
+        if missing:
+            loaded = self.store.counts_many(missing)
+            with self._lock:
+                for photo, counts in loaded.items():
+                    self._put(photo, counts)
+            result.update(loaded)
+        return result
+
+    def update(self, photo, counts):
+        """Record counts just written by this process."""
+        with self._lock:
+            self._put(photo, counts)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+def migrate_json_reactions(store, json_path):
+    """Import a legacy ``reactions.json`` into ``store`` once.
+
+    Counters are rebuilt from the per-user map, which is the source of truth
+    in the old layout. Reactions are dated ``LEGACY_CREATED_AT``. The file
+    is renamed to ``reactions.json.migrated``.
+    """
+    if not os.path.exists(json_path):
+        return 0
+    with open(json_path, 'r') as f:
+        legacy = json.load(f)
+    rows = [
+        (photo, str(user_id), emoji, LEGACY_CREATED_AT)
+        for photo, entry in legacy.items()
+        for user_id, emoji in entry.get('reactions', {}).items()
+    ]
+    store.react_many(rows)
+    try:
+        os.replace(json_path, json_path + '.migrated')
+    except FileNotFoundError:
+        pass
+    if rows:
+        logger.info(f"Migrated {len(rows)} reactions from {json_path}")
+    return len(rows)
+
+
+def open_reaction_store(path, coalesce=False, flush_interval=1.0, legacy_file=None):
+    """Open the reaction store at ``path``, importing ``legacy_file`` if present."""
+    if coalesce:
+        store = CoalescingReactionStore(path, flush_interval=flush_interval)
+    else:
+        store = ReactionStore(path)
+    store.prune_events()
+    if legacy_file:
+        migrate_json_reactions(store, legacy_file)
+    return store
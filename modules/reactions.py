@@ -1,60 +1,159 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, current_app
 from flask_login import login_required, current_user
-import json
 import os
+import hashlib
 import logging
+import threading
+
+from .reaction_store import ReactionSummaryCache, open_reaction_store
+from .trending import WINDOWS, ReactionRanking
+from .metrics import Gauge, register_collector
+from .photo_manager import STORAGE_BYTES, get_store
 
 reactions_bp = Blueprint('reactions', __name__)
 logger = logging.getLogger(__name__)
 
-REACTIONS_FILE = 'reactions.json'
+REACTIONS_FILE = 'reactions.json'  # legacy layout, imported on first use
+REACTIONS_DB = 'reactions.db'
+MAX_BATCH_PHOTOS = 200
+DEFAULT_TOP_PHOTOS = 10
+MAX_TOP_PHOTOS = 100
+
+SUMMARY_CACHE_HIT_RATIO = Gauge(
+    'swapsnap_reaction_cache_hit_ratio', 'Share of reaction summary lookups served from memory.',
+    multiprocess_mode='mean'
+)
+
+_store_lock = threading.Lock()
+
+def get_reaction_store():
+    """Get the reaction store configured for the current app."""
+    path = current_app.config.get('REACTIONS_DB') or os.path.join(current_app.config['UPLOAD_FOLDER'], REACTIONS_DB)
+    stores = current_app.extensions.setdefault('reaction_stores', {})
+    store = stores.get(path)
+    if store is None:
+        with _store_lock:
+            store = stores.get(path)
+            if store is None:
+                store = stores[path] = open_reaction_store(
+                    path,
+                    coalesce=current_app.config.get('REACTIONS_COALESCE', False),
+                    flush_interval=current_app.config.get('REACTIONS_FLUSH_INTERVAL', 1.0),
+                    legacy_file=os.path.join(current_app.root_path, REACTIONS_FILE)
+                )
+    return store
+
+def get_summary_cache():
+    """Get the reaction summary cache in front of the current reaction store."""
+    store = get_reaction_store()
+    caches = current_app.extensions.setdefault('reaction_caches', {})
+    cache = caches.get(store)
+    if cache is None:
+        with _store_lock:
+            cache = caches.setdefault(store, ReactionSummaryCache(store))
+    return cache
+
+def get_ranking():
+    """Get the top-photos ranking for the current reaction store."""
+    store = get_reaction_store()
+    rankings = current_app.extensions.setdefault('reaction_rankings', {})
+    ranking = rankings.get(store)
+    if ranking is None:
+        with _store_lock:
+            ranking = rankings.setdefault(store, ReactionRanking(store))
+    return ranking
+
+@register_collector
+def collect_reaction_metrics():
+    """Refresh reaction store and summary cache gauges for a scrape."""
+    for store in list(current_app.extensions.get('reaction_stores', {}).values()):
+        STORAGE_BYTES.set(store.size(), store='reactions')
+    for cache in list(current_app.extensions.get('reaction_caches', {}).values()):
+        SUMMARY_CACHE_HIT_RATIO.set(cache.stats()['hit_rate'])
+
+def summary_response(payload):
+    """JSON response with a content ETag, answering 304 when it matches."""
+    response = jsonify(payload)
+    response.set_etag(hashlib.sha1(response.get_data()).hexdigest())
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@reactions_bp.route('/api/reactions', methods=['GET'])
+def get_reactions():
+    """Reaction counts for many photos: ``?photos=a.jpg,b.jpg``."""
+    try:
+        photos = list(dict.fromkeys(p for p in request.args.get('photos', '').split(',') if p))
+        if not photos:
+            return jsonify({'error': 'No photos requested'}), 400
+        if len(photos) > MAX_BATCH_PHOTOS:
+            return jsonify({'error': f'At most {MAX_BATCH_PHOTOS} photos per request'}), 400
+
+        summaries = get_summary_cache().get_many(photos)
+        return summary_response({
+            'success': True,
+            'reactions': {photo: summaries[photo] for photo in photos}
+        })
+    except Exception as e:
+        logger.error(f"Error in get_reactions: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
 
-def load_reactions():
+@reactions_bp.route('/api/reaction/<path:photo>', methods=['GET'])
+def get_reaction(photo):
+    """Reaction counts for a single photo."""
     try:
-        if os.path.exists(REACTIONS_FILE):
-            with open(REACTIONS_FILE, 'r') as f:
-                return json.load(f)
-        return {}
+        return summary_response({
+            'success': True,
+            'reactions': get_summary_cache().get_many([photo])[photo]
+        })
     except Exception as e:
-        logger.error(f"Error loading reactions: {str(e)}")
-        return {}
+        logger.error(f"Error in get_reaction: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
 
-def save_reactions(reactions):
+@reactions_bp.route('/api/photos/top', methods=['GET'])
+def top_photos():
+    """Most reacted photos: ``?emoji=&window=all|hour|day&limit=``."""
     try:
-        with open(REACTIONS_FILE, 'w') as f:
-            json.dump(reactions, f)
+        window = request.args.get('window', 'all')
+        if window not in WINDOWS:
+            return jsonify({'error': f"window must be one of {', '.join(WINDOWS)}"}), 400
+        emoji = request.args.get('emoji') or None
+        limit = min(max(request.args.get('limit', DEFAULT_TOP_PHOTOS, type=int), 1), MAX_TOP_PHOTOS)
+
+        ranked = get_ranking().top(window, emoji, limit)
+        store = get_store()
+        photos = []
+        for photo, score in ranked:
+            record = store.get(photo) or {'filename': photo}
+            photos.append({**record, 'score': score if window == 'all' else round(score, 3)})
+        return jsonify({'success': True, 'window': window, 'emoji': emoji, 'photos': photos})
     except Exception as e:
-        logger.error(f"Error saving reactions: {str(e)}")
+        logger.error(f"Error in top_photos: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
 
 @reactions_bp.route('/api/reaction', methods=['POST'])
 @login_required
 def add_reaction():
     try:
-        data = request.get_json()
-        if not data or 'photo' not in data or 'reaction' not in data:
+        data = request.get_json(silent=True)
+        photo = data and (data.get('photo') or data.get('filename'))
+        if not photo or 'reaction' not in data:
             return jsonify({'error': 'Missing required fields'}), 400
 
-        photo = data['photo']
         reaction = data['reaction']
-        user_id = current_user.id
+        user_id = str(current_user.id)
 
-        reactions = load_reactions()
-        
-        if photo not in reactions:
-            reactions[photo] = {'reactions': {}}
-            
-        if user_id in reactions[photo]['reactions']:
-            old_reaction = reactions[photo]['reactions'][user_id]
-            reactions[photo][old_reaction] = reactions[photo].get(old_reaction, 0) - 1
-            
-        reactions[photo]['reactions'][user_id] = reaction
-        reactions[photo][reaction] = reactions[photo].get(reaction, 0) + 1
-        
-        save_reactions(reactions)
+        store = get_reaction_store()
+        counts = store.react(photo, user_id, reaction)
+        get_summary_cache().update(photo, counts)
+        # Only once someone has asked for it; a fresh ranking loads on first read
+        ranking = current_app.extensions.get('reaction_rankings', {}).get(store)
+        if ranking is not None:
+            ranking.sync()
         
         return jsonify({
             'success': True,
-            'reactions': reactions[photo]
+            'reactions': counts,
+            'user_reaction': reaction
         }), 200
         
     except Exception as e:
@@ -0,0 +1,233 @@
+import logging
+import os
+import random
+import secrets
+import threading
+import time
+
+from limits.storage import Storage
+
+from .db import SQLiteDatabase
+from .photo_sampler import pack_history, unpack_history
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+STATE_BACKENDS = ('memory', 'sqlite', 'redis')
+STATE_DB = 'state.db'
+HISTORY_TTL = 7 * 24 * 3600  # idle sessions forget their photo history after a week
+KEY_PREFIX = 'swapsnap:'
+
+_state_lock = threading.Lock()
+
+
+class CookieState:
+    """No shared backend: history rides in the signed session cookie.
+
+    Rate limits use Flask-Limiter's in-memory storage, so each worker
+    process counts on its own.
+    """
+
+    name = 'memory'
+
+    def load_history(self, session):
+        return unpack_history(session.get('recent_photos'))
+
+    def save_history(self, session, keys):
+        session['recent_photos'] = pack_history(keys)
+
+
+class SharedState(CookieState):
+    """Base for backends that keep history server-side under a session ID.
+
+    The cookie then only carries a fixed-size random ``sid``.
+    """
+
+    def load_history(self, session):
+        sid = session.get('sid')
+        return unpack_history(self._get(sid)) if sid else []
+
+    def save_history(self, session, keys):
+        sid = session.get('sid')
+        if sid is None:
+            sid = session['sid'] = secrets.token_urlsafe(16)
+        self._set(sid, pack_history(keys))
+
+
+class SQLiteState(SharedState):
+    """Photo history in a SQLite file shared by the workers of one host."""
+
+    name = 'sqlite'
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS session_history (
+            sid TEXT PRIMARY KEY,
+            history TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.db = SQLiteDatabase(path, self.SCHEMA)
+
+    def _get(self, sid):
+        row = self.db.execute(
+            'SELECT history FROM session_history WHERE sid = ? AND expires_at > ?', (sid, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def _set(self, sid, value):
+        now = time.time()
+        self.db.execute(
+            'INSERT INTO session_history (sid, history, expires_at) VALUES (?, ?, ?) '
+            'ON CONFLICT (sid) DO UPDATE SET history = excluded.history, expires_at = excluded.expires_at',
+            (sid, value, now + HISTORY_TTL)
+        )
+        if random.random() < 0.001:
+            self.db.execute('DELETE FROM session_history WHERE expires_at <= ?', (now,))
+
+    def limiter_storage_uri(self):
+        return f'sqlite://{os.path.abspath(self.path)}'
+
+
+class RedisState(SharedState):
+    """Photo history in Redis (or any Redis-compatible server).
+
+    One connection pool per process is shared with the rate limiter; redis-py
+    pools detect a fork and reconnect in the child.
+    """
+
+    name = 'redis'
+
+    def __init__(self, url, pool_size=20):
+        if redis is None:
+            raise RuntimeError("STATE_BACKEND=redis requires the 'redis' package")
+        self.url = url
+        self.pool = redis.ConnectionPool.from_url(url, max_connections=pool_size)
+        self.client = redis.Redis(connection_pool=self.pool)
+
+    def _get(self, sid):
+        value = self.client.get(KEY_PREFIX + 'history:' + sid)
+        return value.decode('ascii') if value is not None else None
+
+    def _set(self, sid, value):
+        self.client.set(KEY_PREFIX + 'history:' + sid, value, ex=HISTORY_TTL)
+
+    def limiter_storage_uri(self):
+        return self.url
+
+
+class SQLiteLimitStorage(Storage):
+    """Fixed-window rate limit counters in SQLite (``sqlite:///path/to/state.db``).
+
+    Registered with the ``limits`` library under the ``sqlite`` scheme. Each
+    hit is one upsert and read in a single transaction, so all workers on a
+    host share the same counters.
+    """
+
+    STORAGE_SCHEME = ['sqlite']
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS rate_limits (
+            key TEXT PRIMARY KEY,
+            count INTEGER NOT NULL,
+            expires_at REAL NOT NULL
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, uri, wrap_exceptions=False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.db = SQLiteDatabase(uri.split('://', 1)[1], self.SCHEMA)
+
+    @property
+    def base_exceptions(self):
+        import sqlite3
+        return sqlite3.Error
+
+    def incr(self, key, expiry, elastic_expiry=False, amount=1):
+        now = time.time()
+        # Upsert and read back in one write transaction rather than with
+        # RETURNING, which needs SQLite 3.35
+        with self.db.transaction() as conn:
+            # A window that has run out starts over instead of accumulating
+            conn.execute(
+                'INSERT INTO rate_limits (key, count, expires_at) VALUES (?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET '
+                'count = CASE WHEN expires_at <= ? THEN excluded.count ELSE count + excluded.count END, '
+                'expires_at = CASE WHEN expires_at <= ? OR ? THEN excluded.expires_at ELSE expires_at END',
+                (key, amount, now + expiry, now, now, bool(elastic_expiry))
+            )
+            row = conn.execute('SELECT count FROM rate_limits WHERE key = ?', (key,)).fetchone()
+        if random.random() < 0.001:
+            self.db.execute('DELETE FROM rate_limits WHERE expires_at <= ?', (now,))
+        return row[0]
+
+    def get(self, key):
+        row = self.db.execute(
+            'SELECT count FROM rate_limits WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        row = self.db.execute('SELECT expires_at FROM rate_limits WHERE key = ?', (key,)).fetchone()
+        return max(row[0], time.time()) if row else time.time()
+
+    def check(self):
+        try:
+            self.db.execute('SELECT 1')
+            return True
+        except Exception:
+            return False
+
+    def reset(self):
+        return self.db.execute('DELETE FROM rate_limits').rowcount
+
+    def clear(self, key):
+        self.db.execute('DELETE FROM rate_limits WHERE key = ?', (key,))
+
+
+def open_state(backend, url=None, folder=None, pool_size=20):
+    """Open the state backend named ``backend``."""
+    if backend == 'memory':
+        return CookieState()
+    if backend == 'sqlite':
+        return SQLiteState(url or os.path.join(folder, STATE_DB))
+    if backend == 'redis':
+        return RedisState(url or 'redis://localhost:6379/0', pool_size=pool_size)
+    raise ValueError(f"Unknown state backend: {backend}")
+
+
+def get_state(app=None):
+    """Get the state backend configured for ``app`` (default: the current app)."""
+    if app is None:
+        from flask import current_app
+        app = current_app
+    config = app.config
+    key = (config.get('STATE_BACKEND', 'memory'), config.get('STATE_URL'), config['UPLOAD_FOLDER'])
+    states = app.extensions.setdefault('state', {})
+    state = states.get(key)
+    if state is None:
+        with _state_lock:
+            state = states.get(key)
+            if state is None:
+                state = states[key] = open_state(
+                    key[0], url=key[1], folder=key[2], pool_size=config.get('STATE_POOL_SIZE', 20)
+                )
+    return state
+
+
+def configure_limiter_storage(app):
+    """Point Flask-Limiter at the shared state backend; call before ``init_app``."""
+    state = get_state(app)
+    if isinstance(state, RedisState):
+        app.config['RATELIMIT_STORAGE_URI'] = state.limiter_storage_uri()
+        app.config['RATELIMIT_STORAGE_OPTIONS'] = {'connection_pool': state.pool}
+    elif isinstance(state, SQLiteState):
+        app.config['RATELIMIT_STORAGE_URI'] = state.limiter_storage_uri()
+    else:
+        app.config.setdefault('RATELIMIT_STORAGE_URI', 'memory://')
@@ -0,0 +1,99 @@
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from flask import abort, current_app, request, send_file
+from werkzeug.security import safe_join
+
+# Filenames carrying a content hash (16+ hex chars) never change content
+HASHED_NAME = re.compile(r'(?:^|[-_./])([0-9a-f]{16,})(?:[-_.]|$)')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+ETAG_CACHE_SIZE = 10000
+
+_etags = OrderedDict()
+_etags_lock = threading.Lock()
+
+
+def file_etag(path, stat=None):
+    """Content-hash ETag of ``path``, cached by (path, mtime, size)."""
+    stat = stat or os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    with _etags_lock:
+        etag = _etags.get(key)
+        if etag is not None:
+            _etags.move_to_end(key)
+            return etag
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    etag = digest.hexdigest()[:32]
+    with _etags_lock:
+        _etags[key] = etag
+        while len(_etags) > ETAG_CACHE_SIZE:
+            _etags.popitem(last=False)
+    return etag
+
+
+def is_immutable(filename):
+    return bool(HASHED_NAME.search(os.path.basename(filename)))
+
+
+def upload_etag(path, filename, stat, offload=False):
+    """ETag for an upload, reading the file only when nothing cheaper will do.
+
+    A content-hashed name already is the hash. When the proxy sends the
+    bytes, ``(mtime, size)`` stands in, as nginx's own ETags do; only files
+    streamed from here get hashed (once, then cached).
+    """
+    match = HASHED_NAME.search(os.path.basename(filename))
+    if match:
+        return match.group(1)
+    if offload:
+        return f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+    return file_etag(path, stat)
+
+
+def send_upload(folder, filename):
+    """Serve ``filename`` from ``folder`` with ETag, Range and cache headers.
+
+    ``UPLOADS_OFFLOAD`` hands the byte transfer to the front proxy:
+    ``'x-accel'`` (nginx, under ``UPLOADS_ACCEL_PREFIX``) or ``'x-sendfile'``
+    (Apache/lighttpd). Otherwise werkzeug streams the file, which gunicorn
+    turns into a sendfile() call.
+    """
+    path = safe_join(folder, filename)
+    if path is None:
+        abort(404)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        abort(404)
+
+    config = current_app.config
+    offload = config.get('UPLOADS_OFFLOAD')
+    etag = upload_etag(path, filename, stat, offload)
+    if offload:
+        response = current_app.response_class(
+            mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        )
+        if offload == 'x-accel':
+            prefix = config.get('UPLOADS_ACCEL_PREFIX', '/protected-uploads/')
+            response.headers['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + filename
+        else:
+            response.headers['X-Sendfile'] = os.path.abspath(path)
+        response.set_etag(etag)
+        response.last_modified = stat.st_mtime
+    else:
+        response = send_file(path, etag=etag, conditional=True, last_modified=stat.st_mtime)
+
+    if is_immutable(filename):
+        response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        response.headers['Cache-Control'] = f"public, max-age={config.get('UPLOADS_MAX_AGE', 3600)}"
+    if offload:
+        response = response.make_conditional(request)
+    return response
@@ -0,0 +1,98 @@
+import hashlib
+import logging
+import os
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+STORAGE_BACKENDS = ('imgbb', 'local')
+
+
+class StorageBackend:
+    """Where processed images end up.
+
+    ``save`` takes the processed ``BytesIO`` plus its extension and
+    ``process_image`` details, and returns the same dict shape as
+    ``upload_to_imgbb`` (``url``, ``delete_url``, ``thumbnail``, ``size``,
+    ``width``, ``height``) or None on failure. ``thumbnail`` may be None
+    when the backend has no thumbnail of its own.
+    """
+
+    name = None
+
+    def save(self, image_data, extension, details):
+        raise NotImplementedError
+
+
+class ImgBBStorage(StorageBackend):
+    """Pushes images to imgbb through the pooled image host client."""
+
+    name = 'imgbb'
+
+    def save(self, image_data, extension, details):
+        # Imported here to avoid a circular import with image_handler
+        from .image_handler import upload_to_imgbb
+
+        return upload_to_imgbb(image_data)
+
+
+class LocalStorage(StorageBackend):
+    """Content-addressed files on local disk, sharded by hash prefix.
+
+    A file with SHA-256 ``abcdef...`` lives at ``<root>/ab/cd/abcdef....<ext>``
+    so no directory grows past 65536 entries per level. Files are written
+    to a temporary name in the target directory and renamed into place, so
+    readers never observe partial files; identical content is stored once.
+    """
+
+    name = 'local'
+
+    def __init__(self, root, url_prefix):
+        self.root = root
+        self.url_prefix = url_prefix.rstrip('/')
+
+    def relative_path(self, digest, extension):
+        return f"{digest[:2]}/{digest[2:4]}/{digest}.{extension}"
+
+    def put(self, data, extension):
+        """Store ``data`` (bytes or a buffer) and return its public URL."""
+        digest = hashlib.sha256(data).hexdigest()
+        relative = self.relative_path(digest, extension.lower())
+        path = os.path.join(self.root, *relative.split('/'))
+        if not os.path.exists(path):
+            directory = os.path.dirname(path)
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, path)
+            except BaseException:
+                try:
+                    os.unlink(temp_path)
+                except OSError:
+                    pass
+                raise
+        return f"{self.url_prefix}/{relative}"
+
+    def save(self, image_data, extension, details):
+        try:
+            buffer = image_data.getbuffer()
+            try:
+                url = self.put(buffer, extension)
+                size = buffer.nbytes
+            finally:
+                buffer.release()
+        except OSError as e:
+            logger.error(f"Error storing image locally: {str(e)}")
+            return None
+        return {
+            'url': url,
+            'delete_url': None,
+            'thumbnail': None,
+            'size': size,
+            'width': details['width'],
+            'height': details['height']
+        }
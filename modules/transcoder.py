@@ -0,0 +1,105 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+logger = logging.getLogger(__name__)
+
+
+class TranscoderBusy(Exception):
+    """Raised when the transcoding queue stays full past the wait timeout."""
+
+
+def transcode(data, derivative_widths=None, probe=None):
+    """Pool entry point: run ``process_image`` on raw bytes in a worker process."""
+    from .image_handler import process_image
+
+    output, original_details, processed_details = process_image(BytesIO(data), derivative_widths, probe)
+    if output is None:
+        return None, None, None
+    return output.getvalue(), original_details, processed_details
+
+
+class TranscodePool:
+    """Persistent process pool for the CPU-bound decode/resize/encode work.
+
+    At most ``max_pending`` images are queued or in flight; callers beyond
+    that wait up to ``wait_timeout`` seconds for a slot and then get
+    :class:`TranscoderBusy`, so overload turns into fast 503s instead of an
+    unbounded backlog. Worker processes are started with ``forkserver``
+    (``spawn`` where unavailable) so they never inherit request threads.
+    """
+
+    def __init__(self, max_workers, max_pending=None, wait_timeout=5):
+        self.max_workers = max_workers
+        self.max_pending = max_pending or max_workers * 2
+        self.wait_timeout = wait_timeout
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pending = 0
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+                self._pid = os.getpid()
+            return self._executor
+
+    def pending(self):
+        """Number of images queued or being transcoded."""
+        return self._pending
+
+    def _release(self, future=None):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def submit(self, data, derivative_widths=None, probe=None):
+        """Queue raw image bytes; returns a future of ``transcode``'s result."""
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            raise TranscoderBusy('Transcoding queue is full')
+        with self._lock:
+            self._pending += 1
+        try:
+            future = self._get_executor().submit(transcode, data, derivative_widths, probe)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM); start a fresh pool and retry once
+            logger.error("Transcoding pool is broken, restarting it")
+            with self._lock:
+                self._executor = None
+            try:
+                future = self._get_executor().submit(transcode, data, derivative_widths, probe)
+            except Exception:
+                self._release()
+                raise
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def process(self, data, derivative_widths=None, probe=None):
+        """Transcode ``data`` and return ``(BytesIO, original, processed)`` details."""
+        try:
+            output, original_details, processed_details = self.submit(data, derivative_widths, probe).result()
+        except BrokenProcessPool as e:
+            logger.error(f"Transcoding worker crashed: {str(e)}")
+            with self._lock:
+                self._executor = None
+            return None, None, None
+        if output is None:
+            return None, None, None
+        return BytesIO(output), original_details, processed_details
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=wait)
+            self._executor = None
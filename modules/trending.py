@@ -0,0 +1,153 @@
+import heapq
+import math
+import threading
+import time
+
+# Trending windows and their half-lives in seconds; 'all' ranks by lifetime counts
+DECAY_WINDOWS = {'hour': 3600, 'day': 24 * 3600}
+WINDOWS = ('all',) + tuple(DECAY_WINDOWS)
+# Decayed scores are rescaled before exp() comes anywhere near overflowing
+MAX_EXPONENT = 500.0
+SYNC_BATCH = 10000
+
+
+class TopIndex:
+    """Scores per photo with a max-heap for top-K reads.
+
+    A score change pushes one heap entry, O(log N). Entries left behind by
+    earlier scores are skipped on read and compacted away once they
+    outnumber the live ones.
+    """
+
+    def __init__(self):
+        self.scores = {}
+        self._heap = []
+
+    def __len__(self):
+        return len(self.scores)
+
+    def add(self, photo, delta):
+        score = self.scores.get(photo, 0) + delta
+        if score > 0:
+            self.scores[photo] = score
+            heapq.heappush(self._heap, (-score, photo))
+        else:
+            self.scores.pop(photo, None)
+        if len(self._heap) > 2 * len(self.scores) + 64:
+            self._rebuild()
+
+    def rescale(self, factor):
+        """Multiply every score by ``factor``; scores that reach zero are dropped."""
+        self.scores = {photo: score * factor for photo, score in self.scores.items() if score * factor > 0}
+        self._rebuild()
+
+    def _rebuild(self):
+        self._heap = [(-score, photo) for photo, score in self.scores.items()]
+        heapq.heapify(self._heap)
+
+    def top(self, k):
+        """Return the ``k`` highest ``(photo, score)`` pairs, best first."""
+        found, seen = [], set()
+        while self._heap and len(found) < k:
+            entry = heapq.heappop(self._heap)
+            if entry[1] in seen or self.scores.get(entry[1]) != -entry[0]:
+                continue
+            seen.add(entry[1])
+            found.append(entry)
+        for entry in found:
+            heapq.heappush(self._heap, entry)
+        return [(photo, -score) for score, photo in found]
+
+
+class ReactionRanking:
+    """Top photos by reactions, overall and per emoji, for each window.
+
+    'all' ranks by current counts. The decayed windows use forward decay: a
+    reaction given at ``t`` adds ``2 ** ((t - landmark) / half_life)``, so
+    older scores never need touching as time passes and reads scale by the
+    same factor at the current time. They count reactions given (a changed
+    reaction counts for its new emoji) and start from the retained event log.
+
+    Everything is fed by the store's event log, so reactions written by
+    other workers show up on the next ``sync``.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._indexes = {}  # (window, emoji or None) -> TopIndex
+        self._landmark = None
+        self._cursor = None
+        self._lock = threading.Lock()
+
+    def _index(self, window, emoji):
+        index = self._indexes.get((window, emoji))
+        if index is None:
+            index = self._indexes[(window, emoji)] = TopIndex()
+        return index
+
+    def _decay(self, photo, emoji, created_at):
+        for window, half_life in DECAY_WINDOWS.items():
+            exponent = (created_at - self._landmark) / half_life
+            if exponent * math.log(2) > MAX_EXPONENT:
+                self._move_landmark(created_at)
+                exponent = 0.0
+            weight = 2.0 ** exponent
+            self._index(window, None).add(photo, weight)
+            self._index(window, emoji).add(photo, weight)
+
+    def _move_landmark(self, landmark):
+        for (window, _), index in self._indexes.items():
+            if window in DECAY_WINDOWS:
+                # Photos whose weight underflows to zero drop out here
+                index.rescale(2.0 ** ((self._landmark - landmark) / DECAY_WINDOWS[window]))
+        self._landmark = landmark
+
+    def _load(self):
+        counts, events, cursor = self.store.snapshot()
+        self._landmark = time.time()
+        for photo, emoji, count in counts:
+            self._index('all', None).add(photo, count)
+            self._index('all', emoji).add(photo, count)
+        for photo, emoji, created_at in events:
+            self._decay(photo, emoji, created_at)
+        self._cursor = cursor
+
+    def sync(self):
+        """Apply reaction events written since the last sync."""
+        with self._lock:
+            if self._cursor is None:
+                self._load()
+            while True:
+                events, self._cursor = self.store.events(self._cursor, limit=SYNC_BATCH)
+                for photo, emoji, delta, created_at in events:
+                    self._index('all', None).add(photo, delta)
+                    self._index('all', emoji).add(photo, delta)
+                    if delta > 0:
+                        self._decay(photo, emoji, created_at)
+                if len(events) < SYNC_BATCH:
+                    break
+
+    def top(self, window='all', emoji=None, limit=10, now=None):
+        """Return up to ``limit`` ``(photo, score)`` pairs for ``window``, best first.
+
+        Decayed scores are in reactions, each weighted by half for every
+        half-life since it was given.
+        """
+        if window not in WINDOWS:
+            raise ValueError(f"Unknown window: {window}")
+        self.sync()
+        with self._lock:
+            index = self._indexes.get((window, emoji))
+            entries = index.top(limit) if index else []
+            if window == 'all':
+                return entries
+            now = now or time.time()
+            exponent = (now - self._landmark) / DECAY_WINDOWS[window]
+            if exponent * math.log(2) > MAX_EXPONENT:
+                # No reactions for a long while: rescale to a landmark of now
+                # rather than let the factor overflow
+                self._move_landmark(now)
+                entries = index.top(limit) if index else []
+                exponent = 0.0
+            factor = 2.0 ** exponent
+            return [(photo, score / factor) for photo, score in entries]
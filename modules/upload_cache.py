@@ -0,0 +1,201 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from PIL import Image
+
+from .db import SQLiteDatabase
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def content_hash(image_file):
+    """SHA-256 of a file-like object's bytes, read in chunks; rewinds the file."""
+    digest = hashlib.sha256()
+    image_file.seek(0)
+    for chunk in iter(lambda: image_file.read(HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    image_file.seek(0)
+    return digest.hexdigest()
+
+
+def perceptual_hash(image_file):
+    """64-bit difference hash (dHash) of an image; rewinds the file.
+
+    JPEGs are decoded in draft mode at 1/8 scale, so this costs a fraction
+    of a full decode. Returns None for undecodable input.
+    """
+    try:
+        image_file.seek(0)
+        with Image.open(image_file) as img:
+            img.draft('L', (64, 64))
+            pixels = list(img.convert('L').resize((9, 8), Image.Resampling.BILINEAR).getdata())
+    except Exception as e:
+        logger.warning(f"Could not compute perceptual hash: {str(e)}")
+        return None
+    finally:
+        image_file.seek(0)
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return f'{bits:016x}'
+
+
+class UploadCache:
+    """Bounded LRU index from upload content hashes to saved ``photo_data``.
+
+    Exact matches use the SHA-256 of the raw upload. With ``perceptual``
+    enabled, uploads whose dHash equals a cached one (e.g. the same picture
+    re-saved or re-scaled) are treated as duplicates too.
+
+    Entries live in this process; :class:`SQLiteUploadCache` shares them
+    between workers.
+    """
+
+    def __init__(self, max_entries=10000, perceptual=False):
+        self.max_entries = max_entries
+        self.perceptual = perceptual
+        self._entries = OrderedDict()  # content hash -> (photo_data, perceptual hash)
+        self._perceptual = {}  # perceptual hash -> content hash
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.perceptual_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _find(self, content):
+        with self._lock:
+            entry = self._entries.get(content)
+            if entry is None:
+                return None
+            self._entries.move_to_end(content)
+            return entry[0]
+
+    def _find_perceptual(self, perceptual):
+        with self._lock:
+            content = self._perceptual.get(perceptual)
+        return self._find(content) if content is not None else None
+
+    def _store(self, keys, photo_data):
+        """Save an entry; returns how many entries were evicted to make room."""
+        evicted_count = 0
+        with self._lock:
+            self._entries[keys['content']] = (photo_data, keys['perceptual'])
+            self._entries.move_to_end(keys['content'])
+            if keys['perceptual']:
+                self._perceptual[keys['perceptual']] = keys['content']
+            while len(self._entries) > self.max_entries:
+                evicted, (_, evicted_perceptual) = self._entries.popitem(last=False)
+                if evicted_perceptual and self._perceptual.get(evicted_perceptual) == evicted:
+                    del self._perceptual[evicted_perceptual]
+                evicted_count += 1
+        return evicted_count
+
+    def lookup(self, image_file):
+        """Return ``(photo_data, keys)``; ``photo_data`` is None on a miss.
+
+        ``keys`` must be passed back to :meth:`add` after a miss is uploaded.
+        """
+        keys = {'content': content_hash(image_file), 'perceptual': None}
+        photo_data = self._find(keys['content'])
+        if photo_data is not None:
+            with self._lock:
+                self.hits += 1
+            return photo_data, keys
+        if self.perceptual:
+            keys['perceptual'] = perceptual_hash(image_file)
+            photo_data = self._find_perceptual(keys['perceptual'])
+            if photo_data is not None:
+                with self._lock:
+                    self.perceptual_hits += 1
+                return photo_data, keys
+        with self._lock:
+            self.misses += 1
+        return None, keys
+
+    def add(self, keys, photo_data):
+        evicted = self._store(keys, photo_data)
+        with self._lock:
+            self.evictions += evicted
+
+    def stats(self):
+        """Entry count, plus this process's hit and miss counts."""
+        entries = len(self)
+        with self._lock:
+            lookups = self.hits + self.perceptual_hits + self.misses
+            return {
+                'entries': entries,
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'perceptual_hits': self.perceptual_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (self.hits + self.perceptual_hits) / lookups if lookups else 0.0,
+            }
+
+
+class SQLiteUploadCache(UploadCache):
+    """The duplicate-upload index in a SQLite file shared by the workers of one host.
+
+    A duplicate is caught whichever worker handled the first upload.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS upload_cache (
+            content TEXT PRIMARY KEY,
+            perceptual TEXT,
+            photo_data TEXT NOT NULL,
+            used_at REAL NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS upload_cache_perceptual ON upload_cache (perceptual);
+        CREATE INDEX IF NOT EXISTS upload_cache_used_at ON upload_cache (used_at);
+    """
+
+    def __init__(self, path, max_entries=10000, perceptual=False):
+        super().__init__(max_entries, perceptual)
+        self.path = path
+        self.db = SQLiteDatabase(path, self.SCHEMA)
+
+    def __len__(self):
+        return self.db.execute('SELECT COUNT(*) FROM upload_cache').fetchone()[0]
+
+    def _touch(self, row):
+        if row is None:
+            return None
+        self.db.execute('UPDATE upload_cache SET used_at = ? WHERE content = ?', (time.time(), row[0]))
+        return json.loads(row[1])
+
+    def _find(self, content):
+        return self._touch(self.db.execute(
+            'SELECT content, photo_data FROM upload_cache WHERE content = ?', (content,)
+        ).fetchone())
+
+    def _find_perceptual(self, perceptual):
+        return self._touch(self.db.execute(
+            'SELECT content, photo_data FROM upload_cache WHERE perceptual = ? ORDER BY used_at DESC LIMIT 1',
+            (perceptual,)
+        ).fetchone())
+
+    def _store(self, keys, photo_data):
+        with self.db.transaction() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO upload_cache (content, perceptual, photo_data, used_at) VALUES (?, ?, ?, ?)',
+                (keys['content'], keys['perceptual'], json.dumps(photo_data), time.time())
+            )
+            excess = conn.execute('SELECT COUNT(*) FROM upload_cache').fetchone()[0] - self.max_entries
+            if excess <= 0:
+                return 0
+            conn.execute(
+                'DELETE FROM upload_cache WHERE content IN '
+                '(SELECT content FROM upload_cache ORDER BY used_at LIMIT ?)', (excess,)
+            )
+            return excess
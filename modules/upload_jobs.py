@@ -0,0 +1,184 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from .db import SQLiteDatabase
+from .metrics import process_alive
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs kept around for status polling before the oldest are dropped
+MAX_FINISHED_JOBS = 1000
+INTERRUPTED_ERROR = 'Upload was interrupted, please try again'
+
+
+class UploadQueueFull(Exception):
+    """Raised when every upload job slot in this process is taken."""
+
+
+class UploadJobStore:
+    """Upload job status in a SQLite file shared by the workers of one host.
+
+    Whichever worker ran the job, any worker can answer a status poll, and
+    the status outlives the worker. Each job records the PID running it, so
+    a job whose worker died before finishing reads as failed.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS upload_jobs (
+            id TEXT PRIMARY KEY,
+            filename TEXT NOT NULL,
+            status TEXT NOT NULL,
+            stage TEXT,
+            created REAL NOT NULL,
+            finished REAL,
+            result TEXT,
+            error TEXT,
+            pid INTEGER NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS upload_jobs_finished ON upload_jobs (finished);
+    """
+    FIELDS = ('id', 'filename', 'status', 'stage', 'created', 'finished', 'result', 'error')
+
+    def __init__(self, path):
+        self.path = path
+        self.db = SQLiteDatabase(path, self.SCHEMA)
+
+    def create(self, filename):
+        job_id = uuid.uuid4().hex
+        self.db.execute(
+            "INSERT INTO upload_jobs (id, filename, status, created, pid) VALUES (?, ?, 'queued', ?, ?)",
+            (job_id, filename, time.time(), os.getpid())
+        )
+        return job_id
+
+    def get(self, job_id):
+        row = self.db.execute(
+            f"SELECT {', '.join(self.FIELDS)}, pid FROM upload_jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(self.FIELDS, row[:-1]))
+        job['result'] = json.loads(job['result']) if job['result'] is not None else None
+        if job['finished'] is None and not process_alive(row[-1]):
+            self.finish(job_id, status='failed', error=INTERRUPTED_ERROR, running=False)
+            return self.get(job_id)
+        return job
+
+    def update(self, job_id, **fields):
+        assignments = ', '.join(f'{key} = ?' for key in fields)
+        self.db.execute(f'UPDATE upload_jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+
+    def finish(self, job_id, status, result=None, error=None, running=True):
+        """Record a job's outcome; ``running=False`` only fails a job nobody else finished."""
+        with self.db.transaction() as conn:
+            conn.execute(
+                'UPDATE upload_jobs SET status = ?, result = ?, error = ?, finished = ? '
+                f"WHERE id = ?{'' if running else ' AND finished IS NULL'}",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id)
+            )
+            conn.execute(
+                'DELETE FROM upload_jobs WHERE finished <= ('
+                'SELECT finished FROM upload_jobs WHERE finished IS NOT NULL '
+                'ORDER BY finished DESC LIMIT 1 OFFSET ?)',
+                (MAX_FINISHED_JOBS,)
+            )
+
+    def size(self):
+        return self.db.size()
+
+
+class UploadJobQueue:
+    """Runs the upload pipeline on a background thread pool.
+
+    Job status lives in an :class:`UploadJobStore`. Each queued job holds
+    its upload bytes until it runs, so at most ``max_pending`` jobs are
+    queued or running per process; past that ``submit`` raises
+    :class:`UploadQueueFull` right away. The pool is created lazily so it
+    is never inherited across a fork.
+    """
+
+    def __init__(self, store, max_workers=4, max_pending=None):
+        self.store = store
+        self.max_workers = max_workers
+        self.max_pending = max_pending or max_workers * 4
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pending = 0
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._pid != os.getpid():
+            # Slots held in the parent belong to jobs that never run here
+            self._slots = threading.BoundedSemaphore(self.max_pending)
+            self._pending = 0
+            self._executor = None
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix='upload-job'
+            )
+            self._pid = os.getpid()
+        return self._executor
+
+    def pending(self):
+        """Number of jobs queued or in progress in this process."""
+        return self._pending
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def submit(self, app, data, filename):
+        """Queue ``data`` (the raw upload bytes) and return the new job ID."""
+        with self._lock:
+            executor = self._get_executor()
+            if not self._slots.acquire(blocking=False):
+                raise UploadQueueFull('Upload queue is full')
+            self._pending += 1
+        try:
+            job_id = self.store.create(filename)
+            executor.submit(self._run, app, job_id, data, filename)
+        except Exception:
+            self._release()
+            raise
+        return job_id
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def _run(self, app, job_id, data, filename):
+        # Imported here to avoid a circular import with image_handler
+        from .image_handler import run_upload_pipeline
+
+        try:
+            self.store.update(job_id, status='processing')
+            with app.app_context():
+                result, status = run_upload_pipeline(
+                    BytesIO(data), filename,
+                    progress=lambda stage: self.store.update(job_id, stage=stage)
+                )
+            if status == 200:
+                self.store.finish(job_id, status='done', result=result)
+            else:
+                self.store.finish(job_id, status='failed', error=result.get('error'))
+        except Exception as e:
+            logger.error(f"Upload job {job_id} failed: {str(e)}")
+            try:
+                self.store.finish(job_id, status='failed', error='Error processing upload')
+            except Exception as e:
+                logger.error(f"Error recording upload job {job_id}: {str(e)}")
+        finally:
+            self._release()
+
+    def shutdown(self, wait=True):
+        """Stop accepting work; with ``wait`` drain the jobs already queued."""
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=wait)
+            self._executor = None
@@ -8,9 +8,28 @@ class PhotoManager {
         this.uploadForm = document.getElementById('upload-form');
         this.refreshButton = document.getElementById('refresh-photos');
         this.photoDetails = document.getElementById('photo-details');
+        this.nextPhotoButton = document.getElementById('next-photo');
+        this.pageSize = 30;
+        // Random photos fetched ahead of time, each with its image preloading
+        this.randomQueue = [];
+        this.randomBatchSize = 5;
+        this.randomLowWater = 2;
+        this.randomRefill = null;
+        this.reactionSummaries = new Map();
+        this.nextCursor = null;
+        this.sentinel = document.createElement('div');
+        this.sentinel.className = 'photos-sentinel';
+        this.observer = 'IntersectionObserver' in window
+            ? new IntersectionObserver((entries) => {
+                if (entries.some(entry => entry.isIntersecting)) this.loadMorePhotos();
+            }, { rootMargin: '400px' })
+            : null;
         
         this.initializeEventListeners();
         this.loadPhotos();
+        if (this.photoContainer) {
+            this.fetchRandomPhoto();
+        }
     }
 
     initializeEventListeners() {
@@ -18,6 +37,10 @@ class PhotoManager {
             this.refreshButton.addEventListener('click', () => this.loadPhotos());
         }
 
+        if (this.nextPhotoButton) {
+            this.nextPhotoButton.addEventListener('click', () => this.fetchRandomPhoto());
+        }
+
         if (this.uploadForm) {
             this.uploadForm.addEventListener('submit', (e) => this.handleUpload(e));
             
@@ -66,6 +89,26 @@ class PhotoManager {
         }
     }
 
+    photosUrl(cursor) {
+        const params = new URLSearchParams({
+            limit: this.pageSize,
+            fields: 'filename,timestamp,thumbnail,url,details,derivatives'
+        });
+        if (cursor) params.set('after', cursor);
+        return `/api/photos?${params}`;
+    }
+
+    async fetchPhotoPage(cursor) {
+        const response = await fetch(this.photosUrl(cursor));
+        const data = await response.json();
+
+        if (!data.success) {
+            throw new Error(data.error || 'Error fetching photos');
+        }
+        this.nextCursor = data.next_cursor;
+        return data.photos;
+    }
+
     async loadPhotos() {
         if (this.loadingPhoto) return;
         
@@ -73,14 +116,8 @@ class PhotoManager {
             this.loadingPhoto = true;
             this.showGridLoading();
             
-            const response = await fetch('/api/photos');
-            const data = await response.json();
-            
-            if (!data.success) {
-                throw new Error(data.error || 'Error fetching photos');
-            }
-            
-            this.displayPhotoGrid(data.photos);
+            const photos = await this.fetchPhotoPage(null);
+            this.displayPhotoGrid(photos);
             
         } catch (error) {
             console.error('Error fetching photos:', error);
@@ -90,6 +127,21 @@ class PhotoManager {
         }
     }
 
+    async loadMorePhotos() {
+        if (this.loadingPhoto || !this.nextCursor) return;
+
+        try {
+            this.loadingPhoto = true;
+            const photos = await this.fetchPhotoPage(this.nextCursor);
+            this.appendPhotos(photos);
+        } catch (error) {
+            console.error('Error fetching more photos:', error);
+            this.showError('Failed to load more photos. Please try again.');
+        } finally {
+            this.loadingPhoto = false;
+        }
+    }
+
     showGridLoading() {
         if (this.photosGrid) {
             this.photosGrid.innerHTML = '<div class="loading-spinner"></div>';
@@ -111,13 +163,21 @@ class PhotoManager {
             return;
         }
         
+        this.appendPhotos(photos);
+    }
+
+    appendPhotos(photos) {
+        if (!this.photosGrid) return;
+
         photos.forEach(photo => {
             const photoElement = document.createElement('div');
             photoElement.className = 'photo-item';
+            photoElement.dataset.filename = photo.filename;
             photoElement.innerHTML = `
-                <img src="${photo.thumbnail}" alt="Photo" loading="lazy">
+                ${this.pictureMarkup(photo)}
                 <div class="overlay">
                     <div class="photo-date">${new Date(photo.timestamp).toLocaleDateString()}</div>
+                    <div class="photo-reactions"></div>
                 </div>
             `;
             
@@ -129,6 +189,97 @@ class PhotoManager {
             
             this.photosGrid.appendChild(photoElement);
         });
+
+        this.loadReactionSummaries(photos.map(photo => photo.filename));
+
+        // Keep the sentinel last so scrolling to it loads the next page
+        if (this.observer) {
+            this.observer.unobserve(this.sentinel);
+            if (this.nextCursor) {
+                this.photosGrid.appendChild(this.sentinel);
+                this.observer.observe(this.sentinel);
+            } else {
+                this.sentinel.remove();
+            }
+        }
+    }
+
+    pictureMarkup(photo) {
+        // Responsive sources from the server-side derivatives, best format first
+        const sources = ['avif', 'webp'].map(format => {
+            const variants = (photo.derivatives || []).filter(d => d.format === format);
+            if (!variants.length) return '';
+            const srcset = variants.map(d => `${d.url} ${d.width}w`).join(', ');
+            return `<source type="image/${format}" srcset="${srcset}" sizes="(max-width: 576px) 50vw, 300px">`;
+        }).join('');
+
+        return `<picture>${sources}<img src="${photo.thumbnail}" alt="Photo" loading="lazy"></picture>`;
+    }
+
+    refillRandomQueue() {
+        // One batch request at a time; callers share the pending one
+        if (this.randomRefill) return this.randomRefill;
+
+        this.randomRefill = (async () => {
+            try {
+                const response = await fetch(`/api/photos/random?count=${this.randomBatchSize}`);
+                if (!response.ok) return;
+                const data = await response.json();
+                const queued = new Set(this.randomQueue.map(entry => entry.photo.filename));
+                data.photos
+                    .filter(photo => !queued.has(photo.filename))
+                    .forEach(photo => this.randomQueue.push(this.preloadPhoto(photo)));
+            } catch (error) {
+                console.error('Error prefetching random photos:', error);
+            } finally {
+                this.randomRefill = null;
+            }
+        })();
+        return this.randomRefill;
+    }
+
+    preloadPhoto(photo) {
+        // The preloaded element itself is shown later, so nothing is fetched twice
+        const img = new Image();
+        const variants = (photo.derivatives || []).filter(d => d.format === 'webp');
+        if (variants.length) {
+            img.sizes = '(max-width: 768px) 100vw, 700px';
+            img.srcset = variants.map(d => `${d.url} ${d.width}w`).join(', ');
+        }
+        img.src = photo.url;
+        img.alt = 'Random photo';
+        img.className = 'img-fluid';
+        img.decode().catch(() => {});
+        return { photo, img };
+    }
+
+    async fetchRandomPhoto() {
+        if (!this.photoContainer) return;
+
+        if (!this.randomQueue.length) {
+            this.photoContainer.innerHTML = '<div class="loading-spinner"></div>';
+            await this.refillRandomQueue();
+        }
+
+        const entry = this.randomQueue.shift();
+        if (this.randomQueue.length < this.randomLowWater) {
+            this.refillRandomQueue();
+        }
+
+        if (!entry) {
+            this.photoContainer.innerHTML = `
+                <div class="text-center text-muted p-4">
+                    <i class="bi bi-image fs-1"></i>
+                    <p class="mt-2">No photos yet</p>
+                </div>
+            `;
+            return;
+        }
+
+        this.currentPhoto = entry.photo;
+        this.photoContainer.replaceChildren(entry.img);
+        this.displayPhotoDetails(entry.photo);
+        this.loadReactions(entry.photo.filename);
     }
 
     displayPhotoDetails(photo) {
@@ -178,7 +329,12 @@ class PhotoManager {
                 body: formData
             });
 
-            const data = await response.json();
+            let data = await response.json();
+
+            // Queued uploads answer 202 with a job to poll
+            if (response.status === 202 && data.success) {
+                data = await this.waitForUploadJob(data.status_url);
+            }
 
             if (response.ok && data.success) {
                 this.showSuccess('Photo uploaded successfully!');
@@ -195,12 +351,60 @@ class PhotoManager {
         }
     }
 
+    async waitForUploadJob(statusUrl) {
+        for (;;) {
+            await new Promise(resolve => setTimeout(resolve, 500));
+            const response = await fetch(statusUrl);
+            const data = await response.json();
+
+            if (!data.success) return data;
+            if (data.job.status === 'done') return data.job.result;
+            if (data.job.status === 'failed') return { success: false, error: data.job.error };
+        }
+    }
+
+    async loadReactionSummaries(filenames) {
+        if (!filenames.length) return;
+
+        try {
+            // One request for the whole page instead of one per card
+            const params = new URLSearchParams({ photos: filenames.join(',') });
+            const response = await fetch(`/api/reactions?${params}`);
+            const data = await response.json();
+
+            if (data.success) {
+                Object.entries(data.reactions).forEach(([filename, reactions]) => {
+                    this.setReactionSummary(filename, reactions);
+                });
+            }
+        } catch (error) {
+            console.error('Error loading reactions:', error);
+        }
+    }
+
+    setReactionSummary(filename, reactions) {
+        this.reactionSummaries.set(filename, reactions);
+
+        const card = this.photosGrid && this.photosGrid.querySelector(`[data-filename="${CSS.escape(filename)}"] .photo-reactions`);
+        if (card) {
+            card.textContent = Object.entries(reactions)
+                .map(([reaction, count]) => `${reaction} ${count}`)
+                .join(' ');
+        }
+    }
+
     async loadReactions(photoFilename) {
+        if (this.reactionSummaries.has(photoFilename)) {
+            this.updateReactions(this.reactionSummaries.get(photoFilename));
+            return;
+        }
+
         try {
-            const response = await fetch(`/api/reaction/${photoFilename}`);
+            const response = await fetch(`/api/reaction/${encodeURIComponent(photoFilename)}`);
             const data = await response.json();
             
             if (data.success) {
+                this.setReactionSummary(photoFilename, data.reactions);
                 this.updateReactions(data.reactions);
             }
         } catch (error) {
@@ -239,6 +443,7 @@ class PhotoManager {
             const data = await response.json();
             
             if (data.success) {
+                this.setReactionSummary(photoFilename, data.reactions);
                 this.updateReactions(data.reactions);
             } else {
                 this.showError(data.error || 'Failed to add reaction');
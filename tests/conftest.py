@@ -0,0 +1,31 @@
+import pytest
+from fake_imgbb import FakeImgBB
+from app import app
+from modules import http_client
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Test client for the app, with its data in ``tmp_path``.
+
+    Config goes through ``monkeypatch`` so no test leaks settings into the
+    next; modules that need more settings override this fixture.
+    """
+    monkeypatch.setitem(app.config, 'TESTING', True)
+    monkeypatch.setitem(app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.delitem(app.extensions, 'upload_cache', raising=False)
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def fake_imgbb(monkeypatch):
+    """Point the image host client at a local fake imgbb server."""
+    server = FakeImgBB().start()
+    monkeypatch.setenv('IMGBB_API_KEY', 'test-key')
+    monkeypatch.setenv('IMGBB_UPLOAD_URL', server.url)
+    monkeypatch.setenv('IMGBB_RETRY_BACKOFF', '0.01')
+    # Fresh client per test so breaker state never leaks between tests
+    monkeypatch.setattr(http_client, '_client', None)
+    yield server
+    server.stop()
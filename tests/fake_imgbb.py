@@ -0,0 +1,112 @@
+"""A local stand-in for the imgbb upload API used by the tests."""
+import base64
+import json
+import threading
+import time
+from email import message_from_bytes
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from urllib.parse import parse_qs
+
+from PIL import Image
+
+
+class FakeImgBB:
+    """Serves ``POST /1/upload`` on localhost and records every upload.
+
+    ``delay`` stalls each response and ``failures`` is a list of status codes
+    returned (one per request) before uploads start succeeding.
+    """
+
+    def __init__(self):
+        self.uploads = []
+        self.requests = 0
+        self.delay = 0
+        self.failures = []
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.server.server_port}/1/upload'
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                with fake._lock:
+                    fake.requests += 1
+                    failure = fake.failures.pop(0) if fake.failures else None
+                if fake.delay:
+                    time.sleep(fake.delay)
+                if failure is not None:
+                    return self._reply(failure, {'success': False})
+
+                image = fake.parse_image(self.headers.get('Content-Type', ''), body)
+                if image is None:
+                    return self._reply(400, {'success': False, 'error': 'No image'})
+                with Image.open(BytesIO(image)) as img:
+                    width, height = img.size
+                with fake._lock:
+                    fake.uploads.append(image)
+                    number = len(fake.uploads)
+                base = f'http://127.0.0.1:{fake.server.server_port}/i/{number}'
+                self._reply(200, {
+                    'success': True,
+                    'data': {
+                        'url': f'{base}.jpg',
+                        'delete_url': f'{base}/delete',
+                        'thumb': {'url': f'{base}_thumb.jpg'},
+                        'size': len(image),
+                        'width': width,
+                        'height': height,
+                    }
+                })
+
+            def _reply(self, status, payload):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    @staticmethod
+    def parse_image(content_type, body):
+        """Extract the image bytes from a form-encoded or multipart body."""
+        if content_type.startswith('multipart/form-data'):
+            message = message_from_bytes(
+                f'Content-Type: {content_type}\r\n\r\n'.encode('latin-1') + body, policy=HTTP
+            )
+            for part in message.iter_parts():
+                if part.get_param('name', header='content-disposition') == 'image':
+                    return part.get_payload(decode=True)
+            return None
+        fields = parse_qs(body.decode('ascii'))
+        if 'image' not in fields:
+            return None
+        return base64.b64decode(fields['image'][0])
+
+
+if __name__ == '__main__':
+    # Run standalone (e.g. in a separate process for memory measurements)
+    fake = FakeImgBB()
+    print(fake.url, flush=True)
+    fake.server.serve_forever()
@@ -0,0 +1,72 @@
+"""Image quality and process memory measurements shared by the tests and benchmarks."""
+import resource
+from io import BytesIO
+
+from PIL import Image, ImageMath
+
+# Minimum SSIM of the fast path against a full-resolution decode + LANCZOS.
+# Both sides go through the quality 85 JPEG encoder, which alone costs about
+# 0.01-0.02; before encoding the two paths measure above 0.99.
+SSIM_TOLERANCE = 0.97
+
+
+def full_decode(data):
+    """The pre-draft path: decode every pixel, LANCZOS to the limits, encode."""
+    from modules.image_handler import MAX_WIDTH, MAX_HEIGHT
+
+    img = Image.open(BytesIO(data)).convert('RGB')
+    if img.width > MAX_WIDTH or img.height > MAX_HEIGHT:
+        ratio = min(MAX_WIDTH/img.width, MAX_HEIGHT/img.height)
+        img = img.resize((int(img.width * ratio), int(img.height * ratio)), Image.Resampling.LANCZOS)
+    # Same encoder settings as process_image, so only the decode path differs
+    output = BytesIO()
+    img.save(output, format='JPEG', optimize=True, quality=85)
+    output.seek(0)
+    return Image.open(output)
+
+
+def ssim(a, b, block=8):
+    """Mean SSIM of two same-sized images over non-overlapping luma blocks."""
+    x = a.convert('L').convert('F')
+    y = b.convert('L').convert('F')
+    grid = (max(x.width // block, 1), max(x.height // block, 1))
+
+    def means(img):
+        return list(img.resize(grid, Image.Resampling.BOX).getdata())
+
+    mx, my = means(x), means(y)
+    mxx = means(ImageMath.eval('a*a', a=x))
+    myy = means(ImageMath.eval('b*b', b=y))
+    mxy = means(ImageMath.eval('a*b', a=x, b=y))
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    total = 0.0
+    for ux, uy, uxx, uyy, uxy in zip(mx, my, mxx, myy, mxy):
+        vx, vy, cov = uxx - ux * ux, uyy - uy * uy, uxy - ux * uy
+        total += ((2 * ux * uy + c1) * (2 * cov + c2)) / ((ux * ux + uy * uy + c1) * (vx + vy + c2))
+    return total / len(mx)
+
+
+def peak_rss_kib():
+    """Peak RSS of this process in KiB.
+
+    VmHWM is preferred because ru_maxrss also counts the parent's peak from
+    before the exec on Linux.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def reset_peak_rss():
+    """Reset VmHWM to the current RSS; returns False where Linux refuses."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
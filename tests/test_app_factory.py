@@ -0,0 +1,23 @@
+from app import create_app, shutdown_app
+from modules.image_handler import get_job_queue
+
+
+def test_create_app_builds_independent_apps(tmp_path):
+    """Test the factory applies overrides and each app gets its own state."""
+    first = create_app({'TESTING': True, 'UPLOAD_FOLDER': str(tmp_path / 'a')})
+    second = create_app({'TESTING': True, 'UPLOAD_FOLDER': str(tmp_path / 'b')})
+    assert first is not second
+    assert first.config['UPLOAD_FOLDER'] != second.config['UPLOAD_FOLDER']
+    assert first.test_client().get('/health').status_code == 200
+    assert (tmp_path / 'a').is_dir()
+
+
+def test_shutdown_app_drains_jobs(tmp_path):
+    """Test shutdown waits for queued upload jobs to finish."""
+    app = create_app({'TESTING': True, 'UPLOAD_FOLDER': str(tmp_path)})
+    with app.app_context():
+        queue = get_job_queue()
+        job_ids = [queue.submit(app, b'not an image', f'{i}.jpg') for i in range(5)]
+    shutdown_app(app)
+    assert queue.pending() == 0
+    assert all(queue.get(job_id)['status'] == 'failed' for job_id in job_ids)
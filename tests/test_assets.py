@@ -0,0 +1,101 @@
+import gzip
+import json
+import os
+import re
+
+from app import create_app
+from modules.assets import build_assets
+
+app_static = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+TEMPLATE_LITERAL = re.compile(r'`(?:\\.|[^`\\])*`')
+
+
+def make_app(tmp_path, **config):
+    return create_app({'TESTING': True, 'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+                       'ASSETS_FOLDER': str(tmp_path / 'dist'), **config})
+
+
+def test_build_assets_hashes_and_compresses(tmp_path):
+    """Test CSS is minified under a content-hashed name with a gzip copy."""
+    static = tmp_path / 'static'
+    (static / 'css').mkdir(parents=True)
+    source = static / 'css' / 'app.css'
+    source.write_text('/* a comment */\n.card {\n    margin: 0 auto;\n}\n' * 50)
+    out = tmp_path / 'dist'
+    out.mkdir()
+
+    manifest = build_assets(str(static), str(out))
+    name = manifest['css/app.css']
+    assert name.startswith('css/app.') and name.endswith('.css') and len(name) == len('css/app.css') + 17
+    built = (out / name).read_bytes()
+    assert b'a comment' not in built and len(built) < len(source.read_bytes())
+    assert gzip.decompress((out / (name + '.gz')).read_bytes()) == built
+    assert json.loads((out / 'manifest.json').read_text()) == manifest
+
+    # A changed source gets a new name; the old build stays for anyone still
+    # serving it until a pruning build
+    source.write_text('.card { padding: 0; }\n' * 50)
+    new_name = build_assets(str(static), str(out))['css/app.css']
+    assert new_name != name
+    assert (out / name).exists() and (out / new_name).exists()
+    build_assets(str(static), str(out), prune=True)
+    assert not (out / name).exists() and not (out / (name + '.gz')).exists()
+    assert (out / new_name).exists()
+
+
+def test_built_js_keeps_template_literals(tmp_path):
+    """Test template literals in the shipped JS survive the build byte for byte."""
+    manifest = build_assets(app_static, str(tmp_path))
+    with open(os.path.join(app_static, 'js', 'photo_manager.js'), encoding='utf-8') as f:
+        source = f.read()
+    built = (tmp_path / manifest['js/photo_manager.js']).read_text(encoding='utf-8')
+    literals = TEMPLATE_LITERAL.findall(source)
+    assert literals and TEMPLATE_LITERAL.findall(built) == literals
+    assert '`${d.url} ${d.width}w`' in built
+
+
+def test_assets_served_by_accept_encoding(tmp_path):
+    """Test templates link hashed assets served precompressed and immutable."""
+    client = make_app(tmp_path).test_client()
+    page = client.get('/').data.decode()
+    assert '<!--' not in page
+    url = page.split('href="/assets/css/', 1)[1].split('"', 1)[0]
+    url = '/assets/css/' + url
+
+    plain = client.get(url, headers={'Accept-Encoding': 'identity'})
+    assert plain.status_code == 200
+    assert plain.headers.get('Content-Encoding') is None
+    assert plain.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert 'Accept-Encoding' in plain.headers['Vary']
+
+    compressed = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.mimetype == 'text/css'
+    assert gzip.decompress(compressed.data) == plain.data
+    assert compressed.headers['ETag'] != plain.headers['ETag']
+
+    assert client.get('/assets/manifest.json').status_code == 404
+    assert client.get('/assets/../app.py').status_code == 404
+
+
+def test_build_command_prunes_only_when_asked(tmp_path):
+    """Test `flask assets build` adds to the folder and prunes with --prune."""
+    app = make_app(tmp_path, ASSETS_BUILD=False)
+    stale = tmp_path / 'dist' / 'css' / 'styles.0123456789abcdef.css'
+    stale.parent.mkdir(parents=True)
+    stale.write_text('old')
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['assets', 'build'])
+    assert result.exit_code == 0 and 'css/styles.css -> css/styles.' in result.output
+    assert stale.exists()
+    assert runner.invoke(args=['assets', 'build', '--prune']).exit_code == 0
+    assert not stale.exists()
+    assert (tmp_path / 'dist' / 'manifest.json').exists()
+
+
+def test_unbuilt_assets_fall_back_to_static(tmp_path):
+    """Test pages still link the plain static files when nothing was built."""
+    client = make_app(tmp_path, ASSETS_BUILD=False).test_client()
+    page = client.get('/').data.decode()
+    assert '/static/css/styles.css' in page
+    assert '/static/js/photo_manager.js' in page
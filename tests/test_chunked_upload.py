@@ -0,0 +1,63 @@
+import os
+from io import BytesIO
+import pytest
+from PIL import Image
+from app import app
+from modules.chunked_uploads import MIN_CHUNK_SIZE
+
+
+@pytest.fixture
+def client(client, monkeypatch):
+    monkeypatch.setitem(app.config, 'DERIVATIVE_WIDTHS', [])
+    return client
+
+
+def make_large_image():
+    # Noise does not compress, so this spans several chunks
+    buffer = BytesIO()
+    Image.effect_noise((1200, 1000), 64).convert('RGB').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def test_chunked_upload_resumes_and_completes(client, fake_imgbb, tmp_path):
+    """Test chunks can arrive out of order and be retried before completion."""
+    data = make_large_image()
+    rv = client.post('/api/upload/chunked', json={
+        'filename': 'big.png', 'size': len(data), 'chunk_size': MIN_CHUNK_SIZE
+    })
+    assert rv.status_code == 201
+    upload = rv.json
+    assert upload['total_chunks'] > 2
+    chunks = [data[i:i + MIN_CHUNK_SIZE] for i in range(0, len(data), MIN_CHUNK_SIZE)]
+
+    # Send everything but the first chunk, last one first
+    for index in reversed(range(1, len(chunks))):
+        assert client.put(f"{upload['upload_url']}/{index}", data=chunks[index]).status_code == 200
+    rv = client.post(upload['complete_url'])
+    assert rv.status_code == 409
+    assert rv.json['missing'] == [0]
+
+    # Resume: ask what is missing, then retry a chunk that already arrived
+    assert client.get(upload['upload_url']).json['missing'] == [0]
+    assert client.put(f"{upload['upload_url']}/0", data=chunks[0]).status_code == 200
+    assert client.put(f"{upload['upload_url']}/1", data=chunks[1]).status_code == 200
+
+    rv = client.post(upload['complete_url'])
+    assert rv.status_code == 200
+    assert rv.json['details']['original']['width'] == 1200
+    assert len(fake_imgbb.uploads) == 1
+    assert os.listdir(tmp_path / 'chunks') == []
+
+
+def test_chunked_upload_checks_size_up_front(client, monkeypatch):
+    monkeypatch.setitem(app.config, 'CHUNKED_MAX_FILE_SIZE', 1024 * 1024)
+    rv = client.post('/api/upload/chunked', json={'filename': 'big.jpg', 'size': 2 * 1024 * 1024})
+    assert rv.status_code == 413
+
+
+def test_chunked_upload_rejects_wrong_chunk_length(client):
+    rv = client.post('/api/upload/chunked', json={'filename': 'a.jpg', 'size': MIN_CHUNK_SIZE + 10})
+    upload = rv.json
+    assert client.put(f"{upload['upload_url']}/0", data=b'short').status_code == 400
+    assert client.put(f"{upload['upload_url']}/5", data=b'x').status_code == 400
+    assert client.get(upload['upload_url']).json['missing'] == [0]
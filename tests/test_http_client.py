@@ -0,0 +1,95 @@
+import time
+import pytest
+import requests
+from modules.http_client import CircuitBreaker, CircuitOpenError, ImageHostClient, combine_image_host_stats
+from modules.image_handler import MultipartBody
+
+
+def make_body():
+    return MultipartBody({'key': 'k'}, 'image', 'image', memoryview(b'not an image'))
+
+
+@pytest.fixture
+def client():
+    client = ImageHostClient(pool_size=2, read_timeout=0.5, retries=2, backoff=0.01,
+                             breaker=CircuitBreaker(failure_threshold=2, reset_timeout=0.2))
+    yield client
+    client.close()
+
+
+def test_keep_alive_reuses_connection(client, fake_imgbb):
+    """Test consecutive requests share one pooled connection."""
+    for _ in range(3):
+        client.post(fake_imgbb.url, make_body())
+    stats = client.stats()
+    assert stats['requests'] == 3
+    assert stats['pool']['connections_opened'] == 1
+
+
+def test_retries_transient_errors(client, fake_imgbb):
+    """Test 5xx responses are retried until the host recovers."""
+    fake_imgbb.failures = [503, 502]
+    response = client.post(fake_imgbb.url, make_body())
+    assert response.status_code == 400  # the fake rejects the non-image payload
+    assert client.stats()['retries'] == 2
+    assert fake_imgbb.requests == 3
+
+
+def test_read_timeout(client, fake_imgbb):
+    """Test a hung host is cut off by the read timeout and the upload is not sent again."""
+    fake_imgbb.delay = 1
+    start = time.monotonic()
+    with pytest.raises(requests.ReadTimeout):
+        client.post(fake_imgbb.url, make_body())
+    assert time.monotonic() - start < 1
+    stats = client.stats()
+    assert stats['retries'] == 0 and stats['failures'] == 1
+    assert stats['breaker']['consecutive_failures'] == 1
+
+
+def test_circuit_breaker_opens_and_recovers(client, fake_imgbb):
+    """Test the breaker fails fast when open and closes after a good probe."""
+    fake_imgbb.failures = [500] * 6
+    client.post(fake_imgbb.url, make_body())
+    client.post(fake_imgbb.url, make_body())
+    assert client.breaker.state == 'open'
+
+    requests_before = fake_imgbb.requests
+    with pytest.raises(CircuitOpenError):
+        client.post(fake_imgbb.url, make_body())
+    assert fake_imgbb.requests == requests_before
+
+    time.sleep(0.25)
+    client.post(fake_imgbb.url, make_body())
+    assert client.breaker.state == 'closed'
+
+
+def test_breaker_probe_records_unexpected_errors(client, fake_imgbb):
+    """Test a half-open probe that fails oddly still re-opens, then recovers."""
+    class BrokenBody:
+        def rewind(self):
+            raise OSError('spool file went away')
+
+    fake_imgbb.failures = [500] * 6
+    client.post(fake_imgbb.url, make_body())
+    client.post(fake_imgbb.url, make_body())
+    time.sleep(0.25)
+    with pytest.raises(OSError):
+        client.post(fake_imgbb.url, BrokenBody())
+    assert client.breaker.state == 'open'
+
+    time.sleep(0.25)
+    client.post(fake_imgbb.url, make_body())
+    assert client.breaker.state == 'closed'
+
+
+def test_combine_stats_across_workers(client, fake_imgbb):
+    """Test worker stats add up and the worst breaker state wins."""
+    client.post(fake_imgbb.url, make_body())
+    stats = client.stats()
+    tripped = {**stats, 'breaker': {**stats['breaker'], 'state': 'open', 'times_opened': 1}}
+    combined = combine_image_host_stats([stats, tripped, None])
+    assert combined['workers'] == 2
+    assert combined['requests'] == 2 * stats['requests']
+    assert combined['breaker']['state'] == 'open' and combined['breaker']['open_workers'] == 1
+    assert combine_image_host_stats([None]) is None
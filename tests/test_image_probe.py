@@ -0,0 +1,115 @@
+import struct
+import time
+import zlib
+from io import BytesIO
+
+import pytest
+from PIL import Image, ImageFile
+
+from modules.image_probe import ImageRejected, probe_image
+
+
+def encode(img, fmt, **options):
+    buffer = BytesIO()
+    img.save(buffer, fmt, **options)
+    buffer.seek(0)
+    return buffer
+
+
+def png_header_only(width, height):
+    """A PNG that declares ``width`` x ``height`` but carries almost no data."""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    ihdr = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return BytesIO(b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', ihdr) + chunk(b'IDAT', zlib.compress(b'\0' * 64))
+                   + chunk(b'IEND', b''))
+
+
+def test_probe_reads_header_details():
+    """Test format, size, mode and frame count come from the header."""
+    info = probe_image(encode(Image.new('RGB', (320, 200)), 'JPEG'), 'photo.jpeg')
+    assert (info.format, info.width, info.height, info.mode, info.frames) == ('JPEG', 320, 200, 'RGB', 1)
+
+    frames = [Image.new('RGB', (16, 16), (color * 40, 0, 0)) for color in range(5)]
+    gif = encode(frames[0], 'GIF', save_all=True, append_images=frames[1:])
+    assert probe_image(gif, 'a.gif').frames == 5
+    assert gif.tell() == 0
+
+
+@pytest.mark.parametrize('data, filename, message', [
+    (b'just some text, not an image', 'a.jpg', 'not a supported image'),
+    (None, 'a.jpg', 'does not match .jpg'),
+    (b'\x89PNG\r\n\x1a\n' + b'\0' * 40, 'a.png', 'corrupt'),
+])
+def test_probe_rejects_bad_files(data, filename, message):
+    """Test non-images, mislabelled files and broken headers are refused."""
+    image_file = BytesIO(data) if data else encode(Image.new('RGB', (8, 8)), 'PNG')
+    with pytest.raises(ImageRejected, match=message):
+        probe_image(image_file, filename)
+
+
+def test_probe_rejects_bombs_without_decoding():
+    """Test a tiny file declaring a huge canvas is refused from its header alone."""
+    bomb = png_header_only(40000, 40000)
+    start = time.perf_counter()
+    with pytest.raises(ImageRejected, match='megapixel'):
+        probe_image(bomb, 'bomb.png')
+    assert time.perf_counter() - start < 0.05
+
+
+def test_probe_counts_gif_frames_without_decoding(monkeypatch):
+    """Test a small GIF with a huge canvas and many frames is counted from headers."""
+    frames = []
+    for i in range(12):
+        frame = Image.new('P', (3000, 3000), 0)
+        frame.paste(i + 1, (i * 10, 0, i * 10 + 10, 10))
+        frames.append(frame)
+    gif = encode(frames[0], 'GIF', save_all=True, append_images=frames[1:])
+    assert len(gif.getvalue()) < 20000
+
+    def no_decode(self):
+        raise AssertionError('probe decoded the image')
+
+    monkeypatch.setattr(ImageFile.ImageFile, 'load', no_decode)
+    start = time.perf_counter()
+    info = probe_image(gif, 'wide.gif')
+    assert time.perf_counter() - start < 0.05
+    assert (info.mode, info.frames) == ('P', 12)
+
+
+def test_pillow_counts_gif_frames_from_headers(monkeypatch):
+    """Test Pillow's public n_frames still counts GIF frames without decoding them.
+
+    The probe relies on this; if a Pillow upgrade starts decoding, or drops
+    the header walk n_frames is built on, this fails first.
+    """
+    frames = [Image.new('RGB', (16, 16), (color * 40, 0, 0)) for color in range(5)]
+    gif = encode(frames[0], 'GIF', save_all=True, append_images=frames[1:])
+
+    def no_decode(self):
+        raise AssertionError('n_frames decoded the image')
+
+    monkeypatch.setattr(ImageFile.ImageFile, 'load', no_decode)
+    with Image.open(gif) as img:
+        assert img.n_frames == 5
+        assert (img.tell(), img.mode) == (0, 'P')
+
+
+def test_probe_limits_frames_and_modes():
+    """Test frame and mode limits."""
+    frames = [Image.new('RGB', (16, 16), (color * 40, 0, 0)) for color in range(5)]
+    gif = encode(frames[0], 'GIF', save_all=True, append_images=frames[1:])
+    with pytest.raises(ImageRejected, match='frames'):
+        probe_image(gif, 'a.gif', max_frames=3)
+    with pytest.raises(ImageRejected, match='mode'):
+        probe_image(encode(Image.new('I;16', (8, 8)), 'PNG'), 'deep.png')
+
+
+def test_upload_rejects_bomb_before_processing(client, fake_imgbb):
+    """Test the upload API answers 400 for a bomb and never reaches the host."""
+    rv = client.post('/api/upload', data={'file': (png_header_only(40000, 40000), 'bomb.png')})
+    assert rv.status_code == 400
+    assert 'megapixel' in rv.json['error']
+    rv = client.post('/api/upload?async=1', data={'file': (encode(Image.new('RGB', (8, 8)), 'PNG'), 'a.gif')})
+    assert rv.status_code == 400
+    assert fake_imgbb.uploads == []
@@ -0,0 +1,57 @@
+from io import BytesIO
+from PIL import Image, ImageDraw
+from modules.image_handler import process_image
+from measurements import SSIM_TOLERANCE, full_decode, ssim
+
+
+def make_photo(size, fmt='JPEG'):
+    """A synthetic photo with gradients and edges so resampling shows."""
+    img = Image.linear_gradient('L').resize(size).convert('RGB')
+    draw = ImageDraw.Draw(img)
+    for x in range(0, size[0], 97):
+        draw.line([(x, 0), (size[0] - x, size[1])], fill=(200, 40, 90), width=5)
+    buffer = BytesIO()
+    img.save(buffer, fmt, quality=92)
+    return buffer.getvalue()
+
+
+def test_oversized_jpeg_uses_draft_and_keeps_size():
+    """Test the draft fast path still produces the exact target size."""
+    output, original, processed = process_image(BytesIO(make_photo((4000, 3000))))
+    assert original['width'] == 4000
+    assert processed['resized'] is True
+    assert Image.open(output).size == (1440, 1080)
+
+
+def test_draft_path_within_ssim_tolerance():
+    """Test draft-mode output stays close to a full decode + LANCZOS."""
+    data = make_photo((4000, 3000))
+    output, _, _ = process_image(BytesIO(data))
+    assert ssim(full_decode(data), Image.open(output)) >= SSIM_TOLERANCE
+
+
+def test_small_png_not_resized():
+    """Test images within the limits skip resizing."""
+    output, _, processed = process_image(BytesIO(make_photo((640, 480), 'PNG')))
+    assert processed['resized'] is False
+    assert Image.open(output).size == (640, 480)
+
+
+def test_rgba_flattened_onto_white():
+    """Test transparent pixels become white when flattening RGBA."""
+    buffer = BytesIO()
+    Image.new('RGBA', (50, 50), (255, 0, 0, 0)).save(buffer, 'PNG')
+    buffer.seek(0)
+    output, _, _ = process_image(buffer)
+    assert Image.open(output).convert('RGB').getpixel((10, 10)) == (255, 255, 255)
+
+
+def test_derivatives_from_one_decode():
+    """Test every requested width is rendered, largest first, without upscaling."""
+    output, _, processed = process_image(BytesIO(make_photo((4000, 3000))), [320, 640, 1280, 1920])
+    derivatives = processed['derivatives']
+    widths = [d['width'] for d in derivatives if d['format'] == 'webp']
+    assert widths == [1440, 1280, 640, 320]
+    smallest = Image.open(BytesIO(derivatives[-1]['data']))
+    assert smallest.format in ('WEBP', 'AVIF')
+    assert smallest.size == (320, 240)
@@ -0,0 +1,110 @@
+import json
+import logging
+import time
+from io import BytesIO
+
+from PIL import Image
+
+from modules.log_config import ErrorSampler, JSONFormatter, QueueingHandler, file_handler
+
+
+class ListHandler(logging.Handler):
+    def __init__(self, delay=0.0):
+        super().__init__()
+        self.delay = delay
+        self.records = []
+
+    def emit(self, record):
+        time.sleep(self.delay)
+        self.records.append(self.format(record))
+
+
+def make_logger(name, *handlers):
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.handlers[:] = handlers
+    return logger
+
+
+def test_queued_logging_does_not_block_on_slow_writes():
+    """Test records are handed off at once and all written by stop()."""
+    target = ListHandler(delay=0.01)
+    target.setFormatter(JSONFormatter())
+    handler = QueueingHandler([target])
+    logger = make_logger('test.queued', handler)
+
+    start = time.perf_counter()
+    for i in range(50):
+        logger.error('upload %d failed', i)
+    assert time.perf_counter() - start < 0.25  # 50 direct writes would take 0.5s
+    handler.stop()
+    assert [json.loads(line)['message'] for line in target.records] == [f'upload {i} failed' for i in range(50)]
+
+
+def test_queued_logging_keeps_tracebacks():
+    """Test exception details survive the trip through the queue."""
+    target = ListHandler()
+    target.setFormatter(JSONFormatter())
+    handler = QueueingHandler([target])
+    logger = make_logger('test.traceback', handler)
+    try:
+        raise ValueError('bad image')
+    except ValueError:
+        logger.exception('processing failed')
+    handler.stop()
+    record = json.loads(target.records[0])
+    assert record['level'] == 'ERROR'
+    assert 'ValueError: bad image' in record['exception']
+
+
+def test_error_sampler_limits_each_call_site():
+    """Test repeated errors are cut to a burst and the next one reports the rest."""
+    target = ListHandler()
+    target.setFormatter(JSONFormatter())
+    target.addFilter(ErrorSampler(burst=3, interval=0.2))
+    logger = make_logger('test.sampled', target)
+
+    def fail():
+        logger.error('image host unreachable')
+
+    for _ in range(20):
+        fail()
+    logger.info('still logged')
+    assert len(target.records) == 4
+
+    time.sleep(0.25)
+    fail()
+    assert json.loads(target.records[-1])['suppressed'] == 17
+
+
+def test_file_handler_leaves_rotation_to_logrotate(tmp_path):
+    """Test max_bytes=0 keeps writing after the file is moved away instead of rotating it."""
+    path = tmp_path / 'app.log'
+    handler = file_handler(str(path), max_bytes=0)
+    logger = make_logger('test.watched', handler)
+    try:
+        logger.error('before rotation')
+        path.rename(tmp_path / 'app.log.1')
+        logger.error('after rotation')
+    finally:
+        handler.close()
+    assert (tmp_path / 'app.log.1').read_text() == 'before rotation\n'
+    assert path.read_text() == 'after rotation\n'
+
+
+def test_request_record_has_id_and_stages(client, fake_imgbb, caplog):
+    """Test each request gets an ID, echoed back and logged with its stage timings."""
+    image = BytesIO()
+    Image.new('RGB', (64, 48), color='red').save(image, 'JPEG')
+    image.seek(0)
+    with caplog.at_level(logging.INFO, logger='swapsnap.requests'):
+        rv = client.post('/api/upload', data={'file': (image, 'a.jpg')}, headers={'X-Request-ID': 'req-42'})
+        other = client.get('/health', headers={'X-Request-ID': 'not valid!'})
+    assert rv.headers['X-Request-ID'] == 'req-42'
+    assert other.headers['X-Request-ID'] != 'not valid!'
+
+    records = [r for r in caplog.records if r.name == 'swapsnap.requests']
+    upload = next(r for r in records if r.request_id == 'req-42')
+    assert upload.status == 200 and upload.path == '/api/upload'
+    assert {'hash', 'transcode', 'store', 'save_metadata'} <= set(upload.stages)
+    assert not hasattr(next(r for r in records if r.path == '/health'), 'stages')
@@ -0,0 +1,101 @@
+import json
+import os
+import threading
+import pytest
+from modules.metadata_store import (
+    LogMetadataStore, SQLiteMetadataStore, migrate_json_metadata, open_store
+)
+
+
+def make_photo(index):
+    return {
+        'success': True,
+        'filename': f'photo_{index:05d}.jpg',
+        'timestamp': f'2024-12-21T14:{index // 60 % 60:02d}:{index % 60:02d}',
+        'url': f'https://i.ibb.co/{index}.jpg',
+    }
+
+
+@pytest.fixture(params=['sqlite', 'log'])
+def store(request, tmp_path):
+    if request.param == 'sqlite':
+        return SQLiteMetadataStore(str(tmp_path / 'metadata.db'))
+    return LogMetadataStore(str(tmp_path / 'metadata.log'))
+
+
+def test_put_and_get(store):
+    """Test records round-trip and overwrite by filename."""
+    store.put(make_photo(1))
+    assert store.get('photo_00001.jpg')['url'] == 'https://i.ibb.co/1.jpg'
+    store.put({**make_photo(1), 'url': 'https://i.ibb.co/new.jpg'})
+    assert store.get('photo_00001.jpg')['url'] == 'https://i.ibb.co/new.jpg'
+    assert store.count() == 1
+    assert store.get('missing.jpg') is None
+
+
+def test_recent_is_newest_first(store):
+    """Test records come back ordered by timestamp, newest first."""
+    store.put_many([make_photo(i) for i in (3, 1, 2)])
+    assert [p['filename'] for p in store.recent()] == [
+        'photo_00003.jpg', 'photo_00002.jpg', 'photo_00001.jpg'
+    ]
+
+
+def test_concurrent_writes_are_not_lost(store):
+    """Test parallel writers never drop each other's records."""
+    def writer(offset):
+        for i in range(25):
+            store.put(make_photo(offset + i))
+
+    threads = [threading.Thread(target=writer, args=(n * 100,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.count() == 100
+
+
+def test_log_store_sees_other_writers(tmp_path):
+    """Test a log store picks up lines appended by another process."""
+    path = str(tmp_path / 'metadata.log')
+    reader = LogMetadataStore(path)
+    LogMetadataStore(path).put(make_photo(7))
+    assert reader.get('photo_00007.jpg') is not None
+
+
+def test_log_store_ignores_torn_line(tmp_path):
+    """Test a partially written trailing line is skipped."""
+    path = str(tmp_path / 'metadata.log')
+    LogMetadataStore(path).put(make_photo(1))
+    with open(path, 'a') as f:
+        f.write('{"filename": "photo_000')
+    assert LogMetadataStore(path).count() == 1
+
+
+def test_migrate_json_metadata(tmp_path):
+    """Test the legacy metadata.json is imported exactly once."""
+    legacy = {p['filename']: p for p in (make_photo(1), make_photo(2))}
+    (tmp_path / 'metadata.json').write_text(json.dumps(legacy))
+
+    store = open_store('sqlite', str(tmp_path))
+    assert store.count() == 2
+    assert not os.path.exists(tmp_path / 'metadata.json')
+    assert migrate_json_metadata(store, str(tmp_path / 'metadata.json')) == 0
+
+
+def test_unknown_backend(tmp_path):
+    """Test an unknown backend name is rejected."""
+    with pytest.raises(ValueError):
+        open_store('mongo', str(tmp_path))
+
+
+def test_page_keyset_cursor(store):
+    """Test keyset pages walk the catalog without gaps or repeats."""
+    store.put_many([make_photo(i) for i in range(10)])
+    first = store.page(4)
+    assert [p['filename'] for p in first] == [f'photo_{i:05d}.jpg' for i in (9, 8, 7, 6)]
+    cursor = (first[-1]['timestamp'], first[-1]['filename'])
+    second = store.page(4, cursor)
+    assert [p['filename'] for p in second] == [f'photo_{i:05d}.jpg' for i in (5, 4, 3, 2)]
+    last = store.page(4, (second[-1]['timestamp'], second[-1]['filename']))
+    assert len(last) == 2
@@ -0,0 +1,84 @@
+import json
+import os
+from io import BytesIO
+import pytest
+from PIL import Image
+from app import app
+from modules import metrics
+
+
+@pytest.fixture
+def client(client, monkeypatch):
+    monkeypatch.setitem(app.config, 'DERIVATIVE_WIDTHS', [])
+    return client
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram('test_latency_seconds', 'Test latency.', ['op'], buckets=(0.1, 1))
+    try:
+        histogram.observe(0.05, op='read')
+        histogram.observe(0.5, op='read')
+        histogram.observe(5, op='read')
+        text = histogram.render()
+    finally:
+        metrics._registry.remove(histogram)
+    assert '# TYPE test_latency_seconds histogram' in text
+    assert 'test_latency_seconds_bucket{op="read",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{op="read",le="1"} 2' in text
+    assert 'test_latency_seconds_bucket{op="read",le="+Inf"} 3' in text
+    assert 'test_latency_seconds_count{op="read"} 3' in text
+
+
+def test_metric_rejects_unknown_labels():
+    counter = metrics.Counter('test_events_total', 'Test events.', ['kind'])
+    metrics._registry.remove(counter)
+    with pytest.raises(ValueError):
+        counter.inc(other='x')
+
+
+def test_metrics_endpoint_reports_requests_and_upload_stages(client, fake_imgbb):
+    """Test endpoint latency, upload stages and store gauges are scraped."""
+    before = metrics.HTTP_REQUEST_SECONDS.count(endpoint='photo.get_photos', method='GET', status=404)
+    client.get('/api/photos')
+    buffer = BytesIO()
+    Image.new('RGBA', (2400, 1200), color=(0, 0, 255, 128)).save(buffer, 'PNG')
+    buffer.seek(0)
+    assert client.post('/api/upload', data={'file': (buffer, 'big.png')}).status_code == 200
+
+    rv = client.get('/metrics')
+    assert rv.status_code == 200
+    assert rv.mimetype == 'text/plain'
+    text = rv.data.decode()
+    assert metrics.HTTP_REQUEST_SECONDS.count(endpoint='photo.get_photos', method='GET', status=404) == before + 1
+    for stage in ('hash', 'decode', 'flatten', 'resize', 'encode', 'store', 'save_metadata'):
+        assert f'swapsnap_upload_stage_seconds_count{{stage="{stage}"}}' in text
+    assert 'swapsnap_storage_bytes{store="metadata_sqlite"}' in text
+    assert 'swapsnap_queue_depth{queue="upload_jobs"} 0' in text
+    assert 'swapsnap_upload_cache_hit_ratio' in text
+
+
+def test_multiprocess_metrics_add_up_workers(tmp_path, monkeypatch):
+    """Test a scrape adds up live workers and keeps the counters of exited ones."""
+    monkeypatch.setitem(metrics._multiprocess, 'directory', str(tmp_path))
+    monkeypatch.setitem(metrics._multiprocess, 'filename', None)
+    counter = metrics.Counter('test_jobs_total', 'Test jobs.', ['kind'])
+    gauge = metrics.Gauge('test_depth', 'Test depth.')
+    try:
+        counter.inc(2, kind='a')
+        gauge.set(3)
+        for pid, filename in ((os.getppid(), 'live.json'), (2 ** 22 + 1, 'dead.json')):
+            (tmp_path / filename).write_text(json.dumps({
+                'pid': pid,
+                'metrics': {'test_jobs_total': [[['a'], 5]], 'test_depth': [[[], 4]]},
+                'sections': {},
+            }))
+        with app.app_context():
+            text = metrics.render()
+            assert 'test_jobs_total{kind="a"} 12' in text
+            assert 'test_depth 7' in text
+            assert not (tmp_path / 'dead.json').exists() and (tmp_path / metrics.ARCHIVE).exists()
+            # The archived counts are not added twice
+            assert 'test_jobs_total{kind="a"} 12' in metrics.render()
+    finally:
+        metrics._registry.remove(counter)
+        metrics._registry.remove(gauge)
@@ -0,0 +1,79 @@
+from modules.metadata_store import SQLiteMetadataStore
+from modules.photo_sampler import PhotoSampler, pack_history, photo_key, unpack_history
+
+
+def make_store(tmp_path, count):
+    store = SQLiteMetadataStore(str(tmp_path / 'metadata.db'))
+    store.put_many([
+        {'filename': f'photo_{i}.jpg', 'timestamp': f'2024-12-21T14:00:{i:02d}'}
+        for i in range(count)
+    ])
+    return store
+
+
+def test_sync_is_incremental(tmp_path):
+    """Test the sampler only pulls photos added since its last sync."""
+    store = make_store(tmp_path, 3)
+    sampler = PhotoSampler(store)
+    sampler.sync()
+    assert len(sampler) == 3
+    store.put({'filename': 'photo_new.jpg', 'timestamp': '2024-12-22T00:00:00'})
+    store.put({'filename': 'photo_0.jpg', 'timestamp': '2024-12-22T00:00:01'})
+    sampler.sync()
+    assert len(sampler) == 4
+
+
+def test_remove_keeps_positions_consistent(tmp_path):
+    """Test swap-removal leaves every remaining photo reachable."""
+    sampler = PhotoSampler(make_store(tmp_path, 5))
+    sampler.sync()
+    sampler.remove('photo_1.jpg')
+    sampler.remove('photo_4.jpg')
+    assert sorted(sampler._ids) == ['photo_0.jpg', 'photo_2.jpg', 'photo_3.jpg']
+    assert all(sampler._ids[pos] == name for name, pos in sampler._positions.items())
+
+
+def test_sample_respects_history(tmp_path):
+    """Test photos in the no-repeat window are never drawn."""
+    sampler = PhotoSampler(make_store(tmp_path, 4))
+    sampler.sync()
+    history = [photo_key(f'photo_{i}.jpg') for i in range(3)]
+    for _ in range(50):
+        assert sampler.sample_many(history, 1) == ['photo_3.jpg']
+
+
+def test_sample_window_covers_catalog(tmp_path):
+    """Test the least recently shown photo is drawn when the window covers everything."""
+    sampler = PhotoSampler(make_store(tmp_path, 2))
+    sampler.sync()
+    history = [photo_key('photo_0.jpg'), photo_key('photo_1.jpg')]
+    assert sampler.sample_many(history, 1) == ['photo_0.jpg']
+
+
+def test_sample_many_is_distinct_and_avoids_history(tmp_path):
+    """Test a batch never repeats a photo and skips the window when it can."""
+    sampler = PhotoSampler(make_store(tmp_path, 6))
+    sampler.sync()
+    history = [photo_key(f'photo_{i}.jpg') for i in range(3)]
+    for _ in range(20):
+        batch = sampler.sample_many(history, 3)
+        assert sorted(batch) == ['photo_3.jpg', 'photo_4.jpg', 'photo_5.jpg']
+
+
+def test_sample_many_fills_with_least_recent(tmp_path):
+    """Test a batch larger than the unseen photos reuses the oldest shown ones."""
+    sampler = PhotoSampler(make_store(tmp_path, 4))
+    sampler.sync()
+    history = [photo_key(f'photo_{i}.jpg') for i in (2, 0, 1)]
+    batch = sampler.sample_many(history, 10)
+    assert batch == ['photo_3.jpg', 'photo_2.jpg', 'photo_0.jpg', 'photo_1.jpg']
+
+
+def test_history_packing_roundtrip():
+    """Test the session history survives packing and tolerates garbage."""
+    keys = [photo_key(f'photo_{i}.jpg') for i in range(10)]
+    packed = pack_history(keys)
+    assert len(packed) <= 56
+    assert unpack_history(packed) == keys
+    assert unpack_history('not base64!') == []
+    assert unpack_history(None) == []
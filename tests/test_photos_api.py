@@ -0,0 +1,77 @@
+from app import app
+from modules.photo_manager import get_store
+
+
+def add_photos(count):
+    with app.app_context():
+        get_store().put_many([
+            {
+                'success': True,
+                'filename': f'photo_{i:03d}.jpg',
+                'timestamp': f'2024-12-21T14:00:{i:02d}',
+                'url': f'https://i.ibb.co/{i}.jpg',
+                'thumbnail': f'https://i.ibb.co/{i}_t.jpg',
+            }
+            for i in range(count)
+        ])
+
+
+def test_photos_empty(client):
+    """Test the photo list is 404 with an empty catalog."""
+    rv = client.get('/api/photos')
+    assert rv.status_code == 404
+
+
+def test_photos_pagination(client):
+    """Test cursor pagination walks every photo exactly once."""
+    add_photos(25)
+    seen = []
+    cursor = None
+    while True:
+        rv = client.get('/api/photos', query_string={'limit': 10, **({'after': cursor} if cursor else {})})
+        assert rv.status_code == 200
+        seen.extend(p['filename'] for p in rv.json['photos'])
+        cursor = rv.json['next_cursor']
+        if cursor is None:
+            break
+    assert seen == [f'photo_{i:03d}.jpg' for i in reversed(range(25))]
+
+
+def test_photos_fields_projection(client):
+    """Test the fields parameter trims each photo."""
+    add_photos(2)
+    rv = client.get('/api/photos?fields=thumbnail')
+    assert rv.json['photos'][0] == {'filename': 'photo_001.jpg', 'thumbnail': 'https://i.ibb.co/1_t.jpg'}
+
+
+def test_photos_invalid_cursor(client):
+    """Test a malformed cursor is rejected."""
+    add_photos(1)
+    rv = client.get('/api/photos?after=!!!')
+    assert rv.status_code == 400
+
+
+def test_random_photo_empty(client):
+    """Test the random photo endpoint is 404 with an empty catalog."""
+    rv = client.get('/api/photos/random')
+    assert rv.status_code == 404
+
+
+def test_random_photo_no_repeat_window(client, monkeypatch):
+    """Test consecutive random photos never repeat within the window."""
+    monkeypatch.setitem(app.config, 'RANDOM_HISTORY_SIZE', 3)
+    add_photos(4)
+    shown = [client.get('/api/photos/random').json['photo']['filename'] for _ in range(12)]
+    for i in range(3, len(shown)):
+        assert shown[i] not in shown[i - 3:i]
+
+
+def test_random_photo_batch(client, monkeypatch):
+    """Test count=N returns distinct photos and feeds the no-repeat window."""
+    monkeypatch.setitem(app.config, 'RANDOM_HISTORY_SIZE', 3)
+    add_photos(5)
+    first = [photo['filename'] for photo in client.get('/api/photos/random?count=3').json['photos']]
+    assert len(set(first)) == 3
+    second = [photo['filename'] for photo in client.get('/api/photos/random?count=2').json['photos']]
+    assert not set(second) & set(first)
+    assert len(client.get('/api/photos/random?count=50').json['photos']) == 5
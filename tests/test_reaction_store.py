@@ -0,0 +1,89 @@
+import json
+import threading
+import pytest
+from modules.reaction_store import CoalescingReactionStore, ReactionStore, open_reaction_store
+
+
+@pytest.fixture(params=['direct', 'coalescing'])
+def store(request, tmp_path):
+    if request.param == 'direct':
+        store = ReactionStore(str(tmp_path / 'reactions.db'))
+    else:
+        store = CoalescingReactionStore(str(tmp_path / 'reactions.db'), flush_interval=60)
+    yield store
+    store.flush()
+
+
+def test_react_moves_user_between_counters(store):
+    """Test changing a reaction moves one count from the old emoji to the new."""
+    store.react('a.jpg', 'u1', '👍')
+    store.react('a.jpg', 'u2', '👍')
+    assert store.react('a.jpg', 'u1', '❤️') == {'👍': 1, '❤️': 1}
+    assert store.react('a.jpg', 'u1', '❤️') == {'👍': 1, '❤️': 1}
+    assert store.user_reaction('a.jpg', 'u1') == '❤️'
+    store.flush()
+    assert store.counts('a.jpg') == {'👍': 1, '❤️': 1}
+
+
+def test_concurrent_reactions_are_not_lost(store):
+    """Test parallel reactions from many users all count."""
+    def react(offset):
+        for i in range(20):
+            store.react('a.jpg', f'user{offset + i}', '🔥')
+
+    threads = [threading.Thread(target=react, args=(n * 100,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    store.flush()
+    assert store.counts('a.jpg') == {'🔥': 80}
+
+
+def test_coalescing_batches_writes(tmp_path):
+    """Test buffered reactions reach the database only on flush."""
+    store = CoalescingReactionStore(str(tmp_path / 'reactions.db'), flush_interval=60)
+    store.react('a.jpg', 'u1', '👍')
+    assert ReactionStore(store.path).counts('a.jpg') == {}
+    store.flush()
+    assert ReactionStore(store.path).counts('a.jpg') == {'👍': 1}
+
+
+def test_migrate_legacy_reactions(tmp_path):
+    """Test the old reactions.json layout is imported once."""
+    legacy = tmp_path / 'reactions.json'
+    legacy.write_text(json.dumps({
+        'a.jpg': {'reactions': {'u1': '👍', 'u2': '👍', 'u3': '😂'}, '👍': 2, '😂': 1},
+    }))
+    store = open_reaction_store(str(tmp_path / 'reactions.db'), legacy_file=str(legacy))
+    assert store.counts('a.jpg') == {'👍': 2, '😂': 1}
+    assert store.user_reaction('a.jpg', 'u3') == '😂'
+    assert not legacy.exists()
+
+
+def test_migrated_reactions_are_not_trending(tmp_path):
+    """Test imported reactions count towards totals but not the hour and day windows."""
+    from modules.trending import ReactionRanking
+
+    legacy = tmp_path / 'reactions.json'
+    legacy.write_text(json.dumps({'a.jpg': {'reactions': {'u1': '👍', 'u2': '👍'}, '👍': 2}}))
+    store = open_reaction_store(str(tmp_path / 'reactions.db'), legacy_file=str(legacy))
+    store.react('b.jpg', 'u1', '👍')
+    ranking = ReactionRanking(store)
+    ranking.sync()
+    assert ranking.top('all') == [('a.jpg', 2), ('b.jpg', 1)]
+    assert [photo for photo, _ in ranking.top('hour')] == ['b.jpg']
+    assert [photo for photo, _ in ranking.top('day')] == ['b.jpg']
+
+
+def test_summary_cache_sees_other_writers(tmp_path):
+    """Test writes through another store instance evict only changed photos."""
+    from modules.reaction_store import ReactionSummaryCache
+
+    store = ReactionStore(str(tmp_path / 'reactions.db'))
+    cache = ReactionSummaryCache(store)
+    assert cache.get_many(['a.jpg', 'b.jpg']) == {'a.jpg': {}, 'b.jpg': {}}
+
+    ReactionStore(store.path).react('a.jpg', 'u1', '👍')
+    assert cache.get_many(['a.jpg', 'b.jpg']) == {'a.jpg': {'👍': 1}, 'b.jpg': {}}
+    assert cache.stats()['hits'] == 1
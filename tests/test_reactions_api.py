@@ -0,0 +1,90 @@
+import pytest
+from app import app
+
+
+@pytest.fixture
+def client(client, monkeypatch):
+    monkeypatch.setitem(app.config, 'WTF_CSRF_ENABLED', False)
+    return client
+
+
+def login(client, username='tester'):
+    client.post('/login', data={'username': username, 'password': 'password123'})
+
+
+def test_reaction_requires_login(client):
+    """Test anonymous reactions are refused."""
+    rv = client.post('/api/reaction', json={'photo': 'a.jpg', 'reaction': '👍'})
+    assert rv.status_code == 401
+
+
+def test_reaction_missing_fields(client):
+    """Test a reaction without a photo is a 400."""
+    login(client)
+    rv = client.post('/api/reaction', json={'reaction': '👍'})
+    assert rv.status_code == 400
+
+
+def test_add_and_change_reaction(client):
+    """Test reacting twice replaces the user's previous reaction."""
+    login(client)
+    rv = client.post('/api/reaction', json={'photo': 'a.jpg', 'reaction': '👍'})
+    assert rv.json['reactions'] == {'👍': 1}
+    rv = client.post('/api/reaction', json={'filename': 'a.jpg', 'reaction': '😂'})
+    assert rv.json['reactions'] == {'😂': 1}
+    assert rv.json['user_reaction'] == '😂'
+
+
+def test_batch_reactions(client):
+    """Test one request returns counts for several photos."""
+    login(client)
+    client.post('/api/reaction', json={'photo': 'a.jpg', 'reaction': '👍'})
+    client.post('/api/reaction', json={'photo': 'b.jpg', 'reaction': '❤️'})
+    rv = client.get('/api/reactions?photos=a.jpg,b.jpg,c.jpg')
+    assert rv.status_code == 200
+    assert rv.json['reactions'] == {'a.jpg': {'👍': 1}, 'b.jpg': {'❤️': 1}, 'c.jpg': {}}
+
+
+def test_batch_reactions_etag(client):
+    """Test unchanged summaries answer 304 and changes refresh the ETag."""
+    login(client)
+    client.post('/api/reaction', json={'photo': 'a.jpg', 'reaction': '👍'})
+    first = client.get('/api/reactions?photos=a.jpg')
+    etag = first.headers['ETag']
+    assert client.get('/api/reactions?photos=a.jpg', headers={'If-None-Match': etag}).status_code == 304
+
+    client.post('/api/reaction', json={'photo': 'a.jpg', 'reaction': '😂'})
+    changed = client.get('/api/reactions?photos=a.jpg', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.json['reactions'] == {'a.jpg': {'😂': 1}}
+
+
+def test_single_photo_reactions(client):
+    """Test the per-photo read route."""
+    rv = client.get('/api/reaction/a.jpg')
+    assert rv.json == {'success': True, 'reactions': {}}
+
+
+def test_batch_reactions_requires_photos(client):
+    """Test an empty photo list is rejected."""
+    assert client.get('/api/reactions').status_code == 400
+
+
+def test_top_photos(client):
+    """Test the leaderboard ranks photos by reactions, per emoji and window."""
+    for user, photo, reaction in [('alice', 'a.jpg', '👍'), ('bobby', 'a.jpg', '👍'), ('carol', 'b.jpg', '❤️')]:
+        login(client, user)
+        client.post('/api/reaction', json={'photo': photo, 'reaction': reaction})
+
+    rv = client.get('/api/photos/top')
+    assert rv.status_code == 200
+    assert [(p['filename'], p['score']) for p in rv.json['photos']] == [('a.jpg', 2), ('b.jpg', 1)]
+
+    # New reactions reach an existing ranking right away
+    login(client, 'dave')
+    client.post('/api/reaction', json={'photo': 'b.jpg', 'reaction': '❤️'})
+    rv = client.get('/api/photos/top?emoji=❤️&window=day&limit=1')
+    assert [p['filename'] for p in rv.json['photos']] == ['b.jpg']
+    assert rv.json['photos'][0]['score'] == 2.0
+
+    assert client.get('/api/photos/top?window=year').status_code == 400
@@ -0,0 +1,70 @@
+import threading
+import time
+import pytest
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+from app import app
+from modules.photo_manager import get_store
+from modules.state import SQLiteLimitStorage
+
+
+@pytest.fixture
+def client(client, monkeypatch):
+    monkeypatch.setitem(app.config, 'STATE_BACKEND', 'sqlite')
+    return client
+
+
+def test_sqlite_limits_are_shared_between_storages(tmp_path):
+    """Test two workers opening the same file enforce one shared limit."""
+    uri = f'sqlite://{tmp_path}/state.db'
+    first, second = storage_from_string(uri), storage_from_string(uri)
+    assert isinstance(first, SQLiteLimitStorage)
+    limit = parse('3 per minute')
+    assert FixedWindowRateLimiter(first).hit(limit, 'client', cost=2)
+    assert FixedWindowRateLimiter(second).hit(limit, 'client')
+    assert not FixedWindowRateLimiter(first).hit(limit, 'client')
+    assert FixedWindowRateLimiter(second).hit(limit, 'other-client')
+
+
+def test_sqlite_limit_window_expires(tmp_path):
+    storage = SQLiteLimitStorage(f'sqlite://{tmp_path}/state.db')
+    assert storage.incr('key', 0.2, amount=5) == 5
+    assert storage.get('key') == 5
+    time.sleep(0.25)
+    assert storage.get('key') == 0
+    assert storage.incr('key', 0.2) == 1
+
+
+def test_sqlite_limit_hits_see_their_own_count(tmp_path):
+    """Test concurrent hits from two workers each read back a distinct count."""
+    uri = f'sqlite://{tmp_path}/state.db'
+    storages = [SQLiteLimitStorage(uri), SQLiteLimitStorage(uri)]
+    counts = []
+
+    def hit(storage):
+        for _ in range(50):
+            counts.append(storage.incr('key', 60))
+
+    threads = [threading.Thread(target=hit, args=(storage,)) for storage in storages]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(counts) == list(range(1, 101))
+
+
+def test_random_history_kept_server_side(client, monkeypatch):
+    """Test the no-repeat window works with only a session ID in the cookie."""
+    monkeypatch.setitem(app.config, 'RANDOM_HISTORY_SIZE', 2)
+    with app.app_context():
+        get_store().put_many([
+            {'filename': f'photo_{i}.jpg', 'timestamp': f'2024-12-21T14:00:0{i}', 'url': f'https://i.ibb.co/{i}.jpg'}
+            for i in range(3)
+        ])
+    shown = [client.get('/api/photos/random').json['photo']['filename'] for _ in range(9)]
+    for i in range(2, len(shown)):
+        assert shown[i] not in shown[i - 2:i]
+    with client.session_transaction() as session:
+        assert 'sid' in session
+        assert 'recent_photos' not in session
@@ -0,0 +1,64 @@
+import os
+import pytest
+from app import app
+from modules import static_delivery
+
+HASHED = 'photo-320-0123456789abcdef.webp'
+
+
+@pytest.fixture
+def client(client, tmp_path):
+    (tmp_path / 'plain.jpg').write_bytes(os.urandom(4096))
+    (tmp_path / 'derivatives').mkdir()
+    (tmp_path / 'derivatives' / HASHED).write_bytes(os.urandom(1024))
+    return client
+
+
+def test_etag_and_conditional_get(client):
+    """Test responses carry a content ETag and revalidate with 304."""
+    rv = client.get('/uploads/plain.jpg')
+    assert rv.status_code == 200
+    etag = rv.headers['ETag']
+    assert client.get('/uploads/plain.jpg', headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_range_request(client):
+    """Test byte ranges are honoured."""
+    rv = client.get('/uploads/plain.jpg', headers={'Range': 'bytes=100-199'})
+    assert rv.status_code == 206
+    assert len(rv.data) == 100
+
+
+def test_cache_control(client):
+    """Test hashed names are immutable and plain names get a short max-age."""
+    assert 'immutable' in client.get(f'/uploads/derivatives/{HASHED}').headers['Cache-Control']
+    assert 'immutable' not in client.get('/uploads/plain.jpg').headers['Cache-Control']
+
+
+def test_x_accel_offload(client, monkeypatch):
+    """Test nginx offload returns only headers for the proxy to act on."""
+    monkeypatch.setitem(app.config, 'UPLOADS_OFFLOAD', 'x-accel')
+    rv = client.get('/uploads/plain.jpg')
+    assert rv.headers['X-Accel-Redirect'] == '/protected-uploads/plain.jpg'
+    assert rv.headers['Content-Type'] == 'image/jpeg'
+    assert rv.data == b''
+    assert client.get('/uploads/plain.jpg', headers={'If-None-Match': rv.headers['ETag']}).status_code == 304
+
+
+def test_etag_without_hashing(client, monkeypatch):
+    """Test hashed names and offloaded files get an ETag without reading the file."""
+    def no_hashing(path, stat=None):
+        raise AssertionError(f'{path} was hashed')
+
+    monkeypatch.setattr(static_delivery, 'file_etag', no_hashing)
+    assert client.get(f'/uploads/derivatives/{HASHED}').headers['ETag'] == '"0123456789abcdef"'
+    monkeypatch.setitem(app.config, 'UPLOADS_OFFLOAD', 'x-sendfile')
+    rv = client.get('/uploads/plain.jpg')
+    assert rv.headers['ETag']
+    assert client.get('/uploads/plain.jpg', headers={'If-None-Match': rv.headers['ETag']}).status_code == 304
+
+
+def test_missing_and_traversal(client):
+    """Test unknown files and path traversal are 404s."""
+    assert client.get('/uploads/missing.jpg').status_code == 404
+    assert client.get('/uploads/../app.py').status_code == 404
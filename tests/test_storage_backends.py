@@ -0,0 +1,43 @@
+import hashlib
+import os
+from io import BytesIO
+import pytest
+from PIL import Image
+from app import app
+from modules.storage_backends import LocalStorage
+
+
+@pytest.fixture
+def client(client, monkeypatch):
+    monkeypatch.setitem(app.config, 'STORAGE_BACKEND', 'local')
+    return client
+
+
+def test_local_storage_shards_by_hash(tmp_path):
+    """Test files are content-addressed under two levels of hash prefixes."""
+    storage = LocalStorage(str(tmp_path), '/uploads/images')
+    digest = hashlib.sha256(b'pixels').hexdigest()
+    url = storage.put(b'pixels', 'JPG')
+    assert url == f'/uploads/images/{digest[:2]}/{digest[2:4]}/{digest}.jpg'
+    path = tmp_path / digest[:2] / digest[2:4] / f'{digest}.jpg'
+    assert path.read_bytes() == b'pixels'
+    # Same content is stored once and no temporary files are left behind
+    assert storage.put(b'pixels', 'jpg') == url
+    assert os.listdir(path.parent) == [path.name]
+
+
+def test_local_upload_is_served(client):
+    """Test an upload with the local backend never calls the image host."""
+    buffer = BytesIO()
+    Image.new('RGB', (800, 600), color='blue').save(buffer, 'JPEG')
+    buffer.seek(0)
+    rv = client.post('/api/upload', data={'file': (buffer, 'local.jpg')})
+    assert rv.status_code == 200
+    assert rv.json['url'].startswith('/uploads/images/')
+    assert rv.json['url'].endswith('.jpeg')
+    served = client.get(rv.json['url'])
+    assert served.status_code == 200
+    assert 'immutable' in served.headers['Cache-Control']
+    assert Image.open(BytesIO(served.data)).size == (800, 600)
+    if rv.json.get('derivatives'):
+        assert rv.json['thumbnail'] == min(rv.json['derivatives'], key=lambda d: d['width'])['url']
@@ -0,0 +1,47 @@
+from io import BytesIO
+import pytest
+from PIL import Image
+from modules.image_handler import process_image
+from modules.transcoder import TranscodePool, TranscoderBusy
+
+
+def make_jpeg(size=(2400, 1600)):
+    buffer = BytesIO()
+    Image.new('RGB', size, color='blue').save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope='module')
+def pool():
+    pool = TranscodePool(2, max_pending=2, wait_timeout=0.1)
+    yield pool
+    pool.shutdown()
+
+
+def test_pool_matches_inline(pool):
+    """Test the pool returns the same details as inline processing."""
+    data = make_jpeg()
+    output, original, processed = pool.process(data)
+    _, inline_original, inline_processed = process_image(BytesIO(data))
+    assert original == inline_original
+    assert {k: v for k, v in processed.items() if k not in ('size', 'timings')} == \
+        {k: v for k, v in inline_processed.items() if k not in ('size', 'timings')}
+    assert Image.open(output).size == (1620, 1080)
+
+
+def test_pool_rejects_invalid_image(pool):
+    """Test undecodable bytes come back as (None, None, None)."""
+    assert pool.process(b'not an image') == (None, None, None)
+
+
+def test_pool_backpressure(pool):
+    """Test submissions past the queue depth fail fast with TranscoderBusy."""
+    pool._slots.acquire()
+    pool._slots.acquire()
+    try:
+        with pytest.raises(TranscoderBusy):
+            pool.submit(make_jpeg((10, 10)))
+    finally:
+        pool._slots.release()
+        pool._slots.release()
+    assert pool.pending() == 0
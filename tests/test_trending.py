@@ -0,0 +1,93 @@
+import random
+import time
+
+from modules.reaction_store import ReactionStore
+from modules.trending import ReactionRanking, TopIndex
+
+
+def test_top_index_matches_full_sort():
+    """Test the heap answers like sorting every score, through ups and downs."""
+    rng = random.Random(0)
+    index, scores = TopIndex(), {}
+    for _ in range(5000):
+        photo = f'p{rng.randrange(200)}'
+        # Like reaction counts, a score never goes below zero
+        delta = rng.choice([1, 1, 1, -1]) if scores.get(photo) else 1
+        index.add(photo, delta)
+        scores[photo] = scores.get(photo, 0) + delta
+    expected = sorted(((p, s) for p, s in scores.items() if s > 0), key=lambda e: (-e[1], e[0]))
+    assert index.top(10) == expected[:10]
+    assert index.top(10) == expected[:10]
+    assert len(index) == len(expected)
+
+
+def test_ranking_all_window_follows_counts(tmp_path):
+    """Test lifetime ranking, per emoji, including reactions changed later."""
+    store = ReactionStore(str(tmp_path / 'reactions.db'))
+    for user in ('u1', 'u2', 'u3'):
+        store.react('a.jpg', user, '👍')
+    store.react('b.jpg', 'u1', '❤️')
+    store.react('b.jpg', 'u2', '❤️')
+    ranking = ReactionRanking(store)
+    assert ranking.top() == [('a.jpg', 3), ('b.jpg', 2)]
+
+    # Picked up from the event log, as if written by another worker
+    store.react('a.jpg', 'u1', '❤️')
+    store.react('a.jpg', 'u2', '❤️')
+    assert ranking.top(emoji='❤️') == [('a.jpg', 2), ('b.jpg', 2)]
+    assert ranking.top(emoji='👍') == [('a.jpg', 1)]
+    assert ranking.top(emoji='🔥') == []
+
+
+def test_ranking_decays_older_reactions(tmp_path):
+    """Test trending windows favour recent reactions and halve per half-life."""
+    store = ReactionStore(str(tmp_path / 'reactions.db'))
+    now = time.time()
+    store.react_many([('old.jpg', f'u{i}', '👍', now - 6 * 3600) for i in range(4)])
+    store.react_many([('new.jpg', 'u1', '👍', now)])
+    ranking = ReactionRanking(store)
+
+    hourly = dict(ranking.top('hour', now=now))
+    assert list(hourly) == ['new.jpg', 'old.jpg']
+    assert abs(hourly['new.jpg'] - 1.0) < 1e-6
+    assert abs(hourly['old.jpg'] - 4 / 64) < 1e-6
+    assert [photo for photo, _ in ranking.top('day', now=now)] == ['old.jpg', 'new.jpg']
+    assert [photo for photo, _ in ranking.top('all')] == ['old.jpg', 'new.jpg']
+
+
+def test_ranking_survives_landmark_moves(tmp_path):
+    """Test rescaling the decay landmark keeps scores and order."""
+    store = ReactionStore(str(tmp_path / 'reactions.db'))
+    now = time.time()
+    ranking = ReactionRanking(store)
+    ranking.sync()
+    later = now + 400 * 3600  # far enough for hourly weights to need rescaling
+    store.react_many([('a.jpg', 'u1', '👍', later), ('a.jpg', 'u2', '👍', later), ('b.jpg', 'u1', '👍', later)])
+    top = ranking.top('hour', now=later)
+    assert [photo for photo, _ in top] == ['a.jpg', 'b.jpg']
+    assert abs(top[0][1] - 2.0) < 1e-6
+
+
+def test_ranking_reads_after_long_quiet_spell(tmp_path):
+    """Test reading weeks after the last reaction rescales instead of overflowing."""
+    store = ReactionStore(str(tmp_path / 'reactions.db'))
+    now = time.time()
+    store.react_many([('a.jpg', 'u1', '👍', now), ('a.jpg', 'u2', '👍', now), ('b.jpg', 'u1', '👍', now)])
+    ranking = ReactionRanking(store)
+    ranking.sync()
+    later = now + 50 * 24 * 3600  # 1200 hourly half-lives
+    assert ranking.top('hour', now=later) == []
+    daily = ranking.top('day', now=later)
+    assert [photo for photo, _ in daily] == ['a.jpg', 'b.jpg']
+    assert abs(daily[0][1] / 2.0 ** -50 - 2.0) < 1e-6
+    assert [photo for photo, _ in ranking.top('all')] == ['a.jpg', 'b.jpg']
+
+
+def test_ranking_unknown_emoji_after_long_quiet_spell(tmp_path):
+    """Test an emoji nobody used reads as empty even when the landmark moves."""
+    store = ReactionStore(str(tmp_path / 'reactions.db'))
+    now = time.time()
+    store.react_many([('a.jpg', 'u1', '👍', now)])
+    ranking = ReactionRanking(store)
+    ranking.sync()
+    assert ranking.top('hour', emoji='🔥', limit=5, now=now + 2000 * 3600) == []
@@ -0,0 +1,119 @@
+import time
+from io import BytesIO
+from PIL import Image
+from app import app
+from modules.upload_jobs import INTERRUPTED_ERROR, UploadJobStore
+
+
+def make_image(size=(800, 600), fmt='JPEG', mode='RGB'):
+    buffer = BytesIO()
+    Image.new(mode, size, color='red').save(buffer, fmt)
+    buffer.seek(0)
+    return buffer
+
+
+def wait_for_job(client, job_id, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f'/api/upload/{job_id}').json['job']
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.02)
+    raise AssertionError('upload job did not finish')
+
+
+def test_upload_sync(client, fake_imgbb):
+    """Test an inline upload reaches the image host and the catalog."""
+    rv = client.post('/api/upload', data={'file': (make_image(), 'test.jpg')})
+    assert rv.status_code == 200
+    assert rv.json['details']['processed']['width'] == 800
+    assert len(fake_imgbb.uploads) == 1
+    assert client.get('/api/photos').json['photos'][0]['filename'] == rv.json['filename']
+
+
+def test_upload_async(client, fake_imgbb):
+    """Test a queued upload returns a job ID and finishes in the background."""
+    fake_imgbb.delay = 0.2
+    rv = client.post('/api/upload?async=1', data={'file': (make_image(), 'test.jpg')})
+    assert rv.status_code == 202
+    job = wait_for_job(client, rv.json['job_id'])
+    assert job['status'] == 'done'
+    assert job['result']['url'].startswith('http://127.0.0.1')
+
+
+def test_upload_async_host_failure(client, fake_imgbb):
+    """Test a failing image host marks the job as failed."""
+    fake_imgbb.failures = [500] * 10
+    rv = client.post('/api/upload?async=1', data={'file': (make_image(), 'test.jpg')})
+    job = wait_for_job(client, rv.json['job_id'])
+    assert job['status'] == 'failed'
+    assert job['error'] == 'Error uploading to image host'
+
+
+def test_upload_job_status_shared_across_workers(client, fake_imgbb, tmp_path):
+    """Test another worker, with its own store connection, sees the job finish."""
+    rv = client.post('/api/upload?async=1', data={'file': (make_image(), 'test.jpg')})
+    job_id = rv.json['job_id']
+    wait_for_job(client, job_id)
+    job = UploadJobStore(str(tmp_path / 'upload_jobs.db')).get(job_id)
+    assert job['status'] == 'done'
+    assert job['result']['url'].startswith('http://127.0.0.1')
+
+
+def test_upload_job_of_dead_worker_fails(client, tmp_path):
+    """Test a job left unfinished by a worker that died reads as failed."""
+    store = UploadJobStore(str(tmp_path / 'upload_jobs.db'))
+    job_id = store.create('test.jpg')
+    store.update(job_id, pid=2 ** 22 + 1)
+    job = client.get(f'/api/upload/{job_id}').json['job']
+    assert job['status'] == 'failed' and job['error'] == INTERRUPTED_ERROR
+
+
+def test_upload_queue_full(client, fake_imgbb, monkeypatch):
+    """Test uploads beyond the queue depth get a 503 instead of queueing."""
+    monkeypatch.setitem(app.config, 'UPLOAD_WORKERS', 1)
+    monkeypatch.setitem(app.config, 'UPLOAD_QUEUE_DEPTH', 1)
+    fake_imgbb.delay = 0.5
+    first = client.post('/api/upload?async=1', data={'file': (make_image(), 'a.jpg')})
+    second = client.post('/api/upload?async=1', data={'file': (make_image(), 'b.jpg')})
+    assert first.status_code == 202
+    assert second.status_code == 503
+    assert wait_for_job(client, first.json['job_id'])['status'] == 'done'
+
+
+def test_upload_status_unknown_job(client):
+    """Test polling an unknown job is a 404."""
+    rv = client.get('/api/upload/does-not-exist')
+    assert rv.status_code == 404
+
+
+def test_duplicate_upload_skips_host(client, fake_imgbb):
+    """Test re-uploading identical bytes returns the saved photo without an upload."""
+    first = client.post('/api/upload', data={'file': (make_image(), 'test.jpg')})
+    second = client.post('/api/upload', data={'file': (make_image(), 'again.jpg')})
+    assert second.status_code == 200
+    assert second.json['duplicate'] is True
+    assert second.json['filename'] == first.json['filename']
+    assert len(fake_imgbb.uploads) == 1
+
+
+def test_failed_metadata_save_is_not_cached(client, fake_imgbb, monkeypatch):
+    """Test an upload whose metadata was not saved is processed again on retry."""
+    with monkeypatch.context() as patch:
+        patch.setattr('modules.image_handler.save_photo_metadata', lambda photo_data: False)
+        client.post('/api/upload', data={'file': (make_image(), 'test.jpg')})
+    retry = client.post('/api/upload', data={'file': (make_image(), 'test.jpg')})
+    assert retry.status_code == 200
+    assert 'duplicate' not in retry.json
+    assert len(fake_imgbb.uploads) == 2
+
+
+def test_upload_records_derivatives(client, fake_imgbb, monkeypatch):
+    """Test derivatives are saved, recorded in metadata and served."""
+    monkeypatch.setitem(app.config, 'DERIVATIVE_WIDTHS', [320, 640])
+    rv = client.post('/api/upload', data={'file': (make_image(), 'test.jpg')})
+    derivatives = rv.json['derivatives']
+    assert {(d['width'], d['format']) for d in derivatives} >= {(320, 'webp'), (640, 'webp')}
+    served = client.get(derivatives[0]['url'])
+    assert served.status_code == 200
+    assert client.get('/uploads/metadata.db').status_code == 404
@@ -0,0 +1,70 @@
+import json
+import zipfile
+from io import BytesIO
+import pytest
+from PIL import Image
+from app import app
+from modules.image_handler import MAX_BATCH_FILES, batch_cost
+
+
+@pytest.fixture
+def client(client, monkeypatch):
+    monkeypatch.setitem(app.config, 'DERIVATIVE_WIDTHS', [])
+    return client
+
+
+def make_image(color, fmt='JPEG'):
+    buffer = BytesIO()
+    Image.new('RGB', (400, 300), color=color).save(buffer, fmt)
+    buffer.seek(0)
+    return buffer
+
+
+def read_lines(rv):
+    return [json.loads(line) for line in rv.data.decode().splitlines()]
+
+
+def test_batch_upload_streams_item_results(client, fake_imgbb):
+    """Test each file gets its own NDJSON result and a summary follows."""
+    rv = client.post('/api/upload/batch', data={'files': [
+        (make_image('red'), 'a.jpg'),
+        (make_image('green'), 'b.jpg'),
+        (BytesIO(b'not an image'), 'notes.txt'),
+    ]})
+    assert rv.status_code == 200
+    assert rv.mimetype == 'application/x-ndjson'
+    lines = read_lines(rv)
+    results = {line['index']: line for line in lines[:-1]}
+    assert results[0]['status'] == 200 and results[1]['status'] == 200
+    assert results[2]['status'] == 400
+    assert lines[-1] == {'done': True, 'total': 3, 'succeeded': 2, 'failed': 1}
+    assert len(fake_imgbb.uploads) == 2
+
+
+def test_batch_upload_expands_zip(client, fake_imgbb):
+    """Test images inside a zip are uploaded as separate items."""
+    archive = BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zf:
+        zf.writestr('album/one.jpg', make_image('blue').getvalue())
+        zf.writestr('album/two.png', make_image('yellow', 'PNG').getvalue())
+        zf.writestr('album/', '')
+    archive.seek(0)
+    rv = client.post('/api/upload/batch', data={'files': [(archive, 'album.zip')]})
+    lines = read_lines(rv)
+    assert lines[-1]['succeeded'] == 2
+    assert {line['name'] for line in lines[:-1]} == {'album/one.jpg', 'album/two.png'}
+
+
+def test_batch_upload_requires_files(client):
+    rv = client.post('/api/upload/batch', data={})
+    assert rv.status_code == 400
+
+
+def test_oversized_batch_is_not_charged_per_file():
+    """Test a batch over the file limit is refused without using up the upload limit."""
+    files = [(BytesIO(b'x'), f'{i}.jpg') for i in range(MAX_BATCH_FILES + 10)]
+    with app.test_request_context('/api/upload/batch', method='POST', data={'files': files}):
+        assert batch_cost() == 1
+    files = [(BytesIO(b'x'), f'{i}.jpg') for i in range(MAX_BATCH_FILES)]
+    with app.test_request_context('/api/upload/batch', method='POST', data={'files': files}):
+        assert batch_cost() == MAX_BATCH_FILES
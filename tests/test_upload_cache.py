@@ -0,0 +1,64 @@
+from io import BytesIO
+from PIL import Image
+from modules.upload_cache import SQLiteUploadCache, UploadCache, content_hash, perceptual_hash
+
+
+def make_image(size=(320, 240), fmt='JPEG', quality=90):
+    img = Image.linear_gradient('L').resize(size).convert('RGB')
+    buffer = BytesIO()
+    img.save(buffer, fmt, quality=quality)
+    buffer.seek(0)
+    return buffer
+
+
+def test_content_hash_rewinds():
+    """Test hashing leaves the file at the start for processing."""
+    image = make_image()
+    content_hash(image)
+    assert image.tell() == 0
+
+
+def test_exact_hit_and_miss_counters():
+    """Test identical bytes hit and new bytes miss."""
+    cache = UploadCache()
+    photo, keys = cache.lookup(make_image())
+    assert photo is None
+    cache.add(keys, {'filename': 'a.jpg'})
+    assert cache.lookup(make_image())[0] == {'filename': 'a.jpg'}
+    assert cache.lookup(make_image(quality=70))[0] is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (1, 2)
+
+
+def test_perceptual_match_across_reencode():
+    """Test a re-encoded, re-scaled copy matches in perceptual mode."""
+    assert perceptual_hash(make_image()) == perceptual_hash(make_image((640, 480), 'PNG'))
+    cache = UploadCache(perceptual=True)
+    _, keys = cache.lookup(make_image())
+    cache.add(keys, {'filename': 'a.jpg'})
+    assert cache.lookup(make_image((640, 480), 'PNG'))[0] == {'filename': 'a.jpg'}
+    assert cache.stats()['perceptual_hits'] == 1
+
+
+def test_lru_eviction():
+    """Test the least recently used entry is evicted past the bound."""
+    cache = UploadCache(max_entries=2)
+    for name in ('a', 'b', 'c'):
+        cache.add({'content': name, 'perceptual': None}, {'filename': name})
+    assert len(cache) == 2
+    assert 'a' not in cache._entries
+    assert cache.stats()['evictions'] == 1
+
+
+def test_sqlite_cache_is_shared(tmp_path):
+    """Test an upload cached by one worker is a hit in another, within the bound."""
+    path = str(tmp_path / 'upload_cache.db')
+    first, second = SQLiteUploadCache(path, max_entries=2), SQLiteUploadCache(path, max_entries=2)
+    _, keys = first.lookup(make_image())
+    first.add(keys, {'filename': 'a.jpg'})
+    assert second.lookup(make_image())[0] == {'filename': 'a.jpg'}
+    for name in ('b', 'c'):
+        second.add({'content': name, 'perceptual': None}, {'filename': name})
+    assert len(first) == 2
+    assert first.lookup(make_image())[0] is None
+    assert second.stats()['evictions'] == 1
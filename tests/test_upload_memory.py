@@ -0,0 +1,127 @@
+import json
+import os
+import subprocess
+import sys
+from io import BytesIO
+import pytest
+from PIL import Image
+from modules.image_handler import MultipartBody
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# http.client sends a file-like request body in blocks of this size
+SEND_BLOCK = 8192
+
+# Runs the whole upload pipeline in a fresh process and prints its peak RSS.
+# Both modes warm up (imports, pools, databases) on a small image first, so
+# the difference between them is what the big upload itself cost. The peak
+# is also reset when the upload to the host starts, to see what sending the
+# processed image adds on its own.
+PIPELINE_CHILD = '''
+import json, os, sys
+from io import BytesIO
+from PIL import Image
+sys.path.insert(0, os.path.join(os.getcwd(), 'tests'))
+from app import create_app
+from measurements import peak_rss_kib, reset_peak_rss
+from modules.image_handler import run_upload_pipeline
+
+mode, path, folder = sys.argv[1:]
+app = create_app({'TESTING': True, 'UPLOAD_FOLDER': folder, 'STORAGE_BACKEND': 'imgbb', 'ASSETS_BUILD': False})
+warm_up = BytesIO()
+Image.new('RGB', (64, 64), 'red').save(warm_up, 'JPEG')
+report = {'peak_rss_kib': 0, 'send_added_kib': None}
+
+def progress(stage):
+    if stage == 'uploading':
+        report['peak_rss_kib'] = peak_rss_kib()
+        if reset_peak_rss():
+            report['send_start_kib'] = peak_rss_kib()
+    elif stage == 'saving' and 'send_start_kib' in report:
+        report['send_added_kib'] = peak_rss_kib() - report.pop('send_start_kib')
+
+with app.app_context():
+    assert run_upload_pipeline(warm_up, 'warm.jpg')[1] == 200
+    if mode == 'upload':
+        with open(path, 'rb') as f:
+            result, status = run_upload_pipeline(f, 'noise.jpg', progress=progress)
+        assert status == 200, result
+report['peak_rss_kib'] = max(report['peak_rss_kib'], peak_rss_kib())
+print(json.dumps(report))
+'''
+
+
+@pytest.fixture
+def remote_imgbb(monkeypatch):
+    """A fake imgbb in its own process, so its buffers are not measured."""
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(__file__), 'fake_imgbb.py')],
+        stdout=subprocess.PIPE, text=True
+    )
+    url = server.stdout.readline().strip()
+    monkeypatch.setenv('IMGBB_API_KEY', 'test-key')
+    monkeypatch.setenv('IMGBB_UPLOAD_URL', url)
+    yield url
+    server.terminate()
+    server.wait()
+
+
+def make_noise_jpeg():
+    """A ~2 MB JPEG that does not compress away."""
+    buffer = BytesIO()
+    Image.frombytes('RGB', (1600, 1000), os.urandom(1600 * 1000 * 3)).save(buffer, 'JPEG', quality=95)
+    buffer.seek(0)
+    return buffer
+
+
+def test_multipart_body_streams_buffer():
+    """Test the multipart body reads back exactly and in bounded blocks."""
+    data = os.urandom(100000)
+    body = MultipartBody({'key': 'k'}, 'image', 'image', memoryview(data))
+    blocks = []
+    while True:
+        block = body.read(8192)
+        if not block:
+            break
+        assert len(block) <= 8192
+        blocks.append(block)
+    raw = b''.join(blocks)
+    assert len(raw) == len(body)
+    assert data in raw
+    assert b'name="key"' in raw
+
+
+def run_pipeline_child(mode, path, folder):
+    # Without derivatives: the AVIF/WebP encoders' working memory is theirs
+    # and would swamp what this guards, the copies the pipeline itself holds
+    env = {**os.environ, 'LOG_FILE': '', 'UPLOAD_FOLDER': folder, 'DERIVATIVE_WIDTHS': ''}
+    result = subprocess.run(
+        [sys.executable, '-c', PIPELINE_CHILD, mode, path, folder],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_upload_peak_memory(remote_imgbb, tmp_path, record_property):
+    """Test the processed image is streamed to the host, and report the pipeline's peak RSS."""
+    image = make_noise_jpeg()
+    path = tmp_path / 'noise.jpg'
+    path.write_bytes(image.getvalue())
+    size = path.stat().st_size
+    with Image.open(path) as img:
+        decoded = img.width * img.height * len(img.getbands())
+
+    baseline = run_pipeline_child('noop', str(path), str(tmp_path / 'noop'))['peak_rss_kib']
+    report = run_pipeline_child('upload', str(path), str(tmp_path / 'upload'))
+    added = (report['peak_rss_kib'] - baseline) * 1024
+
+    record_property('image_bytes', size)
+    record_property('decoded_bytes', decoded)
+    record_property('upload_peak_rss_added_bytes', added)
+    if report['send_added_kib'] is None:
+        pytest.skip('peak RSS cannot be reset here')
+    record_property('send_peak_rss_added_bytes', report['send_added_kib'] * 1024)
+    # The processed image is about 1 MB; a base64 string, a urlencoded or
+    # joined multipart body would each add at least that much. Streamed, the
+    # body only ever holds a few send blocks in memory
+    assert report['send_added_kib'] * 1024 < SEND_BLOCK * 32